@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency and cost of the boundary strategies: LLM boundary merging ("sequential", "parallel",
+"batched") against overlapping chunks reconciled locally ("overlap").
+
+By default the LLM is simulated: a synthetic book with known scenes, and a fake model that answers every
+prompt correctly after a latency of --call-latency seconds plus --seconds-per-output-token per output token.
+Tokens are counted with the chunker's own tokenizer, and cost uses the given prices per million tokens.
+With --live the real model is called instead, and the input file (or the synthetic book) is sent as is.
+
+Usage:
+    python benchmark_boundary_strategies.py [--words 100000] [--modes sequential,overlap] [--time-scale 0.01]
+    python benchmark_boundary_strategies.py --live --input book.txt
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Every run must pay for its own extraction calls
+os.environ.setdefault("SCENE_CACHE_PATH", "")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import main as chunker  # noqa: E402
+
+SCENE_FIELDS = ["elementi_narrativi", "personaggi", "ambientazione", "mood_vibe", "azione_in_corso"]
+NAMES = ["Macbeth", "Banquo", "Duncan", "Malcolm", "Macduff", "Fleance", "Ross", "Lennox", "Seyton", "Hecate"]
+PLACES = ["castello", "brughiera", "foresta", "salone", "cortile", "accampamento", "torre", "cappella"]
+VOCABULARY = ["la", "notte", "era", "scura", "e", "il", "vento", "soffiava", "tra", "gli", "alberi", "guardò", "lontano", "senza", "dire", "nulla"]
+SCENE_MARKER_RE = re.compile(r"\[S(\d+)\]")
+
+
+def build_scened_book(num_words: int, seed: int = 42) -> str:
+    """A book whose paragraphs are tagged [S<n>] with the scene they belong to, 3-30 paragraphs per scene."""
+    rng = random.Random(seed)
+    paragraphs = []
+    scene_number, paragraphs_left, words_left = 0, 0, num_words
+    while words_left > 0:
+        if paragraphs_left == 0:
+            scene_number += 1
+            paragraphs_left = rng.randint(3, 30)
+        paragraph_len = min(words_left, rng.randint(40, 160))
+        words_left -= paragraph_len
+        paragraphs_left -= 1
+        words = " ".join(rng.choice(VOCABULARY) for _ in range(paragraph_len - 1))
+        paragraphs.append(f"[S{scene_number}] {words.capitalize()}.")
+    return "\n\n".join(paragraphs)
+
+
+def _scene_fields(scene_number: int) -> dict:
+    rng = random.Random(scene_number)
+    return {
+        "elementi_narrativi": f"S{scene_number}",
+        "personaggi": ", ".join(rng.sample(NAMES, 2)),
+        "ambientazione": rng.choice(PLACES),
+        "mood_vibe": f"atmosfera {scene_number}",
+        "azione_in_corso": f"azione della scena {scene_number}",
+    }
+
+
+class SimulatedLLM:
+    """Stands in for _call_llm_with_finish_reason, answering from the [S<n>] markers in the text."""
+
+    def __init__(self, call_latency: float, seconds_per_output_token: float, time_scale: float):
+        self.call_latency = call_latency
+        self.seconds_per_output_token = seconds_per_output_token
+        self.time_scale = time_scale
+        prefix, suffix = chunker._build_scene_extraction_prompt("\x00").split("\x00")
+        self.extraction_prefix, self.extraction_suffix = prefix, suffix
+
+    def _answer(self, prompt: str) -> str:
+        if prompt.startswith(self.extraction_prefix) and prompt.endswith(self.extraction_suffix):
+            text = prompt[len(self.extraction_prefix):len(prompt) - len(self.extraction_suffix)]
+            scenes = []
+            for paragraph in text.split("\n\n"):
+                marker = SCENE_MARKER_RE.match(paragraph.strip())
+                # A window opening mid-paragraph sees the tail of a scene without its marker
+                scene_number = int(marker.group(1)) if marker else 0
+                if not scenes or scenes[-1][0] != scene_number:
+                    scenes.append((scene_number, " ".join(paragraph.split()[:12])))
+            return json.dumps([{**_scene_fields(number), "citazione_iniziale": quote} for number, quote in scenes], ensure_ascii=False)
+        scene_numbers = re.findall(r"Elementi Narrativi: S(\d+)", prompt)
+        if "Coppia 1:" in prompt:
+            pairs = list(zip(scene_numbers[::2], scene_numbers[1::2]))
+            return json.dumps([{"coppia": i, "unire": a == b} for i, (a, b) in enumerate(pairs, start=1)])
+        if "Rispondi con un semplice 'Yes' o 'No'" in prompt:
+            return "Yes" if scene_numbers[0] == scene_numbers[1] else "No"
+        return json.dumps(_scene_fields(int(scene_numbers[0])), ensure_ascii=False)
+
+    async def __call__(self, client, prompt_content: str, system_message: str, model: str, **kwargs):
+        content = self._answer(prompt_content)
+        simulated_seconds = self.call_latency + chunker._count_tokens(content) * self.seconds_per_output_token
+        await asyncio.sleep(simulated_seconds * self.time_scale)
+        return content, "stop"
+
+
+class MeteredLLM:
+    """Wraps an LLM call function, counting calls and input/output tokens."""
+
+    def __init__(self, call):
+        self.call = call
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def __call__(self, client, prompt_content: str, system_message: str, model: str, **kwargs):
+        content, finish_reason = await self.call(client, prompt_content, system_message, model, **kwargs)
+        self.calls += 1
+        self.input_tokens += chunker._count_tokens(prompt_content) + chunker._count_tokens(system_message) + chunker.MESSAGE_OVERHEAD_TOKENS
+        self.output_tokens += chunker._count_tokens(content or "")
+        return content, finish_reason
+
+
+def _scene_accuracy(scenes, text: str) -> str:
+    """How many of the book's real scenes came back exactly once, from the simulated scene labels."""
+    expected = len(set(SCENE_MARKER_RE.findall(text)))
+    labels = [scene.elementi_narrativi for scene in scenes]
+    exact = sum(1 for label in set(labels) if labels.count(label) == 1 and label != "S0")
+    return f"{exact}/{expected} scenes exact, {len(labels)} returned"
+
+
+async def _run_mode(text: str, mode: str, args) -> object:
+    return await chunker.process_large_text(
+        text, chunker.TARGET_CHUNK_SIZE_WORDS, chunker.WORD_COUNT_SLACK, args.max_concurrent_chunks, boundary_merge_mode=mode
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=100_000, help="Size of the synthetic book in words")
+    parser.add_argument("--input", type=Path, help="Text file to split instead of the synthetic book")
+    parser.add_argument("--modes", default="sequential,parallel,batched,overlap", help="Comma-separated boundary strategies")
+    parser.add_argument("--max-concurrent-chunks", type=int, default=chunker.MAX_CONCURRENT_CHUNKS)
+    parser.add_argument("--live", action="store_true", help="Call the configured model instead of the simulated one")
+    parser.add_argument("--call-latency", type=float, default=2.0, help="Simulated seconds per call before the first token")
+    parser.add_argument("--seconds-per-output-token", type=float, default=0.01, help="Simulated generation speed")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Real seconds slept per simulated second")
+    parser.add_argument("--input-price", type=float, default=0.15, help="USD per million input tokens")
+    parser.add_argument("--output-price", type=float, default=0.60, help="USD per million output tokens")
+    parser.add_argument("--with-prefilter", action="store_true", help="Let the local boundary pre-filter decide clear seams")
+    args = parser.parse_args()
+
+    logging.getLogger("text_chunker").setLevel(logging.WARNING)
+    text = args.input.read_text(encoding="utf-8") if args.input else build_scened_book(args.words)
+    if not args.with_prefilter:
+        # Send every seam to the LLM, so the LLM strategies are measured at their full cost
+        chunker.BOUNDARY_PREFILTER_NO_THRESHOLD, chunker.BOUNDARY_PREFILTER_YES_THRESHOLD = -1.0, 2.0
+    time_scale = 1.0 if args.live else args.time_scale
+    llm = MeteredLLM(chunker._call_llm_with_finish_reason if args.live else SimulatedLLM(args.call_latency, args.seconds_per_output_token, time_scale))
+    chunker._call_llm_with_finish_reason = llm
+
+    print(f"=== {len(text.split())} words, {len(text)} chars, overlap {chunker.CHUNK_OVERLAP_WORDS} words, {'live' if args.live else 'simulated'} LLM ===")
+    print(f"{'mode':<11} {'seconds':>9} {'calls':>6} {'input tok':>10} {'output tok':>11} {'cost USD':>9}  result")
+    for mode in args.modes.split(","):
+        llm.reset()
+        start = time.perf_counter()
+        response = asyncio.run(_run_mode(text, mode, args))
+        seconds = (time.perf_counter() - start) / time_scale
+        cost = (llm.input_tokens * args.input_price + llm.output_tokens * args.output_price) / 1_000_000
+        result = f"{len(response.scenes)} scenes" if args.live or args.input else _scene_accuracy(response.scenes, text)
+        print(f"{mode:<11} {seconds:>9.1f} {llm.calls:>6} {llm.input_tokens:>10} {llm.output_tokens:>11} {cost:>9.4f}  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the text-chunker's local (non-LLM) chunking and output-parsing hot paths.
+
+Usage:
+    python benchmark_chunking.py [--words 1000000] [--scenes 200]
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from main import (  # noqa: E402
+    TARGET_CHUNK_SIZE_WORDS,
+    WORD_COUNT_SLACK,
+    Scene,
+    _BreakPointIndex,
+    _WordIndex,
+    _create_non_overlapping_major_chunks,
+    _find_natural_break_point,
+    _parse_and_validate_scenes,
+)
+
+VOCABULARY = [
+    "la", "notte", "era", "scura", "e", "il", "vento", "soffiava", "tra", "gli", "alberi",
+    "Macbeth", "guardò", "castello", "lontano", "senza", "dire", "nulla", "mentre", "lei",
+]
+
+
+def build_synthetic_book(num_words: int, seed: int = 42) -> str:
+    """Builds a manuscript-like text with sentences, lines and paragraphs of varying length."""
+    rng = random.Random(seed)
+    paragraphs = []
+    words_left = num_words
+    while words_left > 0:
+        sentences = []
+        for _ in range(rng.randint(1, 12)):
+            sentence_len = min(words_left, rng.randint(5, 30))
+            if sentence_len <= 0:
+                break
+            words_left -= sentence_len
+            sentence = " ".join(rng.choice(VOCABULARY) for _ in range(sentence_len))
+            sentences.append(sentence.capitalize() + rng.choice([".", ".", ".", "?", "!", ","]))
+        # Occasional single newlines inside a paragraph, as in dialogue or poetry
+        paragraphs.append(("\n" if rng.random() < 0.1 else " ").join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def _legacy_find_natural_break_point(text_segment: str, start_offset: int, end_offset: int) -> int:
+    """The original backwards character scan, kept here as the baseline."""
+    for i in range(end_offset, start_offset - 1, -1):
+        if text_segment[i-2:i] == "\n\n":
+            return i
+    for i in range(end_offset, start_offset - 1, -1):
+        if text_segment[i-1:i] == "\n":
+            return i
+    for i in range(end_offset, start_offset - 1, -1):
+        if text_segment[i-1] in ('.', '?', '!'):
+            return i
+    return end_offset
+
+
+def benchmark_break_points(text: str, label: str) -> None:
+    # One search window per chunk, sized the same way _create_non_overlapping_major_chunks sizes them
+    slack_chars = WORD_COUNT_SLACK * 6
+    chunk_chars = TARGET_CHUNK_SIZE_WORDS * 6
+    windows = [
+        (max(1, end - slack_chars), min(len(text), end + slack_chars))
+        for end in range(chunk_chars, len(text), chunk_chars)
+    ]
+
+    start = time.perf_counter()
+    legacy_results = [_legacy_find_natural_break_point(text, s, e) for s, e in windows]
+    legacy_seconds = time.perf_counter() - start
+
+    # Includes building the index, which happens lazily on the first lookup of each break kind
+    start = time.perf_counter()
+    break_index = _BreakPointIndex(text)
+    indexed_results = [_find_natural_break_point(break_index, s, e) for s, e in windows]
+    indexed_seconds = time.perf_counter() - start
+
+    assert indexed_results == legacy_results, "Indexed break points differ from the legacy scan"
+
+    built_kinds = [kind for kind in ("paragraph_breaks", "line_breaks", "sentence_ends") if kind in vars(break_index)]
+    print(f"--- Break points ({label}): {len(windows)} windows over {len(text)} chars ---")
+    print(f"Legacy backwards scan:     {legacy_seconds * 1000:.2f} ms")
+    print(f"Index build + bisect:      {indexed_seconds * 1000:.2f} ms (indexed: {', '.join(built_kinds)})")
+    print(f"Speedup:                   {legacy_seconds / max(indexed_seconds, 1e-9):.1f}x")
+
+
+def _measure(func):
+    """Runs func twice, returning (result, seconds, peak traced bytes); tracing is off for the timed run."""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak_bytes
+
+
+def benchmark_word_index(text: str) -> None:
+    # The legacy chunker kept one str per word token for the whole run
+    legacy_tokens, legacy_seconds, legacy_peak = _measure(lambda: re.findall(r'\S+\s*', text))
+    word_index, index_seconds, index_peak = _measure(lambda: _WordIndex(text))
+    assert len(word_index) == len(legacy_tokens), "Word index and legacy tokens disagree on the word count"
+    del legacy_tokens
+
+    chunks, chunk_seconds, chunk_peak = _measure(
+        lambda: _create_non_overlapping_major_chunks(text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK)
+    )
+
+    print(f"--- Word index: {len(word_index)} words ---")
+    print(f"Legacy token list:         {legacy_seconds * 1000:.2f} ms, peak {legacy_peak / 2**20:.1f} MiB")
+    print(f"Word-start offset array:   {index_seconds * 1000:.2f} ms, peak {index_peak / 2**20:.1f} MiB")
+    print(f"Full major chunking:       {chunk_seconds * 1000:.2f} ms, peak {chunk_peak / 2**20:.1f} MiB ({len(chunks)} chunks)")
+
+
+def _legacy_parse_and_validate_scenes(json_payload: str) -> list:
+    """The original json.loads + per-item Scene(**item) validation, kept here as the baseline."""
+    scenes_data = json.loads(json_payload)
+    if not isinstance(scenes_data, list):
+        raise ValueError("Expected a JSON list/array")
+    validated_scenes = []
+    for i, scene_item in enumerate(scenes_data):
+        if not isinstance(scene_item, dict):
+            raise ValueError(f"Item at index {i} in JSON array is not a dictionary")
+        validated_scenes.append(Scene(**scene_item))
+    return validated_scenes
+
+
+def benchmark_scene_validation(num_scenes: int, repeats: int = 200) -> None:
+    # One chunk's worth of extraction output, with field lengths typical of real responses
+    rng = random.Random(7)
+    payload = json.dumps([
+        {field: " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(15, 60))) for field, field_info in Scene.model_fields.items() if field_info.is_required()}
+        for _ in range(num_scenes)
+    ], ensure_ascii=False)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        legacy_scenes = _legacy_parse_and_validate_scenes(payload)
+    legacy_seconds = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        adapter_scenes = _parse_and_validate_scenes(payload)
+    adapter_seconds = (time.perf_counter() - start) / repeats
+
+    assert adapter_scenes == legacy_scenes, "Bulk validation differs from the per-item baseline"
+    print(f"--- Scene validation: {num_scenes} scenes, {len(payload)} chars per payload ---")
+    print(f"json.loads + Scene(**item): {legacy_seconds * 1000:.3f} ms")
+    print(f"TypeAdapter.validate_json:  {adapter_seconds * 1000:.3f} ms")
+    print(f"Speedup:                    {legacy_seconds / max(adapter_seconds, 1e-9):.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=1_000_000, help="Size of the synthetic manuscript in words")
+    parser.add_argument("--scenes", type=int, default=200, help="Scenes per payload in the validation benchmark")
+    args = parser.parse_args()
+    # The chunker's progress logs would be timed along with it
+    logging.getLogger("text_chunker").setLevel(logging.WARNING)
+
+    text = build_synthetic_book(args.words)
+    print(f"=== Synthetic manuscript: {args.words} words, {len(text)} chars ===")
+    benchmark_break_points(text, "paragraphed")
+    # Worst case for the backwards scan: no paragraph or line breaks, e.g. text pasted from a PDF
+    benchmark_break_points(text.replace("\n", " "), "single block")
+    benchmark_word_index(text)
+    benchmark_scene_validation(args.scenes)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,263 @@
 import asyncio
+import bisect
+import hashlib
+import importlib.util
 import os
 import json
+import logging
+import random
 import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from functools import cached_property
+from pathlib import Path
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, ValidationError
-from typing import List, Any
-from openai import OpenAI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing import List, Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 from pprint import pprint
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Text Chunker", description="Split fiction text into singular scenes")
+# Logging: LOG_LEVEL for everything, LOG_LEVELS to override single stages, e.g. "extract=DEBUG,boundary=WARNING".
+# Stages: llm, extract, chunking, boundary, pipeline, jobs, api. Raw LLM output previews and per-chunk details
+# are logged at DEBUG only, and computed only when DEBUG is on for their stage.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text") # "text" (one key=value line per record) or "json" (one JSON object per line)
+# Attributes every LogRecord has; anything else on a record came from extra= and is logged as a field
+_STANDARD_LOG_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class _StructuredLogFormatter(logging.Formatter):
+    """Formats records as time, level, stage and message plus any extra= fields, as text or as JSON."""
+
+    def __init__(self, json_output: bool):
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "stage": record.name.removeprefix("text_chunker."),
+            "message": record.getMessage(),
+            **{key: value for key, value in vars(record).items() if key not in _STANDARD_LOG_RECORD_FIELDS},
+        }
+        if record.exc_info:
+            fields["exception"] = self.formatException(record.exc_info)
+        if self.json_output:
+            return json.dumps(fields, ensure_ascii=False, default=str)
+        extras = "".join(f" {key}={value}" for key, value in list(fields.items())[4:])
+        return f"{fields['time']} {fields['level']} [{fields['stage']}] {fields['message']}{extras}"
+
+
+class _LazyLogArg:
+    """A log argument computed only if a handler actually formats the record, e.g. a preview of a long LLM output."""
+
+    def __init__(self, compute: Callable[[], Any]):
+        self.compute = compute
+
+    def __str__(self) -> str:
+        return str(self.compute())
+
+
+def _configure_logging() -> None:
+    """Sends the text_chunker loggers to stderr with the configured levels; safe to call more than once."""
+    root_log = logging.getLogger("text_chunker")
+    root_log.setLevel(LOG_LEVEL)
+    if not root_log.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(_StructuredLogFormatter(json_output=LOG_FORMAT == "json"))
+        root_log.addHandler(handler)
+        root_log.propagate = False
+    for stage_level in filter(None, (item.strip() for item in LOG_LEVELS.split(","))):
+        stage, _, level = stage_level.partition("=")
+        logging.getLogger(f"text_chunker.{stage.strip()}").setLevel(level.strip().upper())
+
+
+_configure_logging()
+llm_log = logging.getLogger("text_chunker.llm")
+extract_log = logging.getLogger("text_chunker.extract")
+chunking_log = logging.getLogger("text_chunker.chunking")
+boundary_log = logging.getLogger("text_chunker.boundary")
+pipeline_log = logging.getLogger("text_chunker.pipeline")
+jobs_log = logging.getLogger("text_chunker.jobs")
+api_log = logging.getLogger("text_chunker.api")
+
+# Connection pool settings for the shared LLM HTTP client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))                      # Total sockets to OpenRouter
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))  # Idle sockets kept open for reuse
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "300"))        # Scene extraction on a full chunk is slow
+LLM_POOL_TIMEOUT_SECONDS = float(os.getenv("LLM_POOL_TIMEOUT_SECONDS", "60"))          # Wait for a free socket when the pool is busy
+LLM_HTTP2_ENABLED = importlib.util.find_spec("h2") is not None                        # httpx only speaks HTTP/2 with the h2 package installed
+
+# Adaptive rate limiting of LLM calls, shared by every request (see AdaptiveRateLimiter)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))  # Provider request quota (0 = unlimited)
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))      # Provider token quota, input plus output (0 = unlimited)
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", str(LLM_MAX_CONNECTIONS)))
+LLM_CONCURRENCY_DECREASE_FACTOR = float(os.getenv("LLM_CONCURRENCY_DECREASE_FACTOR", "0.5"))  # Applied on a 429 or 5xx
+LLM_CONCURRENCY_INCREASE = float(os.getenv("LLM_CONCURRENCY_INCREASE", "1"))  # Added over one full window of successful calls
+LLM_THROTTLE_MAX_WAIT_SECONDS = float(os.getenv("LLM_THROTTLE_MAX_WAIT_SECONDS", "600"))  # Give up on a call throttled for this long
+# Retries of transient failures (dropped connections, timeouts, 408/409/429/5xx), see RetryPolicy
+LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "5"))  # Per call, not counting 429s, which are bounded by time
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "1"))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "60"))
+# Hedged requests: when a request has had no answer after this long, send a duplicate and keep whichever
+# answers first (0 = off). Each hedge pays for a second request, so set it near the p95 call latency.
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+LLM_LATENCY_BUCKETS_SECONDS = (0.5, 1, 2, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+
+client: Optional[AsyncOpenAI] = None
+
+
+def _get_llm_client() -> AsyncOpenAI:
+    """Returns the process-wide async LLM client, creating it (and its connection pool) on first use."""
+    global client
+    if client is None:
+        timeout = httpx.Timeout(
+            LLM_READ_TIMEOUT_SECONDS,
+            connect=LLM_CONNECT_TIMEOUT_SECONDS,
+            pool=LLM_POOL_TIMEOUT_SECONDS,
+        )
+        http_client = DefaultAsyncHttpxClient(
+            http2=LLM_HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=timeout,
+        )
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url="https://openrouter.ai/api/v1",
+            http_client=http_client,
+            timeout=timeout,
+            # Failed calls are retried by _call_llm_with_finish_reason, so llm_rate_limiter sees every 429
+            max_retries=0,
+        )
+    return client
 
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    base_url="https://openrouter.ai/api/v1",
-)
+
+async def _close_llm_client() -> None:
+    """Closes the shared LLM client and its connection pool, if it was ever created."""
+    global client
+    if client is not None:
+        await client.close()
+        client = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Loading the encoding may download its files, which must not block the event loop on the first request;
+    # tokens are only counted for token-budget chunking and the token quota, so otherwise it is never loaded
+    if CHUNKING_MODE == "tokens" or llm_rate_limiter.token_bucket is not None:
+        await asyncio.to_thread(_get_tokenizer)
+    await _start_job_workers()
+    yield
+    await _stop_job_workers()
+    await _close_llm_client()
+    _close_scene_cache()
+    _close_document_store()
+    _close_job_store()
+
+
+app = FastAPI(title="Text Chunker", description="Split fiction text into singular scenes", lifespan=lifespan)
 
 DEFAULT_MODEL = "google/gemini-2.5-flash-preview-05-20"
 # Configuration for large text processing
 TARGET_CHUNK_SIZE_WORDS = 5000  # Target words for major chunks
 WORD_COUNT_SLACK = 500      # How many words +/- to look for a natural break
 MIN_CHUNK_SIZE_WORDS = 1000   # Minimum size for a chunk to be processed
+# Prefer chapter headings and section separators ("Capitolo 3", "Chapter IV", "***") as chunk boundaries when one
+# falls within the slack; such boundaries are scene cuts by construction and skip the LLM boundary merge
+CHAPTER_AWARE_CHUNKING = os.getenv("CHAPTER_AWARE_CHUNKING", "1") == "1"
+MAX_CONCURRENT_CHUNKS = int(os.getenv("MAX_CONCURRENT_CHUNKS", "4"))  # Major chunks sent to the LLM in parallel (1 = sequential)
+# Global budget shared by every document of every /split-scenes/batch request, handed out round-robin between documents
+BATCH_MAX_CONCURRENT_CHUNKS = int(os.getenv("BATCH_MAX_CONCURRENT_CHUNKS", "8"))
+# "words": chunks of TARGET_CHUNK_SIZE_WORDS words (original behaviour)
+# "tokens": chunks packed up to the token budget of DEFAULT_MODEL, see _chunk_token_budget
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "words")
+# (context window, max output tokens) per model; unknown models get the conservative default
+MODEL_TOKEN_LIMITS: Dict[str, Tuple[int, int]] = {
+    "google/gemini-2.5-flash-preview-05-20": (1_048_576, 65_536),
+    "google/gemini-2.5-pro-preview": (1_048_576, 65_536),
+    "openai/gpt-4o": (128_000, 16_384),
+    "openai/gpt-4o-mini": (128_000, 16_384),
+    "openai/gpt-4.1-mini": (1_047_576, 32_768),
+}
+DEFAULT_MODEL_TOKEN_LIMITS = (128_000, 8_192)
+# Expected size of the extraction output: one scene of structured JSON for roughly every
+# SOURCE_TOKENS_PER_SCENE tokens of input text
+OUTPUT_TOKENS_PER_SCENE = int(os.getenv("OUTPUT_TOKENS_PER_SCENE", "300"))
+SOURCE_TOKENS_PER_SCENE = int(os.getenv("SOURCE_TOKENS_PER_SCENE", "1500"))
+TOKEN_BUDGET_SAFETY_FACTOR = float(os.getenv("TOKEN_BUDGET_SAFETY_FACTOR", "0.8"))  # Headroom for tokenizer mismatch and verbose outputs
+# Cap on the chunk budget (0 = model limits only). Larger chunks mean fewer seams to reconcile and less prompt
+# overhead, but fewer chunks to extract in parallel, and each call must generate all of its chunk's scenes in one
+# response within LLM_READ_TIMEOUT_SECONDS. With a 1M-token context the model limits alone allow ~260k tokens,
+# a whole novel in one call; 16k tokens (~3k output tokens) still splits a 100k-word novel into ~10 chunks.
+MAX_CHUNK_TOKENS = int(os.getenv("MAX_CHUNK_TOKENS", "16000"))
+TOKEN_BUDGET_SLACK_FRACTION = 0.1  # How far below the budget to look for a natural break
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")  # tiktoken encoding for models tiktoken doesn't know
+MESSAGE_OVERHEAD_TOKENS = 16  # Chat formatting tokens around the system and user messages
+# "sequential": resolve each chunk boundary after the previous one (original behaviour)
+# "parallel": decide all boundaries concurrently once extraction is done, then apply merges in order
+# "batched": like "parallel", but one LLM call decides every boundary (per-boundary calls as fallback)
+# "overlap": each chunk is extracted with CHUNK_OVERLAP_WORDS of the previous chunk in front of it, and the scenes
+#            seen by both are reconciled locally from their source offsets, with no boundary or merge LLM calls
+# The streaming pipeline (/split-scenes/stream, /jobs, /split-scenes/batch without document_id) supports "sequential"
+# and "overlap"; under "parallel" or "batched" it resolves boundaries one at a time, as in "sequential"
+BOUNDARY_MERGE_MODE = os.getenv("BOUNDARY_MERGE_MODE", "sequential")
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", "500"))
+OVERLAP_MATCH_TOLERANCE_CHARS = 300  # Scene starts this close in two overlapping chunks are the same scene boundary
+MAX_CONCURRENT_BOUNDARY_CHECKS = int(os.getenv("MAX_CONCURRENT_BOUNDARY_CHECKS", "16"))
+# Local pre-filter for boundary checks: scene pairs scoring below the "no" threshold are kept separate and
+# pairs scoring at or above the "yes" threshold are merged without asking the LLM whether to merge.
+# Set BOUNDARY_PREFILTER_NO_THRESHOLD=0 and BOUNDARY_PREFILTER_YES_THRESHOLD=2 to always ask the LLM.
+BOUNDARY_PREFILTER_NO_THRESHOLD = float(os.getenv("BOUNDARY_PREFILTER_NO_THRESHOLD", "0.05"))
+BOUNDARY_PREFILTER_YES_THRESHOLD = float(os.getenv("BOUNDARY_PREFILTER_YES_THRESHOLD", "0.8"))
+# Weights of the scene fields in the similarity score; characters matter most for scene continuity
+BOUNDARY_PREFILTER_FIELD_WEIGHTS = {"personaggi": 0.4, "ambientazione": 0.3, "azione_in_corso": 0.3}
+
+# Scene-extraction cache: set SCENE_CACHE_PATH to an empty string to disable it
+SCENE_CACHE_PATH = os.getenv("SCENE_CACHE_PATH", str(Path(__file__).parent.parent / ".cache" / "scene_cache.sqlite3"))
+SCENE_CACHE_MAX_BYTES = int(os.getenv("SCENE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # LRU-evicted above this size
+# Bump whenever the scene-extraction prompt or Scene schema changes, so stale cache entries are never served
+SCENE_PROMPT_VERSION = "2"
+SCENE_EXTRACTION_SYSTEM_MESSAGE = "You are a literary analyst expert at identifying scene boundaries in fiction."
+# Follow-up requests for the remaining scenes when an extraction output is cut off at the output limit
+MAX_CONTINUATION_REQUESTS = int(os.getenv("MAX_CONTINUATION_REQUESTS", "3"))
+# Per-document state for incremental re-chunking (chunk boundaries, chunk hashes, seam decisions)
+DOCUMENT_STORE_PATH = os.getenv("DOCUMENT_STORE_PATH", str(Path(__file__).parent.parent / ".cache" / "documents.sqlite3"))
+# Background jobs (POST /jobs/split-scenes): state is persisted here so queued and running jobs survive a restart;
+# set JOB_STORE_PATH to an empty string to keep jobs in memory only
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", str(Path(__file__).parent.parent / ".cache" / "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Jobs processed at once, each with up to MAX_CONCURRENT_CHUNKS chunks in flight
+JOB_PARTIAL_SAVE_INTERVAL_SECONDS = 2.0  # How often a running job's partial scenes are written to the job store
+# Done and failed jobs, with their input text and result, are deleted this long after they finished (0 = kept forever)
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
 
 class TextInput(BaseModel):
     text: str
+    # When set, chunk boundaries and results are stored under this id and a re-submission
+    # of the same document only re-extracts the chunks that changed
+    document_id: Optional[str] = None
 
 
 class Scene(BaseModel):
@@ -35,47 +266,760 @@ class Scene(BaseModel):
     ambientazione: str
     mood_vibe: str
     azione_in_corso: str
+    # The first words of the scene, quoted by the LLM, used to anchor it in the source text
+    citazione_iniziale: Optional[str] = None
+    # Approximate span of the scene in the submitted text and the chunk it was extracted from,
+    # filled in by the chunker; full_text[start_char:end_char] is the scene's source text
+    start_char: Optional[int] = None
+    end_char: Optional[int] = None
+    chunk_index: Optional[int] = None
+
+
+# Scene fields that describe where a scene is rather than what it is
+SCENE_LOCATION_FIELDS = {"start_char", "end_char", "chunk_index"}
 
 
 class ScenesResponse(BaseModel):
     scenes: List[Scene]
+    # Set when the extraction degraded (a failed continuation, dropped items), so the result is never reused;
+    # internal only, not part of the response body
+    partial: bool = Field(default=False, exclude=True)
 
 
-async def _call_llm(
-    current_client: OpenAI,
+class BatchTextInput(BaseModel):
+    documents: List[TextInput]
+
+
+class SceneCache:
+    """
+    Persistent, content-addressed cache of validated scene lists, stored in SQLite.
+    Entries are evicted least-recently-used first once their total size exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Accessed from worker threads (see asyncio.to_thread callers), serialized by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scenes ("
+            "key TEXT PRIMARY KEY, scenes_json TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scenes_last_access ON scenes (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str, system_message: str, prompt_version: str) -> str:
+        """Content hash of everything that determines the LLM's scene extraction for a chunk."""
+        hasher = hashlib.sha256()
+        for part in (prompt_version, model, system_message, text):
+            hasher.update(part.encode("utf-8"))
+            hasher.update(b"\x00")
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Scene]]:
+        with self._lock:
+            row = self._conn.execute("SELECT scenes_json FROM scenes WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE scenes SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return [Scene(**scene_data) for scene_data in json.loads(row[0])]
+
+    def put(self, key: str, scenes: List[Scene]) -> None:
+        scenes_json = json.dumps([scene.model_dump() for scene in scenes], ensure_ascii=False)
+        size = len(scenes_json.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scenes (key, scenes_json, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, scenes_json, size, time.time()),
+            )
+            self._evict_over_budget()
+            self._conn.commit()
+
+    def _evict_over_budget(self) -> None:
+        total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM scenes").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM scenes ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM scenes WHERE key = ?", (key,))
+            self.evictions += 1
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scenes").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+scene_cache: Optional[SceneCache] = None
+
+
+def _get_scene_cache() -> Optional[SceneCache]:
+    """Returns the process-wide scene cache, opening it on first use; None when caching is disabled."""
+    global scene_cache
+    if scene_cache is None and SCENE_CACHE_PATH:
+        scene_cache = SceneCache(SCENE_CACHE_PATH, SCENE_CACHE_MAX_BYTES)
+    return scene_cache
+
+
+def _close_scene_cache() -> None:
+    global scene_cache
+    if scene_cache is not None:
+        scene_cache.close()
+        scene_cache = None
+
+
+class StoredChunk(BaseModel):
+    start_char: int
+    end_char: int
+    text_hash: str
+    scenes: List[Scene]
+    # False when the chunk's extraction was partial (see ScenesResponse.partial), so the next run redoes it
+    complete: bool = True
+
+
+class DocumentState(BaseModel):
+    text_length: int
+    chunks: List[StoredChunk]
+    # Seam key (hash of the two scenes compared) -> merged scene, or None when they were kept separate
+    seam_decisions: Dict[str, Optional[Scene]] = {}
+
+
+class DocumentStore:
+    """
+    Persistent per-document state from the last run, stored in SQLite: the chunk spans with a content
+    hash and the extracted scenes of each chunk, plus the boundary merge decision taken at each seam.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Accessed from worker threads (see asyncio.to_thread callers), serialized by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, text_length INTEGER NOT NULL, state_json TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, document_id: str) -> Optional[DocumentState]:
+        with self._lock:
+            row = self._conn.execute("SELECT state_json FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return DocumentState.model_validate_json(row[0]) if row else None
+
+    def save(self, document_id: str, state: DocumentState) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, text_length, state_json, updated_at) VALUES (?, ?, ?, ?)",
+                (document_id, state.text_length, state.model_dump_json(), time.time()),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+document_store: Optional[DocumentStore] = None
+
+
+def _get_document_store() -> Optional[DocumentStore]:
+    """Returns the process-wide document store, opening it on first use; None when incremental mode is disabled."""
+    global document_store
+    if document_store is None and DOCUMENT_STORE_PATH:
+        document_store = DocumentStore(DOCUMENT_STORE_PATH)
+    return document_store
+
+
+def _close_document_store() -> None:
+    global document_store
+    if document_store is not None:
+        document_store.close()
+        document_store = None
+
+
+class JobState(BaseModel):
+    job_id: str
+    status: str # "queued", "running", "done" or "failed"
+    created_at: float
+    updated_at: float
+    partial_scenes: List[Scene] = [] # Scenes whose position is already final, while the job is running
+    result: Optional[ScenesResponse] = None
+    error: Optional[str] = None
+
+
+class JobStore:
+    """
+    Persistent state of background scene-splitting jobs, stored in SQLite next to each job's input,
+    so jobs that were queued or running when the server stopped can be picked up again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Accessed from worker threads (see asyncio.to_thread callers), serialized by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, input_json TEXT NOT NULL, state_json TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def create(self, input_data: TextInput) -> JobState:
+        now = time.time()
+        state = JobState(job_id=uuid.uuid4().hex, status="queued", created_at=now, updated_at=now)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, input_json, state_json, created_at) VALUES (?, ?, ?, ?, ?)",
+                (state.job_id, state.status, input_data.model_dump_json(), state.model_dump_json(), now),
+            )
+            self._conn.commit()
+        return state
+
+    def load(self, job_id: str) -> Optional[JobState]:
+        with self._lock:
+            row = self._conn.execute("SELECT state_json FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return JobState.model_validate_json(row[0]) if row else None
+
+    def load_input(self, job_id: str) -> Optional[TextInput]:
+        with self._lock:
+            row = self._conn.execute("SELECT input_json FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return TextInput.model_validate_json(row[0]) if row else None
+
+    def save(self, state: JobState) -> None:
+        state.updated_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, state_json = ? WHERE job_id = ?",
+                (state.status, state.model_dump_json(), state.job_id),
+            )
+            self._conn.commit()
+
+    def unfinished_job_ids(self) -> List[str]:
+        """Ids of the jobs still queued or running, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_finished_before(self, cutoff: float) -> int:
+        """Deletes the done and failed jobs last updated before cutoff (a time.time() value); returns how many."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND json_extract(state_json, '$.updated_at') < ?",
+                (cutoff,),
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+job_store: Optional[JobStore] = None
+
+
+def _get_job_store() -> JobStore:
+    """Returns the process-wide job store, opening it on first use."""
+    global job_store
+    if job_store is None:
+        job_store = JobStore(JOB_STORE_PATH or ":memory:")
+    return job_store
+
+
+def _close_job_store() -> None:
+    global job_store
+    if job_store is not None:
+        job_store.close()
+        job_store = None
+
+
+class _TokenBucket:
+    """Refills at per_minute / 60 units a second up to per_minute. Reservations may overdraw it into debt."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._refilled_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._refilled_at) * self.capacity / 60)
+        self._refilled_at = now
+
+    def seconds_until(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; requests larger than the bucket wait for a full bucket."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.capacity)
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+
+class LLMThrottledError(HTTPException):
+    """The provider kept rate limiting or failing a call beyond the retry budget (see RetryPolicy)."""
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=503, detail=detail)
+
+
+class AdaptiveRateLimiter:
+    """
+    Gate in front of every LLM call. Calls wait for a request and its estimated tokens from the per-minute
+    token buckets, and for one of concurrency_limit slots. The limit follows AIMD: it grows by
+    LLM_CONCURRENCY_INCREASE over each window of successful calls and is multiplied by
+    LLM_CONCURRENCY_DECREASE_FACTOR on a 429 or 5xx, at most once per window of calls in flight.
+    A throttled call also pauses all calls until its Retry-After has passed.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, initial_concurrency: int, min_concurrency: int, max_concurrency: int):
+        self.request_bucket = _TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = _TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.concurrency_limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self._last_decrease_at = 0.0
+        self._slot_waiters: "deque[asyncio.Future]" = deque()
+        self.counters = {"calls": 0, "succeeded": 0, "throttled": 0, "retry_after_honoured": 0, "concurrency_decreases": 0}
+
+    def _wait_seconds(self, estimated_tokens: int) -> Optional[float]:
+        """0 when a call may start now, seconds to sleep when it must wait for time to pass, None when for a free slot."""
+        now = time.monotonic()
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+        if self._in_flight >= int(self.concurrency_limit):
+            return None
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.seconds_until(1, now))
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.seconds_until(estimated_tokens, now))
+        return wait
+
+    def _wake_slot_waiters(self) -> None:
+        free_slots = int(self.concurrency_limit) - self._in_flight
+        while self._slot_waiters and free_slots > 0:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        while True:
+            wait = self._wait_seconds(estimated_tokens)
+            if wait == 0:
+                break
+            if wait is not None:
+                await asyncio.sleep(wait)
+                continue
+            waiter = asyncio.get_running_loop().create_future()
+            self._slot_waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._slot_waiters:
+                    self._slot_waiters.remove(waiter)
+                else:
+                    self._wake_slot_waiters() # Pass the slot this waiter was woken for on to the next one
+                raise
+        now = time.monotonic()
+        if self.request_bucket is not None:
+            self.request_bucket.take(1, now)
+        if self.token_bucket is not None:
+            self.token_bucket.take(estimated_tokens, now)
+        self._in_flight += 1
+        self.counters["calls"] += 1
+
+    def record_success(self, output_tokens: int) -> None:
+        self.counters["succeeded"] += 1
+        if self.token_bucket is not None:
+            self.token_bucket.take(output_tokens, time.monotonic())
+        self.concurrency_limit = min(float(self.max_concurrency), self.concurrency_limit + LLM_CONCURRENCY_INCREASE / self.concurrency_limit)
+
+    def record_throttle(self, started_at: float, cooldown_seconds: float, from_retry_after: bool) -> None:
+        now = time.monotonic()
+        self.counters["throttled"] += 1
+        if from_retry_after:
+            self.counters["retry_after_honoured"] += 1
+        self._cooldown_until = max(self._cooldown_until, now + cooldown_seconds)
+        # The other calls in flight when the limit was cut were sent at the old rate, so their 429s don't count again
+        if started_at >= self._last_decrease_at:
+            self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit * LLM_CONCURRENCY_DECREASE_FACTOR)
+            self._last_decrease_at = now
+            self.counters["concurrency_decreases"] += 1
+
+    def cooldown_seconds_left(self) -> float:
+        return max(0.0, self._cooldown_until - time.monotonic())
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[float]:
+        """Holds one call slot for the duration of the block; yields the monotonic time the call started."""
+        await self._acquire(estimated_tokens)
+        try:
+            yield time.monotonic()
+        finally:
+            self._in_flight -= 1
+            self._wake_slot_waiters()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "concurrency_limit": round(self.concurrency_limit, 2),
+            "in_flight": self._in_flight,
+            "waiting_for_slot": len(self._slot_waiters),
+            "cooldown_seconds_left": round(self.cooldown_seconds_left(), 2),
+            "requests_per_minute": int(self.request_bucket.capacity) if self.request_bucket else None,
+            "tokens_per_minute": int(self.token_bucket.capacity) if self.token_bucket else None,
+        }
+
+
+llm_rate_limiter = AdaptiveRateLimiter(
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_INITIAL_CONCURRENCY, LLM_MIN_CONCURRENCY, LLM_MAX_CONCURRENCY
+)
+
+
+class RetryPolicy:
+    """
+    How an LLM call is retried. Transient failures wait an exponential backoff with "equal jitter": attempt n
+    waits between half and all of base_delay * 2**n, capped at max_delay, so calls that failed together
+    don't retry together. 429s follow the provider's Retry-After when it sends one and are bounded by
+    max_throttle_wait_seconds rather than by max_attempts, since under AIMD they are part of normal operation.
+    """
+
+    def __init__(self, max_attempts: int, base_delay_seconds: float, max_delay_seconds: float, max_throttle_wait_seconds: float):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_throttle_wait_seconds = max_throttle_wait_seconds
+
+    def backoff_seconds(self, attempt: int) -> float:
+        ceiling = min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt)
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy(LLM_RETRY_MAX_ATTEMPTS, LLM_RETRY_BASE_DELAY_SECONDS, LLM_RETRY_MAX_DELAY_SECONDS, LLM_THROTTLE_MAX_WAIT_SECONDS)
+
+
+class Histogram:
+    """Histogram over fixed bucket bounds (by default LLM call latencies), exported to /metrics as cumulative buckets."""
+
+    def __init__(self, bucket_bounds: Tuple[float, ...] = LLM_LATENCY_BUCKETS_SECONDS):
+        self.bucket_bounds = bucket_bounds
+        self.bucket_counts = [0] * (len(bucket_bounds) + 1) # The last bucket is everything above the largest bound
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.bucket_bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+# "request": one HTTP request to the provider, from when it got a rate limiter slot until its answer
+# (whole calls, with queueing, retries and hedges, are in llm_call_type_histograms)
+llm_latency_histograms: Dict[str, Histogram] = {"request": Histogram()}
+llm_call_stats = {"calls": 0, "retries": 0, "hedges_sent": 0, "hedges_won": 0}
+# Per call type ("extract", "fixer", "boundary", "merge"): latency of whole calls, and tokens in and out as reported by the provider
+llm_call_type_histograms: Dict[str, Histogram] = {}
+llm_call_type_tokens: Dict[str, Dict[str, int]] = {}
+
+
+def _is_throttling_error(error: Exception) -> bool:
+    """A 429 or a 5xx: the provider is overloaded, so it should get fewer concurrent calls."""
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """Failures worth retrying as is: dropped connections, timeouts (a subclass), 408, 409, 429 and 5xx."""
+    return isinstance(error, APIConnectionError) or _is_throttling_error(error) or (
+        isinstance(error, APIStatusError) and error.status_code in (408, 409)
+    )
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """The wait the provider asked for in Retry-After (seconds or an HTTP date) or retry-after-ms, if any."""
+    headers = error.response.headers if isinstance(error, APIStatusError) else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            if retry_after.strip().isdigit():
+                return float(retry_after)
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+async def _send_llm_request(
+    current_client: AsyncOpenAI,
+    messages: List[Dict[str, str]],
+    model: str,
+    estimated_tokens: int,
+    throttle_cooldown_seconds: float,
+    sent: Optional[asyncio.Event] = None
+) -> Any:
+    """
+    One rate-limited request to the provider. A 429 or 5xx is reported to llm_rate_limiter, which pauses
+    all calls for Retry-After, or for throttle_cooldown_seconds if the provider didn't send one.
+    Sets sent once the request is past the rate limiter.
+    """
+    async with llm_rate_limiter.slot(estimated_tokens) as started_at:
+        if sent is not None:
+            sent.set()
+        try:
+            response = await current_client.chat.completions.create(model=model, messages=messages)
+        except Exception as e:
+            if _is_throttling_error(e):
+                retry_after = _retry_after_seconds(e)
+                llm_rate_limiter.record_throttle(started_at, retry_after if retry_after is not None else throttle_cooldown_seconds, retry_after is not None)
+            raise
+        llm_latency_histograms["request"].observe(time.monotonic() - started_at)
+        llm_rate_limiter.record_success((response.usage.completion_tokens or 0) if response.usage else 0)
+        return response
+
+
+async def _send_hedged_llm_request(
+    current_client: AsyncOpenAI,
+    messages: List[Dict[str, str]],
+    model: str,
+    estimated_tokens: int,
+    throttle_cooldown_seconds: float
+) -> Any:
+    """
+    Sends the request and, if it hasn't been answered LLM_HEDGE_AFTER_SECONDS after it was sent, a duplicate.
+    Returns the first successful answer and cancels the other; raises the first request's error if both fail.
+    """
+    if LLM_HEDGE_AFTER_SECONDS <= 0:
+        return await _send_llm_request(current_client, messages, model, estimated_tokens, throttle_cooldown_seconds)
+
+    sent = asyncio.Event()
+    primary = asyncio.create_task(_send_llm_request(current_client, messages, model, estimated_tokens, throttle_cooldown_seconds, sent))
+    hedge: Optional[asyncio.Task] = None
+    sent_wait = asyncio.create_task(sent.wait())
+    try:
+        # The hedge timer starts once the request is sent, not while it queues in the rate limiter
+        await asyncio.wait({primary, sent_wait}, return_when=asyncio.FIRST_COMPLETED)
+        done, _ = await asyncio.wait({primary}, timeout=LLM_HEDGE_AFTER_SECONDS)
+        if done:
+            return primary.result()
+        llm_call_stats["hedges_sent"] += 1
+        llm_log.info("LLM request unanswered after %.1fs, sending a hedged duplicate", LLM_HEDGE_AFTER_SECONDS)
+        hedge = asyncio.create_task(_send_llm_request(current_client, messages, model, estimated_tokens, throttle_cooldown_seconds))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # In request order, so the hedge only counts as the winner when it answered strictly first
+            for task in (primary, hedge):
+                if task in done and task.exception() is None:
+                    if task is hedge:
+                        llm_call_stats["hedges_won"] += 1
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in (primary, hedge, sent_wait):
+            if task is not None:
+                task.cancel()
+
+
+async def _call_llm_with_finish_reason(
+    current_client: AsyncOpenAI,
     prompt_content: str,
     system_message: str,
-    model: str
-) -> str:
-    """Helper function to make an API call to the LLM."""
-    response = await asyncio.to_thread( # Use asyncio.to_thread for blocking I/O
-        current_client.chat.completions.create,
-        model=model,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt_content},
-        ]
-    )
+    model: str,
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    call_type: str = "other"
+) -> Tuple[str, Optional[str]]:
+    """
+    Makes an API call to the LLM, returning its content and finish reason ("length" when the output was cut off).
+    Requests go through llm_rate_limiter, optionally hedged, and transient failures are retried per retry_policy;
+    a call that still fails after that raises LLMThrottledError.
+    """
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt_content},
+    ]
+    estimated_tokens = 0
+    if llm_rate_limiter.token_bucket is not None:
+        estimated_tokens = _count_tokens(prompt_content) + _count_tokens(system_message) + MESSAGE_OVERHEAD_TOKENS
+    call_started_at = time.monotonic()
+    give_up_at = call_started_at + retry_policy.max_throttle_wait_seconds
+    llm_call_stats["calls"] += 1
+    attempt = 0
+    failed_attempts = 0 # Failures other than 429s, which are bounded by give_up_at instead
+    while True:
+        backoff = retry_policy.backoff_seconds(attempt)
+        try:
+            response = await _send_hedged_llm_request(current_client, messages, model, estimated_tokens, backoff)
+            break
+        except Exception as e:
+            if not _is_transient_error(e):
+                raise
+            rate_limited = isinstance(e, APIStatusError) and e.status_code == 429
+            failed_attempts += 0 if rate_limited else 1
+            # A throttle pauses every call in the rate limiter; anything else only backs off this one
+            delay = llm_rate_limiter.cooldown_seconds_left() if _is_throttling_error(e) else backoff
+            if failed_attempts >= retry_policy.max_attempts or time.monotonic() + delay > give_up_at:
+                raise LLMThrottledError(f"LLM call still failing after {attempt + 1} attempts in {time.monotonic() - call_started_at:.0f}s: {str(e)}")
+            llm_log.warning("LLM call failed (%s), retry %s in %.1fs (concurrency limit %.1f)", str(e)[:200], attempt + 1, delay, llm_rate_limiter.concurrency_limit)
+            llm_call_stats["retries"] += 1
+            attempt += 1
+            if not _is_throttling_error(e):
+                await asyncio.sleep(delay)
+    call_seconds = time.monotonic() - call_started_at
+    llm_call_type_histograms.setdefault(call_type, Histogram()).observe(call_seconds)
+    if response.usage is not None:
+        call_type_tokens = llm_call_type_tokens.setdefault(call_type, {"input": 0, "output": 0})
+        call_type_tokens["input"] += response.usage.prompt_tokens or 0
+        call_type_tokens["output"] += response.usage.completion_tokens or 0
     content = response.choices[0].message.content
     if content is None:
         raise HTTPException(status_code=500, detail="LLM response content is empty.")
+    return content, response.choices[0].finish_reason
+
+
+async def _call_llm(
+    current_client: AsyncOpenAI,
+    prompt_content: str,
+    system_message: str,
+    model: str,
+    call_type: str = "other"
+) -> str:
+    """Helper function to make an API call to the LLM."""
+    content, _ = await _call_llm_with_finish_reason(current_client, prompt_content, system_message, model, call_type=call_type)
     return content
 
 
+def _scan_json_array(content: str, start: int) -> Tuple[Optional[int], List[int]]:
+    """
+    Walks the JSON array opening at content[start], skipping brackets inside strings. Returns the offset just
+    past its closing bracket (None if it never closes) and the offsets just past each complete top-level object.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    item_ends: List[int] = []
+    for i in range(start, len(content)):
+        ch = content[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "[{":
+            depth += 1
+        elif ch in "]}":
+            depth -= 1
+            if depth == 0:
+                return i + 1, item_ends
+            if depth == 1 and ch == "}":
+                item_ends.append(i + 1)
+    return None, item_ends
+
+
+def _find_json_array_start(content: str) -> Optional[int]:
+    """
+    Offset of the '[' most likely to open the payload array: the first one followed by an object, else the
+    first empty array, else the first '['. An empty "[]" mentioned in prose before the payload is skipped.
+    """
+    for array_start_pattern in (r"\[\s*\{", r"\[\s*\]"):
+        array_start = re.search(array_start_pattern, content)
+        if array_start:
+            return array_start.start()
+    first_bracket = content.find("[")
+    return first_bracket if first_bracket >= 0 else None
+
+
 def _get_json_payload_from_llm_content(llm_content: str) -> str:
-    """Extracts the JSON array string from the LLM's raw text output."""
-    json_match = re.search(r"\[.*\]", llm_content, re.DOTALL)
-    if json_match:
-        return json_match.group(0)
-    # Fallback: assume the entire content is the JSON payload if no specific array is found
-    return llm_content
+    """
+    Extracts the JSON array string from the LLM's raw text output by bracket matching, so brackets in
+    surrounding prose or inside string values can't widen the match. An array that never closes is
+    returned up to the end of the output.
+    """
+    start = _find_json_array_start(llm_content)
+    if start is None:
+        # Fallback: assume the entire content is the JSON payload if no specific array is found
+        return llm_content
+    end, _ = _scan_json_array(llm_content, start)
+    return llm_content[start:end] if end is not None else llm_content[start:]
+
+
+class InvalidSceneItemsError(ValueError):
+    """
+    Raised when a payload is a valid JSON array but some of its items fail Scene validation.
+    Keeps the items that did validate, so only the failing ones need fixing.
+    """
+
+    def __init__(self, scene_items: List[Any], validated_scenes: List[Optional[Scene]], item_errors: Dict[int, Any]):
+        self.scene_items = scene_items
+        self.validated_scenes = validated_scenes # None at the index of every failing item
+        self.item_errors = item_errors
+        super().__init__(
+            f"{len(item_errors)} of {len(scene_items)} scene items failed validation: "
+            + "; ".join(f"item {i}: {errors}" for i, errors in item_errors.items())
+        )
+
+
+def _validate_scene_item(scene_item: Any) -> Tuple[Optional[Scene], Any]:
+    """Validates one array item as a Scene. Returns (scene, None), or (None, the validation errors)."""
+    if not isinstance(scene_item, dict):
+        return None, f"Item is not a dictionary (got {type(scene_item).__name__})."
+    try:
+        return Scene(**scene_item), None
+    except ValidationError as e:
+        return None, e.errors(include_url=False)
+
+
+# Compiled once: parses and validates a whole scene array in a single pass in pydantic-core
+_SCENE_LIST_ADAPTER = TypeAdapter(List[Scene])
 
 
 def _parse_and_validate_scenes(json_payload: str) -> List[Scene]:
     """
     Parses a JSON string and validates it into a list of Scene objects.
-    Raises json.JSONDecodeError, ValueError, or pydantic.ValidationError on failure.
+    Raises json.JSONDecodeError, ValueError, or InvalidSceneItemsError (a ValueError) if some items don't validate.
     """
+    try:
+        return _SCENE_LIST_ADAPTER.validate_json(json_payload)
+    except ValidationError:
+        pass # Re-parse item by item below, to report errors the same way and keep the valid items
+
     # Can raise json.JSONDecodeError if json_payload is not valid JSON
     scenes_data = json.loads(json_payload)
 
@@ -83,19 +1027,132 @@ def _parse_and_validate_scenes(json_payload: str) -> List[Scene]:
     if not isinstance(scenes_data, list):
         raise ValueError(f"Expected a JSON list/array, but got {type(scenes_data).__name__}. Payload preview: {json_payload[:200]}...")
 
-    validated_scenes: List[Scene] = []
+    validated_scenes: List[Optional[Scene]] = []
+    item_errors: Dict[int, Any] = {}
+    for i, scene_item in enumerate(scenes_data):
+        scene, errors = _validate_scene_item(scene_item)
+        validated_scenes.append(scene)
+        if errors is not None:
+            item_errors[i] = errors
+    if item_errors:
+        raise InvalidSceneItemsError(scenes_data, validated_scenes, item_errors)
+    return validated_scenes
+
+
+def _strip_code_fences(content: str) -> str:
+    """Keeps only the body of the first markdown code fence, if there is one."""
+    fenced = re.search(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", content, re.DOTALL)
+    return fenced.group(1) if fenced else content
+
+
+def _normalize_smart_quotes(content: str) -> str:
+    """Turns typographic double quotes used as JSON string delimiters into plain ones; quotes inside values are kept."""
+    repaired: List[str] = []
+    in_string = False
+    opened_with_smart_quote = False
+    escaped = False
+    for ch in content:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"' or (opened_with_smart_quote and ch in "“”"):
+                ch = '"'
+                in_string = False
+        elif ch in '"“”„':
+            opened_with_smart_quote = ch != '"'
+            ch = '"'
+            in_string = True
+        repaired.append(ch)
+    return "".join(repaired)
+
+
+def _remove_trailing_commas(content: str) -> str:
+    """Drops commas directly before a closing bracket or brace, outside of strings."""
+    repaired: List[str] = []
+    in_string = False
+    escaped = False
+    for ch in content:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "]}":
+            # Backtrack over whitespace to a dangling comma
+            j = len(repaired) - 1
+            while j >= 0 and repaired[j].isspace():
+                j -= 1
+            if j >= 0 and repaired[j] == ",":
+                del repaired[j]
+        repaired.append(ch)
+    return "".join(repaired)
+
+
+def _close_truncated_array(content: str) -> str:
+    """Cuts an array that was cut off mid-output back to its last complete object and closes it."""
+    start = _find_json_array_start(content)
+    if start is None:
+        return content
+    end, item_ends = _scan_json_array(content, start)
+    if end is not None or not item_ends:
+        return content
+    return content[start:item_ends[-1]] + "]"
+
+
+# Deterministic repairs tried in order, each on top of the previous ones, before asking the LLM fixer
+JSON_REPAIRS = [
+    ("code_fences", _strip_code_fences),
+    ("smart_quotes", _normalize_smart_quotes),
+    ("trailing_commas", _remove_trailing_commas),
+    ("truncated_array", _close_truncated_array),
+]
+# How each LLM output was parsed: as is, by the local repair that made it valid, or by escalating to the LLM fixer
+json_repair_stats = {"parsed_without_repair": 0, **{name: 0 for name, _ in JSON_REPAIRS}, "escalated_to_llm_fixer": 0}
+# LLM fixer calls: "items" re-validates only the failing scene items, "full" re-extracts the whole chunk
+fixer_invocation_stats = {"items": 0, "full": 0}
+
+
+def _parse_scenes_with_local_repair(llm_content: str) -> Tuple[List[Scene], str]:
+    """
+    Parses and validates the scenes in an LLM output, applying the local JSON repairs in order until one
+    makes it valid. Returns the scenes and the payload that validated. Raises InvalidSceneItemsError as soon
+    as the payload parses but some items don't validate; if no repair helps, raises the error of the
+    unrepaired payload (json.JSONDecodeError or ValueError).
+    """
+    json_payload = _get_json_payload_from_llm_content(llm_content)
     try:
-        # This can raise pydantic.ValidationError if items don't match Scene model,
-        # or TypeError if an item in scenes_data is not a mapping (dict) for ** unpacking.
-        for i, scene_item in enumerate(scenes_data):
-            if not isinstance(scene_item, dict):
-                raise ValueError(f"Item at index {i} in JSON array is not a dictionary (got {type(scene_item).__name__}). Payload preview: {json_payload[:200]}...")
-            validated_scenes.append(Scene(**scene_item))
-        return validated_scenes
-    except TypeError as e:
-        # Convert TypeError (e.g. from ** non-dict) to a ValueError for consistent handling
-        raise ValueError(f"Error during scene model instantiation, possibly due to non-dict item: {str(e)}. Payload preview: {json_payload[:200]}...")
-    # pydantic.ValidationError will propagate naturally if Scene(**scene_item) fails.
+        scenes = _parse_and_validate_scenes(json_payload)
+        json_repair_stats["parsed_without_repair"] += 1
+        return scenes, json_payload
+    except InvalidSceneItemsError:
+        raise # Well-formed JSON: the failing items are salvaged one by one instead
+    except (json.JSONDecodeError, ValueError) as e_unrepaired:
+        original_error = e_unrepaired
+
+    repaired_content = llm_content
+    for repair_name, repair in JSON_REPAIRS:
+        candidate_content = repair(repaired_content)
+        if candidate_content == repaired_content:
+            continue
+        repaired_content = candidate_content
+        repaired_payload = _get_json_payload_from_llm_content(repaired_content)
+        try:
+            scenes = _parse_and_validate_scenes(repaired_payload)
+        except InvalidSceneItemsError:
+            extract_log.info("Local JSON repair '%s' made the output parseable, but some scene items are invalid", repair_name)
+            raise
+        except (json.JSONDecodeError, ValueError):
+            continue
+        json_repair_stats[repair_name] += 1
+        extract_log.info("Local JSON repair '%s' made the output valid, no fixer call needed", repair_name)
+        return scenes, repaired_payload
+    raise original_error
 
 
 def _build_fixer_prompt(original_text: str, malformed_json_payload: str, validation_errors: Any) -> str:
@@ -119,6 +1176,7 @@ Il formato JSON corretto DEVE essere un array di oggetti. Ogni oggetto DEVE cont
 - `ambientazione`
 - `mood_vibe`
 - `azione_in_corso`
+Il campo `citazione_iniziale` (stringa), se presente, va mantenuto così com'è.
 
 Per favore, correggi il JSON malformato per conformarlo rigorosamente a questo schema.
 Restituisci SOLO l'array JSON corretto, senza testo aggiuntivo o spiegazioni.
@@ -126,7 +1184,202 @@ Non inventare informazioni non presenti nel testo originale o nel JSON malformat
 """
 
 async def split_text_into_scenes_logic(text: str) -> ScenesResponse:
-    initial_prompt = f"""
+    """
+    Extracts the scenes of a single chunk, served from the scene cache when the same chunk was seen before.
+    The cache is only an optimization: when it can't be opened, read or written (a database locked by
+    another worker, a full disk, a read-only directory), the chunk is extracted and returned without it.
+    """
+    try:
+        cache = _get_scene_cache()
+    except (sqlite3.Error, OSError) as e:
+        extract_log.warning("Scene cache unavailable (%s), extracting without it", e)
+        cache = None
+    if cache is None:
+        return await _extract_scenes_with_llm(text)
+
+    cache_key = SceneCache.make_key(text, DEFAULT_MODEL, SCENE_EXTRACTION_SYSTEM_MESSAGE, SCENE_PROMPT_VERSION)
+    try:
+        cached_scenes = await asyncio.to_thread(cache.get, cache_key)
+    except (sqlite3.Error, ValueError) as e:
+        extract_log.warning("Scene cache lookup failed (%s), extracting without it", e)
+        cached_scenes = None
+    if cached_scenes is not None:
+        extract_log.debug("Scene cache hit (%s scenes), skipping LLM call", len(cached_scenes))
+        return ScenesResponse(scenes=cached_scenes)
+
+    scene_response = await _extract_scenes_with_llm(text)
+    if scene_response.partial:
+        # Caching it would keep serving the missing scenes' absence until SCENE_PROMPT_VERSION changes
+        extract_log.warning("Extraction was partial (%s scenes), not caching it", len(scene_response.scenes))
+        return scene_response
+    try:
+        await asyncio.to_thread(cache.put, cache_key, scene_response.scenes)
+    except sqlite3.Error as e:
+        extract_log.warning("Could not store the extraction in the scene cache (%s), returning it uncached", e)
+    return scene_response
+
+
+def _is_truncated_scene_output(llm_content: str, finish_reason: Optional[str]) -> bool:
+    """Whether the output hit the model's output limit or its scene array never closes."""
+    if finish_reason == "length":
+        return True
+    start = _find_json_array_start(llm_content)
+    return start is not None and _scan_json_array(llm_content, start)[0] is None
+
+
+def _complete_scenes_in_output(llm_content: str) -> Tuple[List[Scene], bool]:
+    """
+    Valid scenes among the complete objects of a possibly truncated scene array; the cut-off one is dropped.
+    The flag is False when a complete object failed validation and was dropped as well.
+    """
+    start = _find_json_array_start(llm_content)
+    if start is None:
+        return [], False
+    end, item_ends = _scan_json_array(llm_content, start)
+    if end is not None:
+        json_payload = llm_content[start:end]
+    else:
+        json_payload = llm_content[start:item_ends[-1]] + "]" if item_ends else "[]"
+    try:
+        return _parse_and_validate_scenes(_remove_trailing_commas(json_payload)), True
+    except InvalidSceneItemsError as e_items:
+        return [scene for scene in e_items.validated_scenes if scene is not None], False
+    except (json.JSONDecodeError, ValueError):
+        return [], False
+
+
+def _build_scene_continuation_prompt(text: str, last_complete_scene: Scene, scenes_so_far: int) -> str:
+    """Asks the LLM for the scenes after the last complete one of an extraction that was cut off."""
+    return f"""{_build_scene_extraction_prompt(text)}
+Hai già estratto {scenes_so_far} scene da questo testo, ma la risposta precedente è stata interrotta. L'ultima scena completa estratta è:
+{json.dumps(last_complete_scene.model_dump(exclude=SCENE_LOCATION_FIELDS), ensure_ascii=False)}
+
+Continua da quel punto: restituisci SOLO un array JSON con le scene che seguono questa scena nel testo, fino alla fine del testo.
+Non ripetere le scene già estratte. Se non ci sono altre scene, restituisci un array vuoto [].
+"""
+
+
+async def _continue_truncated_extraction(text: str, truncated_llm_content: str) -> Optional[Tuple[List[Scene], bool]]:
+    """
+    Keeps the complete scenes of a cut-off extraction and asks for the rest with continuation requests
+    until an output is no longer cut off. Returns the scenes and whether they cover the whole text, which
+    is False when a continuation failed, couldn't be parsed or dropped invalid items, or the output was
+    still cut off after MAX_CONTINUATION_REQUESTS. Returns None if the truncated output had no complete
+    scene to continue from.
+    """
+    scenes, complete = _complete_scenes_in_output(truncated_llm_content)
+    if not scenes:
+        extract_log.warning("Extraction output was cut off before its first complete scene, no continuation possible")
+        return None
+
+    for continuation_number in range(1, MAX_CONTINUATION_REQUESTS + 1):
+        extract_log.info("Extraction output was cut off after %s complete scenes, requesting continuation %s/%s", len(scenes), continuation_number, MAX_CONTINUATION_REQUESTS)
+        continuation_prompt = _build_scene_continuation_prompt(text, scenes[-1], len(scenes))
+        try:
+            llm_content, finish_reason = await _call_llm_with_finish_reason(_get_llm_client(), continuation_prompt, SCENE_EXTRACTION_SYSTEM_MESSAGE, DEFAULT_MODEL, call_type="extract")
+        except LLMThrottledError:
+            raise
+        except Exception as e_continuation:
+            detail = e_continuation.detail if isinstance(e_continuation, HTTPException) else str(e_continuation)
+            extract_log.warning("Continuation request failed (%s), keeping the %s scenes extracted so far.", detail, len(scenes))
+            return scenes, False
+        extract_log.debug("Continuation LLM raw output (first 1000 chars):\n%s", _LazyLogArg(lambda: llm_content[:1000]))
+
+        truncated = _is_truncated_scene_output(llm_content, finish_reason)
+        if truncated:
+            new_scenes, all_items_valid = _complete_scenes_in_output(llm_content)
+            complete = complete and all_items_valid
+        else:
+            try:
+                new_scenes, _ = _parse_scenes_with_local_repair(llm_content)
+            except InvalidSceneItemsError as e_items:
+                new_scenes = [scene for scene in e_items.validated_scenes if scene is not None]
+                complete = False
+            except (json.JSONDecodeError, ValueError) as e_continuation_parse:
+                extract_log.warning("Continuation output could not be parsed (%s), keeping the %s scenes extracted so far.", e_continuation_parse, len(scenes))
+                return scenes, False
+        if new_scenes and new_scenes[0] == scenes[-1]: # The model restated where it was continuing from
+            new_scenes = new_scenes[1:]
+        scenes.extend(new_scenes)
+        if not truncated:
+            return scenes, complete
+        if not new_scenes:
+            extract_log.warning("Continuation was cut off before its first complete scene, keeping %s scenes.", len(scenes))
+            return scenes, False
+    extract_log.warning("Extraction still cut off after %s continuations, keeping %s scenes.", MAX_CONTINUATION_REQUESTS, len(scenes))
+    return scenes, False
+
+
+def _build_scene_items_fixer_prompt(failing_items: List[Any], item_errors: List[Any]) -> str:
+    """Constructs the prompt asking the LLM to correct only the scene items that failed validation."""
+    items_text = "\n\n".join(
+        f"""Oggetto {item_number}:
+{json.dumps(scene_item, ensure_ascii=False)}
+Errori di validazione:
+{errors}"""
+        for item_number, (scene_item, errors) in enumerate(zip(failing_items, item_errors), start=1)
+    )
+    return f"""
+Sei un assistente AI specializzato nella correzione di JSON malformati in base a uno schema Pydantic.
+I seguenti {len(failing_items)} oggetti, estratti da un array di scene, non hanno superato la validazione.
+
+{items_text}
+
+Ogni oggetto DEVE contenere ESATTAMENTE i seguenti campi come stringhe:
+- `elementi_narrativi`
+- `personaggi`
+- `ambientazione`
+- `mood_vibe`
+- `azione_in_corso`
+Il campo `citazione_iniziale` (stringa), se presente, va mantenuto così com'è.
+
+Per favore, correggi ogni oggetto per conformarlo rigorosamente a questo schema.
+Restituisci SOLO un array JSON con i {len(failing_items)} oggetti corretti, nello stesso ordine, senza testo aggiuntivo o spiegazioni.
+Non inventare informazioni non presenti negli oggetti ricevuti; se un campo richiesto non può essere derivato, usa una stringa vuota.
+"""
+
+
+async def _salvage_invalid_scene_items(items_error: InvalidSceneItemsError) -> Tuple[List[Scene], bool]:
+    """
+    Keeps the scenes that validated and asks the LLM to correct only the failing items, splicing the
+    corrections back in their original positions. Items that still fail are dropped. Returns the scenes
+    and whether every item was recovered. Never raises, except LLMThrottledError when the provider keeps
+    rate limiting.
+    """
+    failing_indices = list(items_error.item_errors)
+    failing_items = [items_error.scene_items[i] for i in failing_indices]
+    extract_log.info("Salvaging %s of %s scene items with a small fixer call", len(failing_indices), len(items_error.scene_items))
+    fixer_prompt = _build_scene_items_fixer_prompt(failing_items, [items_error.item_errors[i] for i in failing_indices])
+    system_message_fixer = "You are an AI assistant specialized in correcting malformed JSON based on a Pydantic schema."
+
+    scenes_by_index = list(items_error.validated_scenes)
+    fixer_invocation_stats["items"] += 1
+    llm_content_fixer = ""
+    try:
+        llm_content_fixer = await _call_llm(_get_llm_client(), fixer_prompt, system_message_fixer, DEFAULT_MODEL, call_type="fixer")
+        extract_log.debug("Scene items fixer LLM raw output (first 1000 chars):\n%s", _LazyLogArg(lambda: llm_content_fixer[:1000]))
+        fixed_items = json.loads(_get_json_payload_from_llm_content(llm_content_fixer))
+        if not isinstance(fixed_items, list) or len(fixed_items) != len(failing_items):
+            raise ValueError(f"Expected a JSON array of {len(failing_items)} items, got: {str(llm_content_fixer)[:200]}")
+        for i, fixed_item in zip(failing_indices, fixed_items):
+            scenes_by_index[i], errors = _validate_scene_item(fixed_item)
+            if errors is not None:
+                extract_log.warning("Scene item %s still invalid after the fixer, dropping it: %s", i, errors)
+    except (json.JSONDecodeError, ValueError) as e_items_fixer:
+        extract_log.warning("Scene items fixer output unusable (%s), dropping the %s invalid items.", e_items_fixer, len(failing_indices))
+    except LLMThrottledError:
+        raise
+    except HTTPException as http_e_items_fixer:
+        extract_log.warning("HTTPException during scene items fixer call (%s), dropping the %s invalid items.", http_e_items_fixer.detail, len(failing_indices))
+    except Exception as e_items_unhandled:
+        extract_log.warning("Unexpected error during scene items fixer (%s), dropping the %s invalid items.", e_items_unhandled, len(failing_indices))
+    salvaged_scenes = [scene for scene in scenes_by_index if scene is not None]
+    return salvaged_scenes, len(salvaged_scenes) == len(scenes_by_index)
+
+
+def _build_scene_extraction_prompt(text: str) -> str:
+    """Builds the prompt asking the LLM to split a text into scenes."""
+    return f"""
 Sei un esperto analista letterario e un narratore visivo. Il tuo compito è dividere il seguente testo di narrativa in scene individuali.
 Per ogni scena, immagina di scattare un'istantanea da utilizzare per un servizio di generazione di immagini.
 
@@ -137,8 +1390,9 @@ Una scomposizione dettagliata delle componenti visive e narrative della scena co
     *   `ambientazione`: (stringa) L'ambientazione e l'ambiente (ad esempio, luogo, ora del giorno, tempo atmosferico, dettagli specifici dell'ambiente circostante).
     *   `mood_vibe`: (stringa) L'atmosfera o il mood generale della scena (ad esempio, teso, misterioso, calmo, gioioso). Se non esplicitamente chiaro, puoi dedurlo o indicare 'N/A'.
     *   `azione_in_corso`: (stringa) L'azione principale, l'evento o le pose dei personaggi che si svolgono nella scena.
+    *   `citazione_iniziale`: (stringa) Le prime 8-12 parole con cui la scena inizia nel testo, copiate esattamente, senza modifiche.
 
-Formatta la tua risposta come un array JSON. Ogni oggetto nell'array deve rappresentare una scena e contenere rigorosamente SOLO i seguenti campi: `elementi_narrativi`, `personaggi`, `ambientazione`, `mood_vibe`, e `azione_in_corso`.
+Formatta la tua risposta come un array JSON. Ogni oggetto nell'array deve rappresentare una scena e contenere rigorosamente SOLO i seguenti campi: `elementi_narrativi`, `personaggi`, `ambientazione`, `mood_vibe`, `azione_in_corso` e `citazione_iniziale`.
 
 Testo da analizzare:
 {text}
@@ -148,21 +1402,30 @@ Concentrati sull'estrazione di dettagli visivi e descrittivi per ogni campo spec
 NON includere il testo completo della scena nella tua risposta, ma solo i dati strutturati richiesti.
 """
 
-    system_message_initial = "You are a literary analyst expert at identifying scene boundaries in fiction."
+
+async def _extract_scenes_with_llm(text: str) -> ScenesResponse:
+    initial_prompt = _build_scene_extraction_prompt(text)
+    system_message_initial = SCENE_EXTRACTION_SYSTEM_MESSAGE
 
     llm_content_initial = ""
     json_payload_initial = ""
 
     try:
-        print("--- Attempting Initial LLM Call ---")
-        llm_content_initial = await _call_llm(client, initial_prompt, system_message_initial, DEFAULT_MODEL)
-        print(f"Initial LLM raw output (first 1000 chars):\n{llm_content_initial[:1000]} ...\n")
+        extract_log.debug("Attempting Initial LLM Call")
+        llm_content_initial, finish_reason_initial = await _call_llm_with_finish_reason(_get_llm_client(), initial_prompt, system_message_initial, DEFAULT_MODEL, call_type="extract")
+        extract_log.debug("Initial LLM raw output (first 1000 chars):\n%s", _LazyLogArg(lambda: llm_content_initial[:1000]))
+
+        if _is_truncated_scene_output(llm_content_initial, finish_reason_initial):
+            continuation = await _continue_truncated_extraction(text, llm_content_initial)
+            if continuation is not None:
+                continued_scenes, complete = continuation
+                return ScenesResponse(scenes=continued_scenes, partial=not complete)
 
         json_payload_initial = _get_json_payload_from_llm_content(llm_content_initial)
-        print(f"Extracted JSON payload from initial call (first 1000 chars):\n{json_payload_initial[:1000]} ...\n")
+        extract_log.debug("Extracted JSON payload from initial call (first 1000 chars):\n%s", _LazyLogArg(lambda: json_payload_initial[:1000]))
 
-        scenes = _parse_and_validate_scenes(json_payload_initial)
-        print("--- Initial parsing and validation successful ---")
+        scenes, json_payload_initial = _parse_scenes_with_local_repair(llm_content_initial)
+        extract_log.debug("Initial parsing and validation successful")
         return ScenesResponse(scenes=scenes)
 
     except (json.JSONDecodeError, ValueError) as e_initial:
@@ -173,12 +1436,21 @@ NON includere il testo completo della scena nella tua risposta, ma solo i dati s
             f"Initial {error_type_name}: {error_message_detail}. "
             f"Original JSON payload tried (first 500 chars): {str(json_payload_initial)[:500]}..."
         )
-        print(f"--- Error during initial processing: {error_details_for_log} ---")
-        print("--- Attempting to fix with a second LLM call (Fixer Agent) ---")
+        extract_log.warning("Error during initial processing: %s", error_details_for_log)
+        if isinstance(e_initial, InvalidSceneItemsError):
+            salvaged_scenes, all_items_recovered = await _salvage_invalid_scene_items(e_initial)
+            if salvaged_scenes:
+                extract_log.info("Per-item salvage kept %s of %s scenes", len(salvaged_scenes), len(e_initial.scene_items))
+                # Dropped items are scenes missing from the result, which must not be cached as the chunk's answer
+                return ScenesResponse(scenes=salvaged_scenes, partial=not all_items_recovered)
+            extract_log.warning("Per-item salvage recovered no scenes")
+        extract_log.info("Attempting to fix with a second LLM call (Fixer Agent)")
+        json_repair_stats["escalated_to_llm_fixer"] += 1
+        fixer_invocation_stats["full"] += 1
 
         fixer_input_payload = json_payload_initial
         if not fixer_input_payload and llm_content_initial:
-            print("(Using full initial LLM content for fixer as extracted payload was empty)")
+            extract_log.debug("(Using full initial LLM content for fixer as extracted payload was empty)")
             fixer_input_payload = llm_content_initial
 
         fixer_prompt = _build_fixer_prompt(text, fixer_input_payload, error_message_detail)
@@ -187,14 +1459,14 @@ NON includere il testo completo della scena nella tua risposta, ma solo i dati s
         llm_content_fixer = "" # Initialize for broader scope in case of error before assignment
         json_payload_fixer = ""
         try:
-            llm_content_fixer = await _call_llm(client, fixer_prompt, system_message_fixer, DEFAULT_MODEL)
-            print(f"Fixer LLM raw output (first 1000 chars):\n{llm_content_fixer[:1000]} ...\n")
+            llm_content_fixer = await _call_llm(_get_llm_client(), fixer_prompt, system_message_fixer, DEFAULT_MODEL, call_type="fixer")
+            extract_log.debug("Fixer LLM raw output (first 1000 chars):\n%s", _LazyLogArg(lambda: llm_content_fixer[:1000]))
 
             json_payload_fixer = _get_json_payload_from_llm_content(llm_content_fixer)
-            print(f"Extracted JSON payload from fixer call (first 1000 chars):\n{json_payload_fixer[:1000]} ...\n")
+            extract_log.debug("Extracted JSON payload from fixer call (first 1000 chars):\n%s", _LazyLogArg(lambda: json_payload_fixer[:1000]))
 
-            fixed_scenes = _parse_and_validate_scenes(json_payload_fixer)
-            print("--- Fixer parsing and validation successful ---")
+            fixed_scenes, json_payload_fixer = _parse_scenes_with_local_repair(llm_content_fixer)
+            extract_log.info("Fixer parsing and validation successful")
             return ScenesResponse(scenes=fixed_scenes)
 
         except (json.JSONDecodeError, ValueError) as e_fixer:
@@ -205,156 +1477,588 @@ NON includere il testo completo della scena nella tua risposta, ma solo i dati s
                 f"Fixer error ({fixer_error_type_name}): {fixer_error_message_detail}. \n"
                 f"Fixer JSON payload tried (first 500 chars): {str(json_payload_fixer)[:500]}..."
             )
-            print(f"--- Error during fixer processing: {final_error_message} ---")
+            extract_log.error("Error during fixer processing: %s", final_error_message)
             raise HTTPException(status_code=500, detail=final_error_message)
+        except LLMThrottledError:
+            raise
         except HTTPException as http_e_fixer: # from _call_llm in fixer
             err_msg = f"HTTPException during fixer LLM call: {http_e_fixer.detail}. Initial error: {error_details_for_log}"
-            print(f"--- {err_msg} ---")
+            extract_log.error("%s", err_msg)
             raise HTTPException(status_code=500, detail=err_msg)
         except Exception as e_unhandled_fixer:
             unhandled_fixer_msg = f"Unexpected error during fixer stage: {str(e_unhandled_fixer)}. Initial error: {error_details_for_log}. Fixer raw output (first 500): {str(llm_content_fixer)[:500]}"
-            print(f"--- {unhandled_fixer_msg} ---")
+            extract_log.error("%s", unhandled_fixer_msg)
             raise HTTPException(status_code=500, detail=unhandled_fixer_msg)
 
+    except LLMThrottledError:
+        raise
     except HTTPException as http_e_initial: # from _call_llm in initial attempt
         err_msg = f"HTTPException during initial LLM call: {http_e_initial.detail}"
-        print(f"--- {err_msg} ---")
+        extract_log.error("%s", err_msg)
         raise HTTPException(status_code=500, detail=err_msg) # Re-raise with potentially more context or just as is
     except Exception as e_unhandled_initial:
         unhandled_initial_msg = f"Unexpected error during initial stage: {str(e_unhandled_initial)}. Initial raw output (first 500): {str(llm_content_initial)[:500]}"
-        print(f"--- {unhandled_initial_msg} ---")
+        extract_log.error("%s", unhandled_initial_msg)
         raise HTTPException(status_code=500, detail=unhandled_initial_msg)
 
 
-def _find_natural_break_point(text_segment: str, start_offset: int, end_offset: int) -> int:
-    """Tries to find a paragraph or sentence break within a range of the text_segment."""
-    # Prioritize double newline (paragraph)
-    # Search backwards from end_offset
-    for i in range(end_offset, start_offset -1, -1):
-        if text_segment[i-2:i] == "\n\n":
-            return i
-    # Then single newline (often sentence end or smaller break)
-    for i in range(end_offset, start_offset - 1, -1):
-        if text_segment[i-1:i] == "\n":
-            return i
-    # Then sentence-ending punctuation
-    for i in range(end_offset, start_offset - 1, -1):
-        if text_segment[i-1] in ('.', '?', '!'):
-            return i
+_NUMBER_WORDS = (
+    "uno|due|tre|quattro|cinque|sei|sette|otto|nove|dieci|primo|secondo|terzo|quarto|quinto|sesto|settimo|ottavo|nono|decimo"
+    "|prima|seconda|terza|quarta|quinta|sesta|settima|ottava|nona|decima"
+    "|one|two|three|four|five|six|seven|eight|nine|ten|first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth"
+)
+# What may follow a chapter number on its heading line: nothing, or a short title after a separator
+# ("Chapter IV - Title", "Capitolo 3: Il ritorno"), so that prose such as "Book 3 lay open" isn't a heading
+_HEADING_TITLE = r"(?:[ \t]*[:.\-–—][^\n]{0,60})?"
+# A heading line after a blank line: "Capitolo 3", "Chapter IV - Title", "Parte seconda", "Prologo",
+# a bare number or roman numeral (but not a lone "I", which is more often the pronoun), a markdown
+# heading, or a separator such as "***" or "* * *"
+_CHAPTER_HEADING_RE = re.compile(
+    r"\n\n[ \t]*(?:"
+    r"(?i:capitolo|chapter|parte|part|libro|book)[ \t]+(?:\d+|[IVXLCDM]+|(?i:" + _NUMBER_WORDS + r"))\b" + _HEADING_TITLE +
+    r"|(?i:prologo|prologue|epilogo|epilogue|interludio|interlude)\b" + _HEADING_TITLE +
+    r"|(?:\d{1,3}|[IVXLCDM]{2,7}|[VXLCDM])\.?|I\."
+    r"|\#{1,6}[ \t]+\S[^\n]{0,80}"
+    r"|(?:[*#~=_•·-][ \t]*){3,}"
+    r")[ \t]*(?=\n|\Z)"
+)
+
+
+def _starts_at_chapter_heading(full_text: str, start_char: int) -> bool:
+    """Whether a chunk starting at start_char opens with a chapter heading or section separator."""
+    return start_char >= 2 and _CHAPTER_HEADING_RE.match(full_text, start_char - 2) is not None
+
+
+class _BreakPointIndex:
+    """
+    Sorted char offsets of the candidate break points in a text. Each offset points just past the
+    break (a paragraph break, a line break or a sentence-ending punctuation mark), which is where a chunk
+    should end. Each kind is indexed in one pass over the text the first time it is needed, so sentence
+    ends are never scanned for in texts where every window has a paragraph break. Chapter headings are
+    not indexed: they are looked for only among the paragraph breaks of each search window.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def last_chapter_break(self, start_offset: int, end_offset: int) -> Optional[int]:
+        """Returns the largest paragraph break within [start_offset, end_offset] that opens a chapter heading, or None."""
+        paragraph_breaks = self.paragraph_breaks
+        idx = bisect.bisect_right(paragraph_breaks, end_offset) - 1
+        while idx >= 0 and paragraph_breaks[idx] >= start_offset:
+            if _starts_at_chapter_heading(self.text, paragraph_breaks[idx]):
+                return paragraph_breaks[idx]
+            idx -= 1
+        return None
+
+    @cached_property
+    def paragraph_breaks(self) -> array:
+        # Lookahead so that runs like "\n\n\n" yield every overlapping paragraph break
+        return array('q', (m.start() + 2 for m in re.finditer(r'\n(?=\n)', self.text)))
+
+    @cached_property
+    def line_breaks(self) -> array:
+        return array('q', (m.end() for m in re.finditer(r'\n', self.text)))
+
+    @cached_property
+    def sentence_ends(self) -> array:
+        return array('q', (m.end() for m in re.finditer(r'[.?!]', self.text)))
+
+
+def _last_offset_in_range(offsets: array, start_offset: int, end_offset: int) -> Optional[int]:
+    """Returns the largest offset within [start_offset, end_offset] from a sorted offset array, or None."""
+    idx = bisect.bisect_right(offsets, end_offset) - 1
+    if idx >= 0 and offsets[idx] >= start_offset:
+        return offsets[idx]
+    return None
+
+
+def _find_natural_break_point(break_index: _BreakPointIndex, start_offset: int, end_offset: int) -> int:
+    """Tries to find a chapter, paragraph or sentence break within a range of the indexed text, closest to end_offset."""
+    # Prioritize chapter headings, then double newline (paragraph), then single newline (often sentence end
+    # or smaller break), then sentence-ending punctuation
+    if CHAPTER_AWARE_CHUNKING:
+        chapter_break = break_index.last_chapter_break(start_offset, end_offset)
+        if chapter_break is not None:
+            return chapter_break
+    for kind in ("paragraph_breaks", "line_breaks", "sentence_ends"):
+        break_offset = _last_offset_in_range(getattr(break_index, kind), start_offset, end_offset)
+        if break_offset is not None:
+            return break_offset
     return end_offset # Fallback to the hard end_offset if no better break found
 
-def _create_non_overlapping_major_chunks(full_text: str, target_chunk_size_words: int, slack: int) -> List[str]:
-    print(f"--- Starting to create non-overlapping major chunks. Target: {target_chunk_size_words} words, Slack: {slack} words ---")
-    chunks: List[str] = []
+class _WordIndex:
+    """
+    Char offset of the start of every word (non-whitespace run) in a text, stored as one compact
+    array('q'). The offsets double as a prefix sum of word lengths, so converting between word and
+    char positions is an O(1) lookup or an O(log n) bisect without keeping a str per word.
+    """
+
+    def __init__(self, text: str):
+        self.text_length = len(text)
+        self.word_starts = array('q', map(re.Match.start, re.finditer(r'\S+', text)))
+
+    def __len__(self) -> int:
+        return len(self.word_starts)
+
+    def char_offset_of_word(self, word_idx: int) -> int:
+        """Char offset where word word_idx starts; the end of the text for word_idx == len(self)."""
+        return self.word_starts[word_idx] if word_idx < len(self.word_starts) else self.text_length
+
+    def words_before(self, char_offset: int) -> int:
+        """Number of words starting before char_offset."""
+        return bisect.bisect_left(self.word_starts, char_offset)
+
+    def count_words(self, start_char: int, end_char: int) -> int:
+        """Number of words starting within [start_char, end_char)."""
+        return self.words_before(end_char) - self.words_before(start_char)
+
+
+_tokenizer: Any = None
+_tokenizer_loaded = False
+
+
+def _get_tokenizer() -> Any:
+    """
+    Returns the tiktoken encoding for DEFAULT_MODEL, or None if tiktoken isn't installed or its
+    encoding files can't be fetched (they are downloaded on first use).
+    """
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer_loaded = True
+        if importlib.util.find_spec("tiktoken") is not None:
+            import tiktoken
+            try:
+                try:
+                    _tokenizer = tiktoken.encoding_for_model(DEFAULT_MODEL.split("/")[-1])
+                except KeyError: # Not an OpenAI model: its tokenizer is unavailable, so approximate with a recent encoding
+                    _tokenizer = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                chunking_log.warning("Could not load the tiktoken encoding, falling back to approximate token counts: %s", e)
+    return _tokenizer
 
-    # Split by word boundaries for word counting, but operate on char offsets for slicing
+
+# Without tiktoken, approximate a token as up to 4 word characters or one punctuation mark
+_APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+class _TokenIndex(_WordIndex):
+    """Same lookups as _WordIndex, counting tokens instead of words."""
+
+    def __init__(self, text: str):
+        self.text_length = len(text)
+        tokenizer = _get_tokenizer()
+        if tokenizer is None:
+            self.word_starts = array('q', map(re.Match.start, _APPROX_TOKEN_RE.finditer(text)))
+        else:
+            _, token_starts = tokenizer.decode_with_offsets(tokenizer.encode(text, disallowed_special=()))
+            self.word_starts = array('q', token_starts)
+
+
+def _count_tokens(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return len(_APPROX_TOKEN_RE.findall(text))
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def _chunk_token_budget(model: str) -> int:
+    """
+    Largest chunk, in tokens, whose extraction call fits the model: the prompt, the chunk and the scenes
+    expected back must fit the context window, and the scenes must fit the maximum output. Capped at
+    MAX_CHUNK_TOKENS, so a long text still splits into chunks that can be extracted in parallel.
+    """
+    context_tokens, max_output_tokens = MODEL_TOKEN_LIMITS.get(model, DEFAULT_MODEL_TOKEN_LIMITS)
+    prompt_overhead = _count_tokens(_build_scene_extraction_prompt("")) + _count_tokens(SCENE_EXTRACTION_SYSTEM_MESSAGE) + MESSAGE_OVERHEAD_TOKENS
+    output_tokens_per_source_token = OUTPUT_TOKENS_PER_SCENE / SOURCE_TOKENS_PER_SCENE
+    fits_context = (context_tokens - prompt_overhead) / (1 + output_tokens_per_source_token)
+    fits_output = max_output_tokens / output_tokens_per_source_token
+    budget = int(min(fits_context, fits_output) * TOKEN_BUDGET_SAFETY_FACTOR)
+    if MAX_CHUNK_TOKENS > 0:
+        budget = min(budget, MAX_CHUNK_TOKENS)
+    return max(budget, 1)
+
+
+def _create_major_chunk_spans(full_text: str, target_chunk_size_words: int, slack: int) -> List[Tuple[int, int]]:
+    """Splits full_text into non-overlapping (start_char, end_char) spans of roughly target_chunk_size_words words."""
+    chunking_log.info("Starting to create non-overlapping major chunks. Target: %s words, Slack: %s words", target_chunk_size_words, slack)
+    spans: List[Tuple[int, int]] = []
+
+    # Count words on the offset index, but operate on char offsets for slicing
     # A "word" here is roughly a non-whitespace sequence.
-    word_tokens = re.findall(r'\S+\s*', full_text) # Tokenize into word + trailing space (or just word if at end)
-    if not word_tokens:
-        if full_text.strip(): # Handle case where text has no spaces but has content
-             chunks.append(full_text)
-             print(f"Created chunk 1 (no spaces in text): {len(re.findall(r'\\b\\w+\\b', full_text))} words, {len(full_text)} chars.")
-             return chunks
+    word_index = _WordIndex(full_text)
+    total_words = len(word_index)
+    if total_words == 0: # Empty or whitespace-only text
         return []
 
+    break_index = _BreakPointIndex(full_text)
+    text_length = len(full_text)
     current_char_idx = 0
-    processed_words_count = 0
 
-    while current_char_idx < len(full_text):
-        # Estimate end based on target_chunk_size_words from current_processed_words_count
+    while current_char_idx < text_length:
+        # Estimate end based on target_chunk_size_words from the words already consumed
         # This is an estimate to find a window for natural break point
-        target_word_end_idx = min(processed_words_count + target_chunk_size_words, len(word_tokens))
-
-        # Get char offset for this estimated word end
-        estimated_char_end_offset = 0
-        if target_word_end_idx > 0:
-            # Sum lengths of word_tokens up to target_word_end_idx to get char position
-            # This requires iterating part of word_tokens, but only over the current chunk's estimated length
-            temp_char_len_for_estimate = current_char_idx # Start from current char_idx
-            # Calculate the char length from processed_words_count up to target_word_end_idx
-            # More directly: sum lengths of word_tokens from processed_words_count to target_word_end_idx
-            # then add to current_char_idx
-            estimated_additional_chars = sum(len(wt) for wt in word_tokens[processed_words_count:target_word_end_idx])
-            estimated_char_end_offset = current_char_idx + estimated_additional_chars
-        else:
-             estimated_char_end_offset = current_char_idx
+        processed_words_count = word_index.words_before(current_char_idx)
+        target_word_end_idx = min(processed_words_count + target_chunk_size_words, total_words)
+        estimated_char_end_offset = word_index.char_offset_of_word(target_word_end_idx)
 
         # If it's the last potential chunk, try to take everything remaining
         # Check if remaining words are less than a chunk plus slack (meaning we should probably take all of it)
-        if (len(word_tokens) - processed_words_count) < (target_chunk_size_words + slack):
-            estimated_char_end_offset = len(full_text)
+        if (total_words - processed_words_count) < (target_chunk_size_words + slack):
+            estimated_char_end_offset = text_length
 
         # Define search range for a natural break
         slack_chars_approx = slack * 6 # Average word length 5 + 1 space
         search_start_char = max(current_char_idx, estimated_char_end_offset - slack_chars_approx)
-        search_end_char   = min(len(full_text), estimated_char_end_offset + slack_chars_approx)
-        search_start_char = min(search_start_char, search_end_char)
+        search_end_char   = min(text_length, estimated_char_end_offset + slack_chars_approx)
+        search_start_char = min(search_start_char, search_end_char, text_length - 1)
+
+        actual_break_char_offset = _find_natural_break_point(break_index, search_start_char, search_end_char)
+        # Always make progress, even on strange text
+        actual_break_char_offset = max(current_char_idx + 1 if current_char_idx < text_length - 1 else text_length, actual_break_char_offset)
+        actual_break_char_offset = min(actual_break_char_offset, text_length)
 
-        search_start_char = min(search_start_char, len(full_text) -1) if len(full_text) > 0 else 0
-        search_end_char = min(search_end_char, len(full_text))
+        num_words_in_chunk = word_index.count_words(current_char_idx, actual_break_char_offset)
 
-        actual_break_char_offset = _find_natural_break_point(full_text, search_start_char, search_end_char)
-        actual_break_char_offset = max(current_char_idx + 1 if current_char_idx < len(full_text) -1 else len(full_text) , actual_break_char_offset)
-        actual_break_char_offset = min(actual_break_char_offset, len(full_text))
+        if num_words_in_chunk >= MIN_CHUNK_SIZE_WORDS:
+            spans.append((current_char_idx, actual_break_char_offset))
+            chunk_tail = _LazyLogArg(lambda: full_text[max(spans[-1][0], spans[-1][1] - 50):spans[-1][1]].strip())
+            chunking_log.debug("Created chunk %s: ~%s words, %s chars. Ends: '...%s'", len(spans), num_words_in_chunk, actual_break_char_offset - current_char_idx, chunk_tail)
+        elif spans and num_words_in_chunk > 0:
+            spans[-1] = (spans[-1][0], actual_break_char_offset)
+            chunking_log.debug("Appended small leftover (%s words) to previous chunk.", num_words_in_chunk)
+        elif num_words_in_chunk > 0:
+            spans.append((current_char_idx, actual_break_char_offset))
+            chunking_log.debug("Created a single small chunk %s: ~%s words, %s chars.", len(spans), num_words_in_chunk, actual_break_char_offset - current_char_idx)
+
+        current_char_idx = actual_break_char_offset
 
-        chunk_text = full_text[current_char_idx:actual_break_char_offset].strip()
+    chunking_log.info("Finished creating %s major chunks. (%s words)", len(spans), total_words)
+    return spans
 
-        num_words_in_chunk = 0
-        if chunk_text:
-            num_words_in_chunk = len(re.findall(r'\b\w+\b', chunk_text))
 
-        if num_words_in_chunk >= MIN_CHUNK_SIZE_WORDS:
-            chunks.append(chunk_text)
-            print(f"Created chunk {len(chunks)}: ~{num_words_in_chunk} words, {len(chunk_text)} chars. Ends: '...{chunk_text[-50:] if len(chunk_text)>50 else chunk_text}'")
-        elif chunks and num_words_in_chunk > 0:
-            chunks[-1] += "\n\n" + chunk_text
-            print(f"Appended small leftover ({num_words_in_chunk} words) to previous chunk.")
-        elif num_words_in_chunk > 0 :
-            chunks.append(chunk_text)
-            print(f"Created a single small chunk {len(chunks)}: ~{num_words_in_chunk} words, {len(chunk_text)} chars.")
-
-        # Update for next iteration: count how many word_tokens were effectively consumed.
-        # This is an approximation to advance processed_words_count.
-        # A more accurate way is to count words in the created chunk_text if it's not empty.
-        if actual_break_char_offset > current_char_idx : # If we made progress
-            consumed_text_len = actual_break_char_offset - current_char_idx
-            temp_consumed_chars = 0
-            words_advanced_this_iteration = 0
-            for k_idx in range(processed_words_count, len(word_tokens)):
-                temp_consumed_chars += len(word_tokens[k_idx])
-                words_advanced_this_iteration += 1
-                if temp_consumed_chars >= consumed_text_len:
-                    break
-            processed_words_count += words_advanced_this_iteration
-        elif current_char_idx < len(full_text): # No progress, but not at end, force advance char_idx to avoid infinite loop on strange text
-             actual_break_char_offset = current_char_idx + 1 # Minimal advance
+def _create_token_budget_chunk_spans(full_text: str, max_chunk_tokens: int) -> List[Tuple[int, int]]:
+    """
+    Splits full_text into non-overlapping (start_char, end_char) spans of at most max_chunk_tokens tokens,
+    each ending at the last natural break before the budget runs out.
+    """
+    chunking_log.info("Starting to create token-budget chunks. Budget: %s tokens (%s count)", max_chunk_tokens, 'tiktoken' if _get_tokenizer() else 'approximate')
+    spans: List[Tuple[int, int]] = []
+    if not full_text.strip(): # Empty or whitespace-only text
+        return []
+    token_index = _TokenIndex(full_text)
+    total_tokens = len(token_index)
 
+    break_index = _BreakPointIndex(full_text)
+    text_length = len(full_text)
+    slack_tokens = max(1, int(max_chunk_tokens * TOKEN_BUDGET_SLACK_FRACTION))
+    current_char_idx = 0
+
+    while current_char_idx < text_length:
+        processed_tokens_count = token_index.words_before(current_char_idx)
+        if total_tokens - processed_tokens_count <= max_chunk_tokens:
+            actual_break_char_offset = text_length
+        else:
+            # Never look past the budget: the break is the last one within the final slack_tokens of it
+            budget_end_char = token_index.char_offset_of_word(processed_tokens_count + max_chunk_tokens)
+            search_start_char = token_index.char_offset_of_word(processed_tokens_count + max_chunk_tokens - slack_tokens)
+            actual_break_char_offset = _find_natural_break_point(break_index, search_start_char, budget_end_char)
+            # Always make progress, even on strange text
+            actual_break_char_offset = max(current_char_idx + 1, actual_break_char_offset)
+
+        spans.append((current_char_idx, actual_break_char_offset))
+        num_tokens_in_chunk = token_index.count_words(current_char_idx, actual_break_char_offset)
+        chunking_log.debug("Created chunk %s: ~%s tokens (%s of budget), %s chars.", len(spans), num_tokens_in_chunk, _LazyLogArg(lambda: format(num_tokens_in_chunk / max_chunk_tokens, '.0%')), actual_break_char_offset - current_char_idx)
         current_char_idx = actual_break_char_offset
 
-        if current_char_idx >= len(full_text):
+    chunking_log.info("Finished creating %s token-budget chunks. (%s tokens)", len(spans), total_tokens)
+    return spans
+
+
+def _create_chunk_spans(full_text: str, target_chunk_size_words: int, slack: int, chunking_mode: str) -> List[Tuple[int, int]]:
+    """Chunks full_text by word count or by the token budget of DEFAULT_MODEL, depending on chunking_mode."""
+    if chunking_mode == "tokens":
+        return _create_token_budget_chunk_spans(full_text, _chunk_token_budget(DEFAULT_MODEL))
+    if chunking_mode == "words":
+        return _create_major_chunk_spans(full_text, target_chunk_size_words, slack)
+    raise ValueError(f"Unknown chunking mode: {chunking_mode!r}")
+
+
+def _create_non_overlapping_major_chunks(full_text: str, target_chunk_size_words: int, slack: int) -> List[str]:
+    return [full_text[start:end].strip() for start, end in _create_major_chunk_spans(full_text, target_chunk_size_words, slack)]
+
+
+def _chunk_text_hash(chunk_text: str) -> str:
+    return hashlib.sha256(chunk_text.strip().encode("utf-8")).hexdigest()
+
+
+def _align_chunk_spans_with_previous(
+    full_text: str,
+    previous_state: DocumentState,
+    target_chunk_size_words: int,
+    slack: int,
+    chunking_mode: str = CHUNKING_MODE
+) -> List[Tuple[int, int]]:
+    """
+    Chunks an edited version of a previously processed document. Leading and trailing chunks whose text is
+    unchanged keep their previous boundaries, so an edit can't shift every later chunk; only the changed
+    region in between is re-chunked.
+    """
+    text_length = len(full_text)
+    previous_chunks = previous_state.chunks
+
+    # Unchanged chunks from the start of the document keep their offsets
+    prefix: List[Tuple[int, int]] = []
+    for chunk in previous_chunks:
+        if chunk.end_char > text_length or _chunk_text_hash(full_text[chunk.start_char:chunk.end_char]) != chunk.text_hash:
+            break
+        prefix.append((chunk.start_char, chunk.end_char))
+    prefix_end = prefix[-1][1] if prefix else 0
+
+    # Unchanged chunks from the end of the document keep their distance from the end
+    suffix: List[Tuple[int, int]] = []
+    length_delta = text_length - previous_state.text_length
+    for chunk in reversed(previous_chunks[len(prefix):]):
+        start_char, end_char = chunk.start_char + length_delta, chunk.end_char + length_delta
+        if start_char < prefix_end or _chunk_text_hash(full_text[start_char:end_char]) != chunk.text_hash:
             break
+        suffix.insert(0, (start_char, end_char))
+    suffix_start = suffix[0][0] if suffix else text_length
 
-    print(f"--- Finished creating {len(chunks)} major chunks. --- (" + str(len(word_tokens)) +" tokens)")
-    return chunks
+    changed_spans = [
+        (prefix_end + start_char, prefix_end + end_char)
+        for start_char, end_char in _create_chunk_spans(full_text[prefix_end:suffix_start], target_chunk_size_words, slack, chunking_mode)
+    ]
+    chunking_log.info("Incremental chunking: kept %s leading and %s trailing chunks, re-chunked %s in between", len(prefix), len(suffix), len(changed_spans))
+    return prefix + changed_spans + suffix
 
-async def _process_single_chunk_for_scenes(text_chunk: str, chunk_index: int) -> List[Scene]:
+def _find_scene_anchor(chunk_text: str, anchor_quote: str, from_offset: int) -> Optional[int]:
+    """
+    Offset of the anchor quote in chunk_text at or after from_offset: verbatim if possible, else ignoring
+    case and whitespace differences, retrying with fewer leading words in case the LLM paraphrased the tail.
+    """
+    anchor_quote = anchor_quote.strip(" \t\n\"'“”«»….")
+    words = anchor_quote.split()
+    if not words:
+        return None
+    exact_offset = chunk_text.find(anchor_quote, from_offset)
+    if exact_offset >= 0:
+        return exact_offset
+    for num_words in sorted({len(words), min(len(words), 6), min(len(words), 3)}, reverse=True):
+        anchor_re = re.compile(r"\s+".join(re.escape(word) for word in words[:num_words]), re.IGNORECASE)
+        anchor_match = anchor_re.search(chunk_text, from_offset)
+        if anchor_match:
+            return anchor_match.start()
+    return None
+
+
+def _locate_scenes_in_chunk(chunk_text: str, scenes: List[Scene]) -> List[Tuple[int, int]]:
+    """
+    Approximate (start, end) span of each scene within chunk_text. Scenes are placed at their anchor quote;
+    scenes whose quote can't be found are spread evenly between the nearest located neighbours. Each scene
+    ends where the next one starts, and the last one at the end of the chunk.
+    """
+    starts: List[Optional[int]] = []
+    search_from = 0
+    for scene in scenes:
+        start = _find_scene_anchor(chunk_text, scene.citazione_iniziale, search_from) if scene.citazione_iniziale else None
+        if start is not None:
+            search_from = start + 1
+        starts.append(start)
+    if starts and starts[0] is None:
+        starts[0] = 0
+
+    # Interpolate the scenes between two located ones (or the end of the chunk)
+    i = 0
+    while i < len(starts):
+        if starts[i] is not None:
+            i += 1
+            continue
+        gap_end = i
+        while gap_end < len(starts) and starts[gap_end] is None:
+            gap_end += 1
+        low = starts[i - 1]
+        high = starts[gap_end] if gap_end < len(starts) else len(chunk_text)
+        for k in range(i, gap_end):
+            starts[k] = low + (high - low) * (k - i + 1) // (gap_end - i + 1)
+        i = gap_end
+
+    ends = starts[1:] + [len(chunk_text)]
+    return list(zip(starts, ends))
+
+
+def _with_source_offsets(scenes: List[Scene], chunk_text: str, chunk_start_char: int, chunk_index: int) -> List[Scene]:
+    """Copies of scenes carrying their span in the full text (chunk_text starts at chunk_start_char) and chunk index."""
+    return [
+        scene.model_copy(update={"start_char": chunk_start_char + start, "end_char": chunk_start_char + end, "chunk_index": chunk_index})
+        for scene, (start, end) in zip(scenes, _locate_scenes_in_chunk(chunk_text, scenes))
+    ]
+
+
+def _stripped_chunks(full_text: str, chunk_spans: List[Tuple[int, int]]) -> Tuple[List[str], List[int]]:
+    """The text of each chunk without surrounding whitespace, and the offset in full_text where it starts."""
+    major_chunks: List[str] = []
+    chunk_start_chars: List[int] = []
+    for start, end in chunk_spans:
+        raw_chunk = full_text[start:end]
+        stripped_chunk = raw_chunk.lstrip()
+        chunk_start_chars.append(start + len(raw_chunk) - len(stripped_chunk))
+        major_chunks.append(stripped_chunk.rstrip())
+    return major_chunks, chunk_start_chars
+
+
+SCENES_PER_CHUNK_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50)
+scenes_per_chunk_histogram = Histogram(SCENES_PER_CHUNK_BUCKETS)
+# Major chunks by outcome, and CPU time spent computing chunk boundaries (not counting LLM calls)
+chunk_stats = {"extracted": 0, "skipped_empty": 0, "skipped_error": 0, "failed_throttled": 0, "chunking_cpu_seconds": 0.0}
+
+
+async def _process_single_chunk_for_scenes(text_chunk: str, chunk_index: int) -> ScenesResponse:
     """Wraps the call to split_text_into_scenes_logic for a single chunk with logging."""
-    print(f"--- Processing Major Chunk {chunk_index + 1} for scenes ({len(text_chunk)} chars, ~{len(re.findall(r'\b\w+\b', text_chunk))} words) ---")
+    extract_log.debug("Processing Major Chunk %s for scenes (%s chars, ~%s words)", chunk_index + 1, len(text_chunk), _LazyLogArg(lambda: len(re.findall(r'\b\w+\b', text_chunk))))
     if not text_chunk.strip():
-        print(f"Major Chunk {chunk_index + 1} is empty or whitespace only, skipping.")
-        return []
+        extract_log.warning("Major Chunk %s is empty or whitespace only, skipping.", chunk_index + 1)
+        chunk_stats["skipped_empty"] += 1
+        return ScenesResponse(scenes=[])
     try:
-        print(f"    Calling LLM to identify scenes within Major Chunk {chunk_index + 1}. This may take some time...")
+        extract_log.debug("Calling LLM to identify scenes within Major Chunk %s. This may take some time...", chunk_index + 1)
         scene_response = await split_text_into_scenes_logic(text_chunk)
-        print(f"    LLM processing for Major Chunk {chunk_index + 1} complete.")
-        print(f"Major Chunk {chunk_index + 1} processing yielded {len(scene_response.scenes)} scenes.")
-        return scene_response.scenes
+        extract_log.debug("LLM processing for Major Chunk %s complete.", chunk_index + 1)
+        extract_log.info("Major Chunk %s processing yielded %s scenes.", chunk_index + 1, len(scene_response.scenes))
+        chunk_stats["extracted"] += 1
+        scenes_per_chunk_histogram.observe(len(scene_response.scenes))
+        return scene_response
+    except LLMThrottledError as e:
+        # Skipping would silently lose the chunk's scenes, so the whole text fails and can be resubmitted
+        extract_log.error("LLM provider throttled Major Chunk %s beyond the retry budget: %s. Failing the text.", chunk_index + 1, e.detail)
+        chunk_stats["failed_throttled"] += 1
+        raise
     except HTTPException as e:
-        print(f"HTTPException while processing Major Chunk {chunk_index + 1}: {e.detail}. Skipping this chunk.")
-        return []
+        extract_log.error("HTTPException while processing Major Chunk %s: %s. Skipping this chunk.", chunk_index + 1, e.detail)
+        chunk_stats["skipped_error"] += 1
+        return ScenesResponse(scenes=[], partial=True)
     except Exception as e:
-        print(f"Unexpected error while processing Major Chunk {chunk_index + 1}: {str(e)}. Skipping this chunk.")
-        return []
+        extract_log.error("Unexpected error while processing Major Chunk %s: %s. Skipping this chunk.", chunk_index + 1, e)
+        chunk_stats["skipped_error"] += 1
+        return ScenesResponse(scenes=[], partial=True)
+
+
+class FairChunkScheduler:
+    """
+    Concurrency budget for chunk extraction shared by many documents. When all slots are busy, a freed slot
+    goes to the next waiting document in round-robin order rather than first come, first served, so one
+    long book with hundreds of queued chunks can't starve the short ones submitted next to it.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self._running = 0
+        # Document key -> its waiting chunks, in the order documents get their next turn
+        self._waiting: "OrderedDict[str, deque[asyncio.Future]]" = OrderedDict()
+
+    async def _acquire(self, document_key: str) -> None:
+        if self._running < self.max_concurrent and not self._waiting:
+            self._running += 1
+            return
+        turn = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(document_key, deque()).append(turn)
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if turn.done() and not turn.cancelled(): # Handed a slot just as we were cancelled: pass it on
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self._waiting:
+            document_key, turns = next(iter(self._waiting.items()))
+            turn = turns.popleft()
+            if turns:
+                self._waiting.move_to_end(document_key) # Back of the line until every other document had a turn
+            else:
+                del self._waiting[document_key]
+            if not turn.done(): # Skip chunks cancelled while waiting
+                turn.set_result(None) # The slot passes straight to the waiter, so _running is unchanged
+                return
+        self._running -= 1
+
+    @asynccontextmanager
+    async def slot(self, document_key: str) -> AsyncIterator[None]:
+        await self._acquire(document_key)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "waiting_chunks": sum(len(turns) for turns in self._waiting.values()),
+            "waiting_documents": len(self._waiting),
+        }
+
+
+batch_chunk_scheduler = FairChunkScheduler(BATCH_MAX_CONCURRENT_CHUNKS)
+
+
+def _start_chunk_scene_tasks(
+    major_chunks: List[str],
+    max_concurrent_chunks: int,
+    known_chunk_scenes: Optional[Dict[int, List[Scene]]] = None,
+    scheduler: Optional[FairChunkScheduler] = None,
+    scheduler_key: str = "",
+    chunk_start_chars: Optional[List[int]] = None,
+    partial_chunks: Optional[Set[int]] = None
+) -> List["asyncio.Task[List[Scene]]"]:
+    """
+    Schedules scene extraction for all major chunks with at most max_concurrent_chunks LLM pipelines in flight,
+    or, when a scheduler is given, within its shared budget under scheduler_key instead.
+    Chunks listed in known_chunk_scenes (chunk index -> scenes) are not re-extracted.
+    Scenes get source offsets relative to chunk_start_chars (where each chunk starts in the full text).
+    The indices of chunks whose extraction failed or was partial are added to partial_chunks, if given.
+    Returns one task per chunk, in chunk order.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrent_chunks))
+    known_chunk_scenes = known_chunk_scenes or {}
+
+    async def _bounded(chunk_text: str, chunk_index: int) -> List[Scene]:
+        if chunk_index in known_chunk_scenes:
+            extract_log.info("Major Chunk %s is unchanged since the last run, reusing its %s scenes", chunk_index + 1, len(known_chunk_scenes[chunk_index]))
+            chunk_scenes = known_chunk_scenes[chunk_index]
+        else:
+            async with scheduler.slot(scheduler_key) if scheduler is not None else semaphore:
+                scene_response = await _process_single_chunk_for_scenes(chunk_text, chunk_index)
+            chunk_scenes = scene_response.scenes
+            if scene_response.partial and partial_chunks is not None:
+                partial_chunks.add(chunk_index)
+        # Re-located every time: an unchanged chunk may still have moved within the document
+        return _with_source_offsets(chunk_scenes, chunk_text, chunk_start_chars[chunk_index] if chunk_start_chars else 0, chunk_index)
+
+    return [asyncio.create_task(_bounded(chunk_text, i)) for i, chunk_text in enumerate(major_chunks)]
+
+
+async def _process_chunks_for_scenes(
+    major_chunks: List[str],
+    max_concurrent_chunks: int,
+    known_chunk_scenes: Optional[Dict[int, List[Scene]]] = None,
+    scheduler: Optional[FairChunkScheduler] = None,
+    scheduler_key: str = "",
+    chunk_start_chars: Optional[List[int]] = None,
+    partial_chunks: Optional[Set[int]] = None
+) -> List[List[Scene]]:
+    """
+    Runs scene extraction for all major chunks concurrently (bounded by max_concurrent_chunks or the scheduler).
+    Results are returned in chunk order so the boundary merging pass stays deterministic.
+    """
+    chunk_tasks = _start_chunk_scene_tasks(major_chunks, max_concurrent_chunks, known_chunk_scenes, scheduler, scheduler_key, chunk_start_chars, partial_chunks)
+    try:
+        # asyncio.gather preserves the order of its arguments regardless of completion order
+        return list(await asyncio.gather(*chunk_tasks))
+    finally:
+        # A chunk that fails (see LLMThrottledError) fails the text, so the others needn't keep calling the LLM
+        for chunk_task in chunk_tasks:
+            chunk_task.cancel()
 
 
 def _parse_llm_yes_no_response(llm_response_content: str) -> bool:
@@ -366,7 +2070,7 @@ def _parse_llm_yes_no_response(llm_response_content: str) -> bool:
     elif cleaned_response == "no":
         return False
     else:
-        print(f"Warning: LLM Yes/No response was ambiguous or unexpected: '{llm_response_content}'. Defaulting to 'No'.")
+        boundary_log.warning("LLM Yes/No response was ambiguous or unexpected: '%s'. Defaulting to 'No'.", llm_response_content)
         return False # Default to not merging if response is unclear
 
 def _build_boundary_check_prompt(scene_a: Scene, scene_b: Scene) -> str:
@@ -417,103 +2121,924 @@ Fornisci la descrizione della scena combinata come un oggetto JSON con i seguent
 Restituisci SOLO l'oggetto JSON, senza testo aggiuntivo, spiegazioni o markdown.
 """
 
-async def process_large_text(full_text: str, target_chunk_size_words: int, word_slack: int) -> ScenesResponse:
-    print(f"=== Starting to process large text ({len(full_text)} chars) ===")
-    major_chunks = _create_non_overlapping_major_chunks(full_text, target_chunk_size_words, word_slack)
+def _seam_key(scene_a: Scene, scene_b: Scene) -> str:
+    """Content hash of the two scenes compared at a chunk boundary; where the scenes sit in the text doesn't count."""
+    return hashlib.sha256(json.dumps(
+        [scene_a.model_dump(exclude=SCENE_LOCATION_FIELDS), scene_b.model_dump(exclude=SCENE_LOCATION_FIELDS)], sort_keys=True
+    ).encode("utf-8")).hexdigest()
 
-    if not major_chunks:
-        print("No major chunks were created from the input text.")
-        return ScenesResponse(scenes=[])
 
-    all_chunks_scenes: List[List[Scene]] = []
-    for i, chunk_text in enumerate(major_chunks):
-        scenes_from_chunk = await _process_single_chunk_for_scenes(chunk_text, i)
-        all_chunks_scenes.append(scenes_from_chunk)
+class SeamDecisions:
+    """
+    Boundary merge decisions keyed by _seam_key: the merged scene, or None when the two scenes stay separate.
+    Decisions from a previous run of the same document are reused; only the ones looked up or taken during
+    this run are kept in self.decisions, so the stored state doesn't grow with every edit.
+    """
+
+    def __init__(self, previous: Optional[Dict[str, Optional[Scene]]] = None):
+        self._previous = dict(previous or {})
+        self.decisions: Dict[str, Optional[Scene]] = {}
 
-    if not any(all_chunks_scenes): # Check if all sublists are empty or the main list is empty
-        print("No scenes were generated from any chunk.")
-        return ScenesResponse(scenes=[])
+    def lookup(self, seam_key: str) -> Tuple[bool, Optional[Scene]]:
+        """Returns (found, merged scene or None)."""
+        if seam_key not in self.decisions and seam_key in self._previous:
+            self.decisions[seam_key] = self._previous[seam_key]
+        if seam_key in self.decisions:
+            return True, self.decisions[seam_key]
+        return False, None
 
-    # --- LLM-Powered Boundary Merging ---
-    print("--- Starting LLM-Powered Boundary Scene Merging ---")
+    def record(self, seam_key: str, merged_scene: Optional[Scene]) -> None:
+        self.decisions[seam_key] = merged_scene
+
+
+_SIMILARITY_TOKEN_RE = re.compile(r"\w{3,}") # Words of 3+ letters, which drops most articles and prepositions
+
+# Cumulative counts of boundary decisions taken locally vs sent to the LLM, since startup
+boundary_prefilter_stats = {"decided_no_locally": 0, "decided_yes_locally": 0, "sent_to_llm": 0}
+
+
+def _scene_similarity(scene_a: Scene, scene_b: Scene) -> Optional[float]:
+    """
+    Weighted token Jaccard similarity (0..1) of the characters, setting and action of two scenes.
+    Fields empty in both scenes are left out; None when no field has any tokens to compare.
+    """
+    weighted_score = 0.0
+    total_weight = 0.0
+    for field_name, weight in BOUNDARY_PREFILTER_FIELD_WEIGHTS.items():
+        tokens_a = set(_SIMILARITY_TOKEN_RE.findall(getattr(scene_a, field_name).lower()))
+        tokens_b = set(_SIMILARITY_TOKEN_RE.findall(getattr(scene_b, field_name).lower()))
+        if tokens_a or tokens_b:
+            weighted_score += weight * len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+            total_weight += weight
+    return weighted_score / total_weight if total_weight else None
+
+
+def _prefilter_seam(scene_a: Scene, scene_b: Scene) -> Optional[bool]:
+    """Decides clear-cut boundaries locally: False (keep separate), True (merge) or None (ask the LLM)."""
+    similarity = _scene_similarity(scene_a, scene_b)
+    if similarity is not None and similarity < BOUNDARY_PREFILTER_NO_THRESHOLD:
+        boundary_prefilter_stats["decided_no_locally"] += 1
+        boundary_log.debug("Local pre-filter: similarity %.2f is clearly a new scene, skipping LLM boundary check.", similarity)
+        return False
+    if similarity is not None and similarity >= BOUNDARY_PREFILTER_YES_THRESHOLD:
+        boundary_prefilter_stats["decided_yes_locally"] += 1
+        boundary_log.debug("Local pre-filter: similarity %.2f is clearly the same scene, skipping LLM boundary check.", similarity)
+        return True
+    boundary_prefilter_stats["sent_to_llm"] += 1
+    return None
+
+
+async def _llm_should_merge_scenes(scene_a: Scene, scene_b: Scene) -> bool:
+    """Asks the LLM whether scene_b is a direct continuation of scene_a."""
+    boundary_check_prompt = _build_boundary_check_prompt(scene_a, scene_b)
+    system_message_boundary = "You are a literary expert good at comparing scene descriptions."
+
+    boundary_log.debug("Calling LLM for boundary merge decision...")
+    boundary_llm_response_content = await _call_llm(_get_llm_client(), boundary_check_prompt, system_message_boundary, DEFAULT_MODEL, call_type="boundary")
+    boundary_log.debug("LLM (Boundary Check) Response: '%s'", boundary_llm_response_content)
+    return _parse_llm_yes_no_response(boundary_llm_response_content)
+
+
+async def _llm_merge_scenes(scene_a: Scene, scene_b: Scene, chunk_index: int) -> Optional[Scene]:
+    """Asks the LLM to combine scene_a and scene_b into one scene. Returns None if its output can't be parsed."""
+    merge_prompt = _build_merge_scenes_prompt(scene_a, scene_b)
+    system_message_merge = "You are an expert literary analyst skilled at synthesizing scene descriptions into JSON."
+
+    merged_scene_llm_content = await _call_llm(_get_llm_client(), merge_prompt, system_message_merge, DEFAULT_MODEL, call_type="merge")
+    boundary_log.debug("LLM (Merge Scene) Raw JSON Output (first 500 chars): %s...", _LazyLogArg(lambda: merged_scene_llm_content[:500]))
+
+    # Parse the merged scene JSON
+    try:
+        # It's possible the LLM doesn't wrap in [], so _get_json_payload might not be needed if prompt is strict
+        # Assuming the merge prompt asks for a single JSON *object*
+        merged_scene_data = json.loads(merged_scene_llm_content)
+        return Scene(**merged_scene_data)
+    except (json.JSONDecodeError, TypeError, ValidationError) as e_merge_parse:
+        boundary_log.error("Failed to parse or validate merged scene JSON from LLM: %s. LLM output: %s...", e_merge_parse, merged_scene_llm_content[:500])
+        boundary_log.warning("Fallback: Not merging the boundary before Chunk %s.", chunk_index + 1)
+        return None
+
+
+async def _decide_seam(
+    scene_a: Scene,
+    scene_b: Scene,
+    chunk_index: int,
+    seam_decisions: Optional[SeamDecisions] = None,
+    should_merge: Optional[bool] = None,
+    use_prefilter: bool = True
+) -> Optional[Scene]:
+    """
+    Decides (via LLM) whether scene_b, the first scene of chunk chunk_index, continues scene_a.
+    Returns the merged scene if so, or None to keep them separate (also on any LLM error).
+    When seam_decisions is given, a decision already taken for the same pair of scenes is reused without
+    any LLM call, and new decisions are recorded in it. A should_merge verdict that was already reached
+    elsewhere (e.g. by a batched call) skips the pre-filter and the yes/no LLM call.
+    """
+    seam_key = _seam_key(scene_a, scene_b) if seam_decisions is not None else None
+    if seam_key is not None:
+        found, stored_merged_scene = seam_decisions.lookup(seam_key)
+        if found:
+            boundary_log.debug("Boundary Check: reusing stored decision for unchanged boundary before Chunk %s (%s).", chunk_index + 1, 'merge' if stored_merged_scene else 'no merge')
+            return stored_merged_scene
+
+    boundary_log.debug("Boundary Check: Comparing last scene of merged output with first scene of Chunk %s.", chunk_index + 1)
+    try:
+        merged_scene: Optional[Scene] = None
+        if should_merge is None and use_prefilter:
+            should_merge = _prefilter_seam(scene_a, scene_b)
+        if should_merge is None:
+            should_merge = await _llm_should_merge_scenes(scene_a, scene_b)
+        if should_merge:
+            boundary_log.debug("Decision: Merge. Calling LLM to combine scenes.")
+            merged_scene = await _llm_merge_scenes(scene_a, scene_b, chunk_index)
+            if merged_scene is None:
+                return None # Not recorded, so the next run asks again
+            boundary_log.info("Successfully merged Scene A and Scene B at the boundary before Chunk %s.", chunk_index + 1)
+        else:
+            boundary_log.debug("Decision: Do not merge the boundary before Chunk %s.", chunk_index + 1)
+        if seam_key is not None:
+            seam_decisions.record(seam_key, merged_scene)
+        return merged_scene
+
+    except HTTPException as http_e_boundary:
+        boundary_log.error("HTTPException during boundary/merge LLM call for Chunk %s: %s. Keeping scenes without merge.", chunk_index + 1, http_e_boundary.detail)
+        return None
+    except Exception as e_boundary_unhandled:
+        boundary_log.error("Unexpected error during boundary/merge logic for Chunk %s: %s. Keeping scenes without merge.", chunk_index + 1, e_boundary_unhandled)
+        return None
+
+
+class SeamVerdict(BaseModel):
+    coppia: int
+    unire: bool
+
+
+def _format_scene_for_prompt(scene: Scene) -> str:
+    return f"""Elementi Narrativi: {scene.elementi_narrativi}
+Personaggi: {scene.personaggi}
+Ambientazione: {scene.ambientazione}
+Mood/Vibe: {scene.mood_vibe}
+Azione in corso: {scene.azione_in_corso}"""
+
+
+def _build_batched_boundary_check_prompt(scene_pairs: List[Tuple[Scene, Scene]]) -> str:
+    """Builds one prompt asking the LLM to adjudicate every chunk boundary at once."""
+    pairs_text = "\n\n".join(
+        f"""Coppia {pair_number}:
+Scena A (Fine del segmento precedente):
+{_format_scene_for_prompt(scene_a)}
+
+Scena B (Inizio del segmento successivo):
+{_format_scene_for_prompt(scene_b)}"""
+        for pair_number, (scene_a, scene_b) in enumerate(scene_pairs, start=1)
+    )
+    return f"""
+Sei un esperto analista letterario. Ti vengono fornite {len(scene_pairs)} coppie di scene. In ogni coppia, la Scena A è la fine di un segmento di testo e la Scena B è l'inizio del segmento successivo.
+
+Per ogni coppia, determina se la Scena B è una continuazione diretta o la seconda metà della Scena A. Considera se condividono personaggi principali, ambientazione, azione continuativa e focus narrativo, suggerendo che dovrebbero essere una singola scena unificata. Valuta ogni coppia in modo indipendente.
+
+{pairs_text}
+
+Rispondi SOLO con un array JSON di {len(scene_pairs)} oggetti, uno per coppia e nello stesso ordine, nel formato:
+[{{"coppia": 1, "unire": true}}, {{"coppia": 2, "unire": false}}]
+dove "unire" è true se le due scene dovrebbero essere unite in una singola scena, false altrimenti. Non aggiungere testo, spiegazioni o markdown.
+"""
+
+
+def _parse_batched_boundary_verdicts(llm_content: str, expected_pairs: int) -> List[bool]:
+    """
+    Parses the batched boundary response into one merge verdict per pair, in pair order.
+    Raises json.JSONDecodeError, ValueError or pydantic.ValidationError if it doesn't cover every pair exactly once.
+    """
+    verdicts_data = json.loads(_get_json_payload_from_llm_content(llm_content))
+    if not isinstance(verdicts_data, list):
+        raise ValueError(f"Expected a JSON list/array, but got {type(verdicts_data).__name__}.")
+    verdicts = [SeamVerdict.model_validate(verdict_item) for verdict_item in verdicts_data]
+    merge_by_pair = {verdict.coppia: verdict.unire for verdict in verdicts}
+    if len(verdicts) != expected_pairs or sorted(merge_by_pair) != list(range(1, expected_pairs + 1)):
+        raise ValueError(f"Expected verdicts for pairs 1..{expected_pairs}, got pairs {[verdict.coppia for verdict in verdicts]}.")
+    return [merge_by_pair[pair_number] for pair_number in range(1, expected_pairs + 1)]
+
+
+async def _llm_batch_should_merge_scenes(scene_pairs: List[Tuple[Scene, Scene]]) -> Optional[List[bool]]:
+    """Asks the LLM to adjudicate all scene pairs in one call. Returns None if the call or its validation fails."""
+    batched_prompt = _build_batched_boundary_check_prompt(scene_pairs)
+    system_message_boundary = "You are a literary expert good at comparing scene descriptions."
+    llm_content = ""
+    try:
+        boundary_log.debug("Calling LLM once for %s boundary merge decisions...", len(scene_pairs))
+        llm_content = await _call_llm(_get_llm_client(), batched_prompt, system_message_boundary, DEFAULT_MODEL, call_type="boundary")
+        boundary_log.debug("LLM (Batched Boundary Check) Response (first 500 chars): %s", _LazyLogArg(lambda: llm_content[:500]))
+        return _parse_batched_boundary_verdicts(llm_content, len(scene_pairs))
+    except (json.JSONDecodeError, ValueError) as e_batch: # ValidationError is a ValueError
+        boundary_log.error("Batched boundary response failed validation: %s. Raw output (first 500): %s", e_batch, llm_content[:500])
+    except HTTPException as http_e_batch:
+        boundary_log.error("HTTPException during batched boundary LLM call: %s.", http_e_batch.detail)
+    except Exception as e_batch_unhandled:
+        boundary_log.error("Unexpected error during batched boundary LLM call: %s.", e_batch_unhandled)
+    return None
+
+
+async def _decide_seams_batched(
+    seams: List[Tuple[Scene, Scene, int]],
+    max_concurrent_checks: int,
+    seam_decisions: Optional[SeamDecisions] = None
+) -> List[Optional[Scene]]:
+    """
+    Decides every seam (scene_a, scene_b, chunk_index) with a single batched yes/no LLM call, falling back to
+    one yes/no call per seam if the batched response fails validation. Merges still take one call per merged seam.
+    """
+    should_merge: List[Optional[bool]] = [None] * len(seams)
+    use_prefilter = [True] * len(seams)
+    undecided: List[int] = []
+    for k, (scene_a, scene_b, _) in enumerate(seams):
+        if seam_decisions is not None and seam_decisions.lookup(_seam_key(scene_a, scene_b))[0]:
+            continue # _decide_seam reuses the stored decision
+        should_merge[k] = _prefilter_seam(scene_a, scene_b)
+        use_prefilter[k] = False
+        if should_merge[k] is None:
+            undecided.append(k)
+
+    if undecided:
+        batched_verdicts = await _llm_batch_should_merge_scenes([(seams[k][0], seams[k][1]) for k in undecided])
+        if batched_verdicts is None:
+            boundary_log.warning("Fallback: deciding the %s undecided boundaries one LLM call each.", len(undecided))
+        else:
+            for k, verdict in zip(undecided, batched_verdicts):
+                should_merge[k] = verdict
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrent_checks))
+
+    async def _bounded_decide(k: int) -> Optional[Scene]:
+        scene_a, scene_b, chunk_index = seams[k]
+        async with semaphore:
+            return await _decide_seam(scene_a, scene_b, chunk_index, seam_decisions, should_merge[k], use_prefilter[k])
+
+    return list(await asyncio.gather(*(_bounded_decide(k) for k in range(len(seams)))))
+
+
+def _apply_seam_decision(scene_a: Scene, current_chunk_scenes: List[Scene], merged_scene: Optional[Scene]) -> List[Scene]:
+    """Returns the scenes that replace scene_a in the final list once the seam before current_chunk_scenes is decided."""
+    if merged_scene is not None:
+        # The merged scene spans from the start of scene_a to the end of the scene it absorbed
+        merged_scene = merged_scene.model_copy(update={
+            "citazione_iniziale": scene_a.citazione_iniziale,
+            "start_char": scene_a.start_char,
+            "end_char": current_chunk_scenes[0].end_char,
+            "chunk_index": scene_a.chunk_index,
+        })
+        return [merged_scene, *current_chunk_scenes[1:]]
+    return [scene_a, *current_chunk_scenes]
+
+
+async def _resolve_chunk_boundary(
+    last_scene_from_final_list: Scene,
+    current_chunk_scenes: List[Scene],
+    chunk_index: int,
+    seam_decisions: Optional[SeamDecisions] = None
+) -> List[Scene]:
+    """
+    Decides whether the first scene of chunk chunk_index continues the last scene emitted so far, merging them
+    if so. Returns the scenes that replace last_scene_from_final_list in the final list.
+    """
+    merged_scene = await _decide_seam(last_scene_from_final_list, current_chunk_scenes[0], chunk_index, seam_decisions)
+    return _apply_seam_decision(last_scene_from_final_list, current_chunk_scenes, merged_scene)
+
+
+async def _merge_chunk_boundaries_sequentially(
+    all_chunks_scenes: List[List[Scene]],
+    seam_decisions: Optional[SeamDecisions] = None,
+    chapter_starts: Optional[Set[int]] = None
+) -> List[Scene]:
+    """
+    Resolves every chunk boundary in order, each against the (possibly merged) last scene so far.
+    Boundaries crossing the start of a chunk in chapter_starts are kept as they are, without a check.
+    """
     final_merged_scenes: List[Scene] = []
+    chapter_starts = chapter_starts or set()
+    chapter_break_pending = False # A chapter started since the last scene in final_merged_scenes
 
     # Add scenes from the first chunk directly if it exists and is not empty
     if all_chunks_scenes and all_chunks_scenes[0]:
         final_merged_scenes.extend(all_chunks_scenes[0])
-        print(f"Added {len(all_chunks_scenes[0])} scenes from chunk 1 to final list.")
+        boundary_log.debug("Added %s scenes from chunk 1 to final list.", len(all_chunks_scenes[0]))
     elif all_chunks_scenes: # First chunk was empty
-        print("Chunk 1 had no scenes.")
+        boundary_log.debug("Chunk 1 had no scenes.")
 
     for i in range(1, len(all_chunks_scenes)):
         current_chunk_scenes = all_chunks_scenes[i]
-        print(f"Processing boundary between end of (merged) Chunk {i} output and start of Chunk {i+1} output ({len(current_chunk_scenes)} scenes).")
+        boundary_log.debug("Processing boundary between end of (merged) Chunk %s output and start of Chunk %s output (%s scenes).", i, i+1, len(current_chunk_scenes))
+        chapter_break_pending = chapter_break_pending or i in chapter_starts
 
         if not final_merged_scenes:
-            print(f"No scenes in final list to compare with Chunk {i+1}. Appending {len(current_chunk_scenes)} scenes from Chunk {i+1} directly.")
+            boundary_log.debug("No scenes in final list to compare with Chunk %s. Appending %s scenes from Chunk %s directly.", i+1, len(current_chunk_scenes), i+1)
             final_merged_scenes.extend(current_chunk_scenes)
+            if current_chunk_scenes:
+                chapter_break_pending = False
             continue
 
         if not current_chunk_scenes:
-            print(f"Chunk {i+1} has no scenes. Nothing to merge or append.")
+            boundary_log.debug("Chunk %s has no scenes. Nothing to merge or append.", i+1)
             continue
 
-        last_scene_from_final_list = final_merged_scenes[-1]
-        first_scene_from_current_chunk = current_chunk_scenes[0]
+        if chapter_break_pending:
+            boundary_log.debug("Chunk %s starts after a chapter heading. Appending its %s scenes without a boundary check.", i+1, len(current_chunk_scenes))
+            final_merged_scenes.extend(current_chunk_scenes)
+            chapter_break_pending = False
+            continue
 
-        print(f"  Boundary Check: Comparing last scene of merged output with first scene of Chunk {i+1}.")
+        final_merged_scenes[-1:] = await _resolve_chunk_boundary(final_merged_scenes[-1], current_chunk_scenes, i, seam_decisions)
 
-        boundary_check_prompt = _build_boundary_check_prompt(last_scene_from_final_list, first_scene_from_current_chunk)
-        system_message_boundary = "You are a literary expert good at comparing scene descriptions."
+    return final_merged_scenes
 
-        try:
-            print("    Calling LLM for boundary merge decision...")
-            boundary_llm_response_content = await _call_llm(client, boundary_check_prompt, system_message_boundary, DEFAULT_MODEL)
-            print(f"    LLM (Boundary Check) Response: '{boundary_llm_response_content}'")
-            should_merge = _parse_llm_yes_no_response(boundary_llm_response_content)
 
-            if should_merge:
-                print("    Decision: Merge. Calling LLM to combine scenes.")
-                merge_prompt = _build_merge_scenes_prompt(last_scene_from_final_list, first_scene_from_current_chunk)
-                system_message_merge = "You are an expert literary analyst skilled at synthesizing scene descriptions into JSON."
+async def _merge_chunk_boundaries_in_parallel(
+    all_chunks_scenes: List[List[Scene]],
+    max_concurrent_checks: int,
+    seam_decisions: Optional[SeamDecisions] = None,
+    batched: bool = False,
+    chapter_starts: Optional[Set[int]] = None
+) -> List[Scene]:
+    """
+    Decides all chunk boundaries concurrently, each between the raw last scene of a chunk and the first scene
+    of the next non-empty chunk, then applies the merges in order. A seam whose left scene was itself replaced
+    by a merge (a single-scene chunk merged into its predecessor) is re-decided against the merged scene.
+    With batched=True the yes/no decisions for all seams come from a single LLM call. Seams crossing the
+    start of a chunk in chapter_starts are kept as they are, without a check.
+    """
+    non_empty_chunks = [(i, chunk_scenes) for i, chunk_scenes in enumerate(all_chunks_scenes) if chunk_scenes]
+    if not non_empty_chunks:
+        return []
 
-                merged_scene_llm_content = await _call_llm(client, merge_prompt, system_message_merge, DEFAULT_MODEL)
-                print(f"    LLM (Merge Scene) Raw JSON Output (first 500 chars): {merged_scene_llm_content[:500]}...")
+    semaphore = asyncio.Semaphore(max(1, max_concurrent_checks))
+
+    async def _bounded_decide(scene_a: Scene, scene_b: Scene, chunk_index: int) -> Optional[Scene]:
+        async with semaphore:
+            return await _decide_seam(scene_a, scene_b, chunk_index, seam_decisions)
+
+    chapter_starts = chapter_starts or set()
+    all_seams = list(zip(non_empty_chunks, non_empty_chunks[1:]))
+    chapter_seams = [any(i in chapter_starts for i in range(previous_index + 1, current_index + 1)) for (previous_index, _), (current_index, _) in all_seams]
+    seams = [seam for seam, is_chapter_seam in zip(all_seams, chapter_seams) if not is_chapter_seam]
+    if len(seams) < len(all_seams):
+        boundary_log.info("%s of %s chunk boundaries follow a chapter heading, no check needed", len(all_seams) - len(seams), len(all_seams))
+    if batched:
+        boundary_log.info("Deciding %s chunk boundaries with one batched LLM call", len(seams))
+        merged_scenes = await _decide_seams_batched(
+            [(previous_scenes[-1], current_scenes[0], current_index) for (_, previous_scenes), (current_index, current_scenes) in seams],
+            max_concurrent_checks,
+            seam_decisions,
+        )
+    else:
+        boundary_log.info("Deciding %s chunk boundaries in parallel (max %s at once)", len(seams), max_concurrent_checks)
+        merged_scenes = await asyncio.gather(*(
+            _bounded_decide(previous_scenes[-1], current_scenes[0], current_index)
+            for (_, previous_scenes), (current_index, current_scenes) in seams
+        ))
+
+    final_merged_scenes: List[Scene] = list(non_empty_chunks[0][1])
+    chained_seams = 0
+    decided_seams = iter(merged_scenes)
+    for ((_, previous_scenes), (current_index, current_scenes)), is_chapter_seam in zip(all_seams, chapter_seams):
+        if is_chapter_seam:
+            final_merged_scenes.extend(current_scenes)
+            continue
+        merged_scene = next(decided_seams)
+        if final_merged_scenes[-1] is previous_scenes[-1]:
+            final_merged_scenes[-1:] = _apply_seam_decision(final_merged_scenes[-1], current_scenes, merged_scene)
+        else:
+            # Chained merge: the decision above compared a scene that no longer ends the list
+            chained_seams += 1
+            boundary_log.debug("Boundary before Chunk %s follows a merged scene; re-deciding it against the merged scene.", current_index + 1)
+            final_merged_scenes[-1:] = await _resolve_chunk_boundary(final_merged_scenes[-1], current_scenes, current_index, seam_decisions)
+
+    boundary_log.info("%s boundary merging done (%s chained boundaries re-decided)", 'Batched' if batched else 'Parallel', chained_seams)
+    return final_merged_scenes
+
+
+def _first_offset_in_range(offsets: array, start_offset: int, end_offset: int) -> Optional[int]:
+    """Returns the smallest offset within [start_offset, end_offset] from a sorted offset array, or None."""
+    idx = bisect.bisect_left(offsets, start_offset)
+    if idx < len(offsets) and offsets[idx] <= end_offset:
+        return offsets[idx]
+    return None
+
+
+def _overlapping_chunk_spans(
+    full_text: str,
+    chunk_spans: List[Tuple[int, int]],
+    overlap_words: int,
+    chapter_starts: Set[int]
+) -> List[Tuple[int, int]]:
+    """
+    Extraction windows for overlap mode: each chunk span extended backwards by about overlap_words words,
+    starting on a line break or sentence end so the window doesn't open mid-sentence. Chunks that open a
+    chapter don't need an overlap.
+    """
+    word_index = _WordIndex(full_text)
+    break_index = _BreakPointIndex(full_text)
+    windows: List[Tuple[int, int]] = []
+    for i, (start_char, end_char) in enumerate(chunk_spans):
+        if i == 0 or i in chapter_starts or overlap_words <= 0:
+            windows.append((start_char, end_char))
+            continue
+        overlap_start = word_index.char_offset_of_word(max(0, word_index.words_before(start_char) - overlap_words))
+        for kind in ("line_breaks", "sentence_ends"):
+            break_offset = _first_offset_in_range(getattr(break_index, kind), overlap_start, start_char)
+            if break_offset is not None:
+                overlap_start = break_offset
+                break
+        windows.append((overlap_start, end_char))
+    return windows
 
-                # Parse the merged scene JSON
-                try:
-                    # It's possible the LLM doesn't wrap in [], so _get_json_payload might not be needed if prompt is strict
-                    # Assuming the merge prompt asks for a single JSON *object*
-                    merged_scene_data = json.loads(merged_scene_llm_content)
-                    merged_scene_obj = Scene(**merged_scene_data)
-
-                    final_merged_scenes[-1] = merged_scene_obj # Replace the last scene
-                    print("    Successfully merged Scene A and Scene B. Updated last scene in final list.")
-                    # Append the rest of the scenes from the current chunk
-                    if len(current_chunk_scenes) > 1:
-                        final_merged_scenes.extend(current_chunk_scenes[1:])
-                        print(f"    Appended remaining {len(current_chunk_scenes) - 1} scenes from Chunk {i+1}.")
-                    else:
-                        print(f"    No remaining scenes in Chunk {i+1} after merging its first scene.")
-                except (json.JSONDecodeError, TypeError) as e_merge_parse:
-                    print(f"    ERROR: Failed to parse or validate merged scene JSON from LLM: {str(e_merge_parse)}. LLM output: {merged_scene_llm_content[:500]}...")
-                    print(f"    Fallback: Not merging. Appending all {len(current_chunk_scenes)} scenes from Chunk {i+1} separately.")
-                    final_merged_scenes.extend(current_chunk_scenes)
-
-            else: # Should not merge
-                print(f"    Decision: Do not merge. Appending all {len(current_chunk_scenes)} scenes from Chunk {i+1} separately.")
-                final_merged_scenes.extend(current_chunk_scenes)
-
-        except HTTPException as http_e_boundary:
-            print(f"    ERROR: HTTPException during boundary/merge LLM call for Chunk {i+1}: {http_e_boundary.detail}. Appending scenes without merge.")
-            final_merged_scenes.extend(current_chunk_scenes)
-        except Exception as e_boundary_unhandled:
-            print(f"    ERROR: Unexpected error during boundary/merge logic for Chunk {i+1}: {str(e_boundary_unhandled)}. Appending scenes without merge.")
-            final_merged_scenes.extend(current_chunk_scenes)
 
-    print(f"--- Total scenes after LLM-Powered Boundary Merging: {len(final_merged_scenes)} ---")
+def _reconcile_overlap_seam(previous_scenes: List[Scene], current_scenes: List[Scene], overlap_start: int, overlap_end: int) -> List[Scene]:
+    """
+    Joins the scenes so far with those of a chunk whose window starts overlap_start chars into text already
+    covered, at overlap_end. If both chunks put a scene boundary at about the same place in the overlap, they
+    are cut there; otherwise the overlap is one scene that continues across the seam, and the last scene
+    started before the overlap is joined with the chunk's first scene.
+    """
+    agreed_boundaries = [
+        (abs(previous_scene.start_char - current_scene.start_char), j, k)
+        for j, previous_scene in enumerate(previous_scenes) if overlap_start <= previous_scene.start_char < overlap_end
+        for k, current_scene in enumerate(current_scenes) if current_scene.start_char < overlap_end
+    ]
+    if agreed_boundaries:
+        distance, j, k = min(agreed_boundaries)
+        if distance <= OVERLAP_MATCH_TOLERANCE_CHARS:
+            kept_scenes = previous_scenes[:j]
+            if kept_scenes:
+                kept_scenes[-1] = kept_scenes[-1].model_copy(update={"end_char": current_scenes[k].start_char})
+            return kept_scenes + current_scenes[k:]
+
+    # The current chunk saw the overlap with context on both sides, so its view of it wins
+    kept_scenes = [scene for scene in previous_scenes if scene.start_char < overlap_start]
+    if not kept_scenes or kept_scenes[-1].end_char <= overlap_start:
+        return kept_scenes + current_scenes
+    last_scene, first_scene = kept_scenes[-1], current_scenes[0]
+    # Describe the joined scene with whichever half covers more of it
+    described_by = last_scene if overlap_start - last_scene.start_char >= first_scene.end_char - overlap_start else first_scene
+    joined_scene = described_by.model_copy(update={
+        "citazione_iniziale": last_scene.citazione_iniziale,
+        "start_char": last_scene.start_char,
+        "end_char": first_scene.end_char,
+        "chunk_index": last_scene.chunk_index,
+    })
+    return kept_scenes[:-1] + [joined_scene] + current_scenes[1:]
+
+
+def _reconcile_overlapping_chunks(all_chunks_scenes: List[List[Scene]], window_starts: List[int], chunk_starts: List[int]) -> List[Scene]:
+    """Joins the scenes of overlapping chunks in order, deduplicating the scenes each overlap shows twice."""
+    final_scenes: List[Scene] = []
+    reconciled_seams = 0
+    for i, current_scenes in enumerate(all_chunks_scenes):
+        if not current_scenes:
+            continue
+        if not final_scenes or window_starts[i] >= chunk_starts[i]:
+            final_scenes.extend(current_scenes)
+            continue
+        final_scenes = _reconcile_overlap_seam(final_scenes, current_scenes, window_starts[i], chunk_starts[i])
+        reconciled_seams += 1
+    boundary_log.info("Reconciled %s overlapping chunk boundaries locally", reconciled_seams)
+    return final_scenes
+
+
+def _chapter_start_chunks(full_text: str, chunk_spans: List[Tuple[int, int]]) -> Set[int]:
+    """Indices of the chunks (after the first) that open with a chapter heading or section separator."""
+    if not CHAPTER_AWARE_CHUNKING:
+        return set()
+    return {i for i, (start_char, _) in enumerate(chunk_spans) if i > 0 and _starts_at_chapter_heading(full_text, start_char)}
+
+
+async def process_large_text(
+    full_text: str,
+    target_chunk_size_words: int,
+    word_slack: int,
+    max_concurrent_chunks: int = MAX_CONCURRENT_CHUNKS,
+    document_id: Optional[str] = None,
+    boundary_merge_mode: str = BOUNDARY_MERGE_MODE,
+    chunking_mode: str = CHUNKING_MODE,
+    scheduler: Optional[FairChunkScheduler] = None,
+    scheduler_key: str = ""
+) -> ScenesResponse:
+    pipeline_log.info("Starting to process large text (%s chars)", len(full_text))
+    store = _get_document_store() if document_id else None
+    previous_state = await asyncio.to_thread(store.load, document_id) if store else None
+
+    chunking_started = time.thread_time()
+    if previous_state is not None:
+        pipeline_log.info("Found previous run for document '%s' (%s chunks)", document_id, len(previous_state.chunks))
+        chunk_spans = _align_chunk_spans_with_previous(full_text, previous_state, target_chunk_size_words, word_slack, chunking_mode)
+    else:
+        chunk_spans = _create_chunk_spans(full_text, target_chunk_size_words, word_slack, chunking_mode)
+    chapter_starts = _chapter_start_chunks(full_text, chunk_spans)
+    overlap_mode = boundary_merge_mode == "overlap"
+    extraction_spans = _overlapping_chunk_spans(full_text, chunk_spans, CHUNK_OVERLAP_WORDS, chapter_starts) if overlap_mode else chunk_spans
+    major_chunks, chunk_start_chars = _stripped_chunks(full_text, extraction_spans)
+    chunk_stats["chunking_cpu_seconds"] += time.thread_time() - chunking_started
+
+    if not major_chunks:
+        pipeline_log.warning("No major chunks were created from the input text.")
+        return ScenesResponse(scenes=[])
+
+    chunk_hashes = [_chunk_text_hash(full_text[start:end]) for start, end in chunk_spans]
+    known_chunk_scenes: Dict[int, List[Scene]] = {}
+    seam_decisions: Optional[SeamDecisions] = None
+    if store is not None:
+        seam_decisions = SeamDecisions(previous_state.seam_decisions if previous_state else None)
+        # Partial and empty results are not reused: they are a chunk that failed or degraded last time. In overlap mode a
+        # chunk's scenes also depend on the end of the previous chunk, so unchanged windows are left to the scene cache.
+        previous_scenes_by_hash = {
+            chunk.text_hash: chunk.scenes for chunk in previous_state.chunks if chunk.scenes and chunk.complete
+        } if previous_state and not overlap_mode else {}
+        known_chunk_scenes = {i: previous_scenes_by_hash[h] for i, h in enumerate(chunk_hashes) if h in previous_scenes_by_hash}
+
+    pipeline_log.info("Extracting scenes from %s of %s major chunks (max %s in parallel)", len(major_chunks) - len(known_chunk_scenes), len(major_chunks), max_concurrent_chunks)
+    partial_chunks: Set[int] = set()
+    all_chunks_scenes = await _process_chunks_for_scenes(major_chunks, max_concurrent_chunks, known_chunk_scenes, scheduler, scheduler_key, chunk_start_chars, partial_chunks)
+
+    if not any(all_chunks_scenes): # Check if all sublists are empty or the main list is empty
+        pipeline_log.warning("No scenes were generated from any chunk.")
+        return ScenesResponse(scenes=[])
+
+    # --- LLM-Powered Boundary Merging ---
+    pipeline_log.info("Starting LLM-Powered Boundary Scene Merging (%s)", boundary_merge_mode)
+    prefilter_stats_before = dict(boundary_prefilter_stats)
+    if overlap_mode:
+        final_merged_scenes = _reconcile_overlapping_chunks(all_chunks_scenes, chunk_start_chars, _stripped_chunks(full_text, chunk_spans)[1])
+    elif boundary_merge_mode in ("parallel", "batched"):
+        final_merged_scenes = await _merge_chunk_boundaries_in_parallel(
+            all_chunks_scenes, MAX_CONCURRENT_BOUNDARY_CHECKS, seam_decisions, batched=boundary_merge_mode == "batched", chapter_starts=chapter_starts
+        )
+    elif boundary_merge_mode == "sequential":
+        final_merged_scenes = await _merge_chunk_boundaries_sequentially(all_chunks_scenes, seam_decisions, chapter_starts)
+    else:
+        raise ValueError(f"Unknown boundary merge mode: {boundary_merge_mode!r}")
+
+    pipeline_log.info("Total scenes after LLM-Powered Boundary Merging: %s", len(final_merged_scenes))
+    prefilter_run_stats = {key: boundary_prefilter_stats[key] - prefilter_stats_before[key] for key in boundary_prefilter_stats}
+    boundary_log.info("Boundary pre-filter: %s LLM boundary checks avoided (%s clear no, %s clear yes), %s sent to the LLM", prefilter_run_stats['decided_no_locally'] + prefilter_run_stats['decided_yes_locally'], prefilter_run_stats['decided_no_locally'], prefilter_run_stats['decided_yes_locally'], prefilter_run_stats['sent_to_llm'])
+
+    if store is not None:
+        state = DocumentState(
+            text_length=len(full_text),
+            chunks=[
+                StoredChunk(start_char=start, end_char=end, text_hash=chunk_hash, scenes=chunk_scenes, complete=i not in partial_chunks)
+                for i, ((start, end), chunk_hash, chunk_scenes) in enumerate(zip(chunk_spans, chunk_hashes, all_chunks_scenes))
+            ],
+            seam_decisions=seam_decisions.decisions,
+        )
+        await asyncio.to_thread(store.save, document_id, state)
+        pipeline_log.info("Stored chunk state for document '%s'", document_id)
     return ScenesResponse(scenes=final_merged_scenes)
 
+async def stream_large_text_scenes(
+    full_text: str,
+    target_chunk_size_words: int,
+    word_slack: int,
+    max_concurrent_chunks: int = MAX_CONCURRENT_CHUNKS,
+    chunking_mode: str = CHUNKING_MODE,
+    scheduler: Optional[FairChunkScheduler] = None,
+    scheduler_key: str = "",
+    boundary_merge_mode: str = BOUNDARY_MERGE_MODE
+) -> AsyncIterator[Scene]:
+    """
+    Same pipeline as process_large_text, but yields scenes as soon as their position is final: every scene
+    of a chunk except the trailing one, which still waits on the boundary check with the next chunk.
+    In "overlap" mode, every scene except those the next chunk's overlap may still cut or join.
+    The "parallel" and "batched" modes need every chunk before deciding any boundary, so streaming resolves
+    boundaries one at a time as in "sequential" mode, each as soon as both of its chunks are extracted.
+    """
+    if boundary_merge_mode not in ("sequential", "parallel", "batched", "overlap"):
+        raise ValueError(f"Unknown boundary merge mode: {boundary_merge_mode!r}")
+    pipeline_log.info("Starting to stream scenes from large text (%s chars)", len(full_text))
+    if boundary_merge_mode in ("parallel", "batched"):
+        pipeline_log.info("Boundary merge mode '%s' doesn't apply to streaming, resolving boundaries one at a time", boundary_merge_mode)
+    overlap_mode = boundary_merge_mode == "overlap"
+    chunking_started = time.thread_time()
+    chunk_spans = _create_chunk_spans(full_text, target_chunk_size_words, word_slack, chunking_mode)
+    chapter_starts = _chapter_start_chunks(full_text, chunk_spans)
+    extraction_spans = _overlapping_chunk_spans(full_text, chunk_spans, CHUNK_OVERLAP_WORDS, chapter_starts) if overlap_mode else chunk_spans
+    major_chunks, chunk_start_chars = _stripped_chunks(full_text, extraction_spans)
+    chunk_stats["chunking_cpu_seconds"] += time.thread_time() - chunking_started
+    if not major_chunks:
+        pipeline_log.warning("No major chunks were created from the input text.")
+        return
+
+    chunk_tasks = _start_chunk_scene_tasks(
+        major_chunks, max_concurrent_chunks, scheduler=scheduler, scheduler_key=scheduler_key, chunk_start_chars=chunk_start_chars
+    )
+    if overlap_mode:
+        scenes = _stream_overlapping_chunk_scenes(chunk_tasks, chunk_start_chars, _stripped_chunks(full_text, chunk_spans)[1])
+    else:
+        scenes = _stream_merged_chunk_scenes(chunk_tasks, chapter_starts)
+    try:
+        async for scene in scenes:
+            yield scene
+    finally:
+        # The client may disconnect mid-stream; don't keep paying for chunks nobody will read
+        for chunk_task in chunk_tasks:
+            chunk_task.cancel()
+
+
+async def _stream_merged_chunk_scenes(chunk_tasks: List["asyncio.Task[List[Scene]]"], chapter_starts: Set[int]) -> AsyncIterator[Scene]:
+    """Yields the scenes of the chunk tasks in order, checking each chunk boundary with the LLM as soon as both chunks are done."""
+    pending_scene: Optional[Scene] = None # Trailing scene that may still be merged with the next chunk
+    chapter_break_pending = False
+    for i, chunk_task in enumerate(chunk_tasks):
+        chapter_break_pending = chapter_break_pending or i in chapter_starts
+        current_chunk_scenes = await chunk_task
+        if not current_chunk_scenes:
+            pipeline_log.debug("Chunk %s has no scenes. Nothing to merge or stream.", i+1)
+            continue
+        if pending_scene is None:
+            resolved_scenes = current_chunk_scenes
+        elif chapter_break_pending:
+            pipeline_log.debug("Chunk %s starts after a chapter heading, its first scene can't continue the previous one.", i+1)
+            yield pending_scene
+            resolved_scenes = current_chunk_scenes
+        else:
+            resolved_scenes = await _resolve_chunk_boundary(pending_scene, current_chunk_scenes, i)
+        chapter_break_pending = False
+        for scene in resolved_scenes[:-1]:
+            yield scene
+        pending_scene = resolved_scenes[-1]
+
+    if pending_scene is not None:
+        yield pending_scene
+
+
+async def _stream_overlapping_chunk_scenes(
+    chunk_tasks: List["asyncio.Task[List[Scene]]"],
+    window_starts: List[int],
+    chunk_starts: List[int]
+) -> AsyncIterator[Scene]:
+    """
+    Yields the scenes of overlapping chunk tasks in order, reconciling each overlap as in
+    _reconcile_overlapping_chunks. The next overlap can only cut or join the last scene started before
+    the next window and the scenes after it, so every scene before those is final and is yielded.
+    """
+    unsettled_scenes: List[Scene] = []
+    for i, chunk_task in enumerate(chunk_tasks):
+        current_scenes = await chunk_task
+        if current_scenes:
+            if not unsettled_scenes or window_starts[i] >= chunk_starts[i]:
+                unsettled_scenes.extend(current_scenes)
+            else:
+                unsettled_scenes = _reconcile_overlap_seam(unsettled_scenes, current_scenes, window_starts[i], chunk_starts[i])
+        if i + 1 < len(window_starts):
+            # Later windows start further on, so scenes settled against the next one stay settled
+            started_before_next = [j for j, scene in enumerate(unsettled_scenes) if scene.start_char < window_starts[i + 1]]
+            settled_count = started_before_next[-1] if started_before_next else 0
+            for scene in unsettled_scenes[:settled_count]:
+                yield scene
+            unsettled_scenes = unsettled_scenes[settled_count:]
+    for scene in unsettled_scenes:
+        yield scene
+
+
+async def _run_job(job_id: str) -> None:
+    """Runs one background job to completion, saving partial scenes as they become final."""
+    store = _get_job_store()
+    state = await asyncio.to_thread(store.load, job_id)
+    input_data = await asyncio.to_thread(store.load_input, job_id)
+    if state is None or input_data is None:
+        jobs_log.warning("Job %s not found in the job store, skipping", job_id)
+        return
+    jobs_log.info("Starting job %s (%s chars)", job_id, len(input_data.text))
+    state.status = "running"
+    state.partial_scenes = []
+    await asyncio.to_thread(store.save, state)
+
+    try:
+        if not input_data.text:
+            result = ScenesResponse(scenes=[])
+        elif input_data.document_id:
+            # Incremental runs merge all chunk boundaries at the end, so they have no partial results
+            result = await process_large_text(input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK, document_id=input_data.document_id)
+        else:
+            scenes: List[Scene] = []
+            last_save = time.monotonic()
+            async for scene in stream_large_text_scenes(input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK):
+                scenes.append(scene)
+                if time.monotonic() - last_save >= JOB_PARTIAL_SAVE_INTERVAL_SECONDS:
+                    state.partial_scenes = list(scenes)
+                    await asyncio.to_thread(store.save, state)
+                    last_save = time.monotonic()
+            result = ScenesResponse(scenes=scenes)
+        state.status = "done"
+        state.result = result
+        state.partial_scenes = []
+        jobs_log.info("Job %s done: %s scenes", job_id, len(result.scenes))
+    except Exception as e:
+        state.status = "failed"
+        state.error = e.detail if isinstance(e, HTTPException) else str(e)
+        jobs_log.error("Job %s failed: %s", job_id, state.error)
+    # A job cancelled by shutdown never gets here: it stays "running" in the store and is resumed on the next start
+    await asyncio.to_thread(store.save, state)
+
+
+job_queue: Optional[asyncio.Queue] = None
+job_worker_tasks: List[asyncio.Task] = []
+
+
+async def _delete_expired_jobs() -> None:
+    """Deletes the jobs that finished more than JOB_RETENTION_HOURS ago, so the job store doesn't grow forever."""
+    if JOB_RETENTION_HOURS <= 0:
+        return
+    deleted = await asyncio.to_thread(_get_job_store().delete_finished_before, time.time() - JOB_RETENTION_HOURS * 3600)
+    if deleted:
+        jobs_log.info("Deleted %s jobs finished more than %s hours ago", deleted, JOB_RETENTION_HOURS)
+
+
+async def _job_worker(queue: asyncio.Queue) -> None:
+    while True:
+        job_id = await queue.get()
+        try:
+            await _run_job(job_id)
+            await _delete_expired_jobs()
+        except Exception as e: # e.g. the job store itself failing; keep the worker alive for the next job
+            jobs_log.error("Job worker error on job %s: %s", job_id, e)
+        finally:
+            queue.task_done()
+
+
+async def _start_job_workers() -> None:
+    """
+    Starts the background job workers and re-queues the jobs a previous run left unfinished. Expired jobs
+    are deleted here and after every job a worker finishes.
+    """
+    global job_queue, job_worker_tasks
+    job_queue = asyncio.Queue()
+    await _delete_expired_jobs()
+    unfinished_job_ids = await asyncio.to_thread(_get_job_store().unfinished_job_ids)
+    for job_id in unfinished_job_ids:
+        job_queue.put_nowait(job_id)
+    if unfinished_job_ids:
+        jobs_log.info("Resuming %s unfinished jobs", len(unfinished_job_ids))
+    job_worker_tasks = [asyncio.create_task(_job_worker(job_queue)) for _ in range(max(1, JOB_WORKERS))]
+
+
+async def _stop_job_workers() -> None:
+    global job_queue, job_worker_tasks
+    for worker_task in job_worker_tasks:
+        worker_task.cancel()
+    await asyncio.gather(*job_worker_tasks, return_exceptions=True)
+    job_worker_tasks = []
+    job_queue = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations: the first caller for a key starts the work and later
+    callers for the same key await the same task instead of starting their own. The work is cancelled
+    only once every caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, Tuple["asyncio.Task[Any]", List[int]]] = {} # Key -> (task, [waiter count])
+        self.counters = {"started": 0, "coalesced": 0}
+
+    async def run(self, key: str, start: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaits the in-flight task for key, or the one created by calling start() if there is none."""
+        if key in self._in_flight:
+            task, waiters = self._in_flight[key]
+            self.counters["coalesced"] += 1
+        else:
+            task, waiters = asyncio.ensure_future(start()), [0]
+            self._in_flight[key] = (task, waiters)
+            task.add_done_callback(lambda done_task: self._forget(key, done_task))
+            self.counters["started"] += 1
+        waiters[0] += 1
+        try:
+            # Shielded, so one caller disconnecting doesn't cancel the work for the others
+            return await asyncio.shield(task)
+        finally:
+            waiters[0] -= 1
+            if waiters[0] == 0 and not task.done():
+                # Forgotten right away, so an identical request arriving while the task unwinds starts afresh
+                self._forget(key, task)
+                task.cancel()
+
+    def _forget(self, key: str, done_task: "asyncio.Task[Any]") -> None:
+        if key in self._in_flight and self._in_flight[key][0] is done_task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "in_flight": len(self._in_flight)}
+
+
+split_scenes_single_flight = SingleFlight()
+
+
+def _split_request_key(text: str, document_id: Optional[str]) -> str:
+    """
+    Identifies a /split-scenes computation: the text and every parameter its result depends on. The text
+    is hashed as submitted, not normalized, since scene offsets index it and must hold for every caller.
+    """
+    hasher = hashlib.sha256()
+    params = [document_id or "", DEFAULT_MODEL, SCENE_PROMPT_VERSION, CHUNKING_MODE, BOUNDARY_MERGE_MODE, str(TARGET_CHUNK_SIZE_WORDS), str(WORD_COUNT_SLACK)]
+    for part in (*params, text):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    # Label values are the module's own call types and outcomes, so they need no escaping
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def _prometheus_metric(lines: List[str], name: str, metric_type: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    lines.extend(f"{name}{_prometheus_labels(labels)} {value}" for labels, value in samples)
+
+
+def _prometheus_histogram(lines: List[str], name: str, help_text: str, histograms: List[Tuple[Dict[str, str], Histogram]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms:
+        cumulative = 0
+        for bound, bucket_count in zip((*histogram.bucket_bounds, "+Inf"), histogram.bucket_counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_prometheus_labels({**labels, 'le': str(bound)})} {cumulative}")
+        lines.append(f"{name}_sum{_prometheus_labels(labels)} {histogram.total}")
+        lines.append(f"{name}_count{_prometheus_labels(labels)} {histogram.count}")
+
+
+def _render_prometheus_metrics(scene_cache_stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Every counter, gauge and histogram of the service in the Prometheus text exposition format. The scene
+    cache metrics need a SQLite query, so the caller passes SceneCache.stats(); None leaves them out.
+    """
+    lines: List[str] = []
+    _prometheus_histogram(
+        lines, "text_chunker_llm_call_duration_seconds", "LLM call latency per call type, with queueing, retries and hedges.",
+        [({"call_type": call_type}, histogram) for call_type, histogram in sorted(llm_call_type_histograms.items())],
+    )
+    _prometheus_metric(
+        lines, "text_chunker_llm_tokens_total", "counter", "Tokens sent to and received from the LLM, as reported by the provider.",
+        [({"call_type": call_type, "direction": direction}, count)
+         for call_type, tokens in sorted(llm_call_type_tokens.items()) for direction, count in tokens.items()],
+    )
+    _prometheus_histogram(lines, "text_chunker_llm_request_duration_seconds", "Latency of single LLM requests, once past the rate limiter.", [({}, llm_latency_histograms["request"])])
+    _prometheus_metric(lines, "text_chunker_llm_retries_total", "counter", "LLM requests retried after a transient failure.", [({}, llm_call_stats["retries"])])
+    _prometheus_metric(
+        lines, "text_chunker_llm_hedges_total", "counter", "Hedged duplicate LLM requests sent, and how many answered first.",
+        [({"outcome": "sent"}, llm_call_stats["hedges_sent"]), ({"outcome": "won"}, llm_call_stats["hedges_won"])],
+    )
+    rate_limiter_stats = llm_rate_limiter.stats()
+    _prometheus_metric(lines, "text_chunker_llm_concurrency_limit", "gauge", "Current AIMD concurrency limit of the LLM rate limiter.", [({}, llm_rate_limiter.concurrency_limit)])
+    _prometheus_metric(lines, "text_chunker_llm_concurrency_decreases_total", "counter", "Times the AIMD concurrency limit was cut after a 429 or 5xx.", [({}, llm_rate_limiter.counters["concurrency_decreases"])])
+    _prometheus_metric(lines, "text_chunker_llm_requests_in_flight", "gauge", "LLM requests holding a rate limiter slot.", [({}, rate_limiter_stats["in_flight"])])
+    _prometheus_metric(lines, "text_chunker_llm_requests_waiting", "gauge", "LLM requests waiting for a rate limiter slot.", [({}, rate_limiter_stats["waiting_for_slot"])])
+    _prometheus_metric(lines, "text_chunker_llm_cooldown_seconds", "gauge", "Seconds left in the pause after a throttled LLM request.", [({}, llm_rate_limiter.cooldown_seconds_left())])
+    _prometheus_metric(lines, "text_chunker_llm_throttled_total", "counter", "LLM requests answered with a 429 or 5xx.", [({}, llm_rate_limiter.counters["throttled"])])
+    _prometheus_metric(lines, "text_chunker_llm_retry_after_honoured_total", "counter", "Throttled LLM requests whose Retry-After header was waited for.", [({}, llm_rate_limiter.counters["retry_after_honoured"])])
+    _prometheus_metric(
+        lines, "text_chunker_fixer_invocations_total", "counter", "LLM fixer calls, for the failing scene items only or for the whole chunk.",
+        [({"fixer": fixer}, count) for fixer, count in fixer_invocation_stats.items()],
+    )
+    _prometheus_metric(
+        lines, "text_chunker_scene_outputs_total", "counter", "Scene extraction outputs by how they were made valid.",
+        [({"outcome": outcome}, count) for outcome, count in json_repair_stats.items()],
+    )
+    _prometheus_metric(
+        lines, "text_chunker_chunks_total", "counter", "Major chunks by outcome; skipped chunks are missing from their text's scenes.",
+        [({"outcome": outcome}, chunk_stats[outcome]) for outcome in ("extracted", "skipped_empty", "skipped_error", "failed_throttled")],
+    )
+    _prometheus_metric(lines, "text_chunker_chunking_cpu_seconds_total", "counter", "CPU time spent computing chunk boundaries.", [({}, chunk_stats["chunking_cpu_seconds"])])
+    _prometheus_histogram(lines, "text_chunker_scenes_per_chunk", "Scenes extracted per major chunk.", [({}, scenes_per_chunk_histogram)])
+    _prometheus_metric(
+        lines, "text_chunker_boundary_checks_total", "counter", "Chunk boundary checks decided by the local pre-filter or sent to the LLM.",
+        [({"outcome": outcome}, count) for outcome, count in boundary_prefilter_stats.items()],
+    )
+    if scene_cache_stats is not None:
+        _prometheus_metric(
+            lines, "text_chunker_scene_cache_lookups_total", "counter", "Scene cache lookups by result.",
+            [({"result": "hit"}, scene_cache_stats["hits"]), ({"result": "miss"}, scene_cache_stats["misses"])],
+        )
+        _prometheus_metric(lines, "text_chunker_scene_cache_evictions_total", "counter", "Scene cache entries evicted to stay under the size limit.", [({}, scene_cache_stats["evictions"])])
+        _prometheus_metric(lines, "text_chunker_scene_cache_entries", "gauge", "Chunks whose scenes are in the scene cache.", [({}, scene_cache_stats["entries"])])
+        _prometheus_metric(lines, "text_chunker_scene_cache_bytes", "gauge", "Size of the cached scenes.", [({}, scene_cache_stats["bytes"])])
+        _prometheus_metric(lines, "text_chunker_scene_cache_max_bytes", "gauge", "Size above which the scene cache evicts its least recently used entries.", [({}, scene_cache_stats["max_bytes"])])
+    single_flight_stats = split_scenes_single_flight.stats()
+    _prometheus_metric(
+        lines, "text_chunker_split_requests_total", "counter", "/split-scenes requests that started a run, or joined an identical one in flight.",
+        [({"outcome": outcome}, single_flight_stats[outcome]) for outcome in ("started", "coalesced")],
+    )
+    _prometheus_metric(lines, "text_chunker_split_requests_in_flight", "gauge", "Distinct /split-scenes runs in flight.", [({}, single_flight_stats["in_flight"])])
+    scheduler_stats = batch_chunk_scheduler.stats()
+    _prometheus_metric(lines, "text_chunker_batch_chunks_running", "gauge", "Chunks of /split-scenes/batch documents being extracted.", [({}, scheduler_stats["running"])])
+    _prometheus_metric(lines, "text_chunker_batch_chunks_waiting", "gauge", "Chunks of /split-scenes/batch documents waiting for a slot.", [({}, scheduler_stats["waiting_chunks"])])
+    _prometheus_metric(lines, "text_chunker_batch_documents_waiting", "gauge", "/split-scenes/batch documents with chunks waiting for a slot.", [({}, scheduler_stats["waiting_documents"])])
+    return "\n".join(lines) + "\n"
+
+
 @app.post("/split-scenes", response_model=ScenesResponse)
 async def split_text_into_scenes(input_data: TextInput):
     """
@@ -523,12 +3048,144 @@ async def split_text_into_scenes(input_data: TextInput):
     # Otherwise, use the direct method (which is now wrapped in _process_single_chunk_for_scenes if we call it directly)
     # For now, let's always use process_large_text to test the chunking.
     # A more sophisticated length check can be added later.
-    print(f"Received text for scene splitting, length: {len(input_data.text)} chars.")
+    api_log.info("Received text for scene splitting, length: %s chars.", len(input_data.text))
     if len(input_data.text) == 0:
         return ScenesResponse(scenes=[])
 
-    # Use the new large text processing logic
-    return await process_large_text(input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK)
+    # Identical requests already in flight (frontend retries, several users on the same book) share one run
+    return await split_scenes_single_flight.run(
+        _split_request_key(input_data.text, input_data.document_id),
+        lambda: process_large_text(input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK, document_id=input_data.document_id),
+    )
+
+
+@app.post("/split-scenes/stream")
+async def split_text_into_scenes_stream(input_data: TextInput):
+    """
+    Splits text into individual scenes, streaming them as NDJSON while the text is processed.
+    Each line is {"type": "scene", "index": n, "scene": {...}}; the last line is {"type": "done", "total_scenes": n},
+    or {"type": "error", "detail": "..."} if processing failed part way through.
+    """
+    api_log.info("Received text for streamed scene splitting, length: %s chars.", len(input_data.text))
+
+    async def _ndjson_lines() -> AsyncIterator[str]:
+        scene_count = 0
+        try:
+            if input_data.text:
+                async for scene in stream_large_text_scenes(input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK):
+                    yield json.dumps({"type": "scene", "index": scene_count, "scene": scene.model_dump()}, ensure_ascii=False) + "\n"
+                    scene_count += 1
+        except Exception as e:
+            api_log.error("Error while streaming scenes: %s", e)
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+            return
+        yield json.dumps({"type": "done", "total_scenes": scene_count}) + "\n"
+
+    # X-Accel-Buffering stops nginx-style proxies from holding lines back until the response ends
+    return StreamingResponse(_ndjson_lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+@app.post("/split-scenes/batch")
+async def split_batch_into_scenes(batch_input: BatchTextInput):
+    """
+    Splits many documents into scenes at once, streaming NDJSON as results come in. All chunks of all
+    documents share one global concurrency budget (BATCH_MAX_CONCURRENT_CHUNKS), handed out round-robin
+    between documents. Lines are {"type": "scene", "document": i, "document_id": ..., "index": n, "scene": {...}},
+    then {"type": "document_done", "document": i, "document_id": ..., "total_scenes": n} or
+    {"type": "document_error", "document": i, "document_id": ..., "detail": "..."} per document,
+    and finally {"type": "done", "total_documents": n}.
+    """
+    api_log.info("Received batch of %s documents for scene splitting.", len(batch_input.documents))
+    batch_id = uuid.uuid4().hex[:8]
+
+    async def _ndjson_lines() -> AsyncIterator[str]:
+        lines: asyncio.Queue = asyncio.Queue()
+
+        async def _document_scenes(input_data: TextInput, scheduler_key: str) -> AsyncIterator[Scene]:
+            if not input_data.text:
+                return
+            if input_data.document_id:
+                # Incremental runs merge all chunk boundaries at the end, so their scenes arrive together
+                scenes_response = await process_large_text(
+                    input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK, document_id=input_data.document_id,
+                    scheduler=batch_chunk_scheduler, scheduler_key=scheduler_key,
+                )
+                for scene in scenes_response.scenes:
+                    yield scene
+            else:
+                async for scene in stream_large_text_scenes(
+                    input_data.text, TARGET_CHUNK_SIZE_WORDS, WORD_COUNT_SLACK,
+                    scheduler=batch_chunk_scheduler, scheduler_key=scheduler_key,
+                ):
+                    yield scene
+
+        async def _split_document(document_number: int, input_data: TextInput) -> None:
+            line_base = {"document": document_number, "document_id": input_data.document_id}
+            scene_count = 0
+            try:
+                async for scene in _document_scenes(input_data, f"{batch_id}:{document_number}"):
+                    await lines.put({**line_base, "type": "scene", "index": scene_count, "scene": scene.model_dump()})
+                    scene_count += 1
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                api_log.error("Error while splitting batch document %s: %s", document_number, detail)
+                await lines.put({**line_base, "type": "document_error", "detail": detail})
+                return
+            await lines.put({**line_base, "type": "document_done", "total_scenes": scene_count})
+
+        document_tasks = [asyncio.create_task(_split_document(i, input_data)) for i, input_data in enumerate(batch_input.documents)]
+        try:
+            documents_left = len(document_tasks)
+            while documents_left:
+                line = await lines.get()
+                if line["type"] in ("document_done", "document_error"):
+                    documents_left -= 1
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "done", "total_documents": len(document_tasks)}) + "\n"
+        finally:
+            # The client may disconnect mid-stream; stop every document still in progress
+            for document_task in document_tasks:
+                document_task.cancel()
+
+    return StreamingResponse(_ndjson_lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+@app.post("/jobs/split-scenes", status_code=202)
+async def create_split_scenes_job(input_data: TextInput):
+    """
+    Queues the text for scene splitting on the background workers and returns the job id immediately.
+    Poll GET /jobs/{job_id} for its status, partial scenes and final result, which is kept for
+    JOB_RETENTION_HOURS after the job finishes. Use this for books that take longer than an HTTP
+    request can stay open.
+    """
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job workers are not running.")
+    state = await asyncio.to_thread(_get_job_store().create, input_data)
+    job_queue.put_nowait(state.job_id)
+    api_log.info("Queued job %s for scene splitting, length: %s chars.", state.job_id, len(input_data.text))
+    return {"job_id": state.job_id, "status": state.status}
+
+
+@app.get("/jobs/{job_id}", response_model=JobState)
+async def get_split_scenes_job(job_id: str):
+    """Status of a background job: its partial scenes while running, and the ScenesResponse once done."""
+    state = await asyncio.to_thread(_get_job_store().load, job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return state
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for the LLM calls, chunking, the scene cache and request scheduling."""
+    scene_cache_stats = None
+    try:
+        cache = _get_scene_cache()
+        if cache is not None:
+            scene_cache_stats = await asyncio.to_thread(cache.stats)
+    except (sqlite3.Error, OSError) as e:
+        api_log.warning("Scene cache unavailable, leaving it out of the metrics: %s", e)
+    return PlainTextResponse(_render_prometheus_metrics(scene_cache_stats), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
@@ -553,7 +3210,12 @@ async def main():
     # Faced with this terrible choice, Elena had to decide: continue using her gift to help others at the cost of her own life, or keep the secret to herself and watch her neighbors age and suffer. In the end, she chose compassion over self-preservation, becoming a legend that would be told for generations to come.
     # """
 
-    response = await split_text_into_scenes(TextInput(text=text))
+    try:
+        response = await split_text_into_scenes(TextInput(text=text))
+    finally:
+        await _close_llm_client()
+        _close_scene_cache()
+        _close_document_store()
     pprint(response.scenes)
 
 
@@ -0,0 +1,45 @@
+"""
+Shared setup for the text-chunker tests: the chunker and benchmark modules on the import path, no real
+cache or provider, and fixtures for the rate limiter and a simulated LLM.
+"""
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Set before main is imported: no test may read or write the scene cache under .cache, or reach the provider
+os.environ["SCENE_CACHE_PATH"] = ""
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import benchmark_boundary_strategies as benchmark  # noqa: E402
+import main as chunker  # noqa: E402
+
+
+@pytest.fixture
+def rate_limiter(monkeypatch):
+    limiter = chunker.AdaptiveRateLimiter(0, 0, initial_concurrency=8, min_concurrency=1, max_concurrency=8)
+    monkeypatch.setattr(chunker, "llm_rate_limiter", limiter)
+    return limiter
+
+
+@pytest.fixture
+def simulated_llm(monkeypatch, tmp_path):
+    """The SimulatedLLM in place of the provider, recording every prompt, with a fresh document store and no scene cache."""
+    simulated = benchmark.SimulatedLLM(call_latency=1.0, seconds_per_output_token=0.0, time_scale=0.001)
+    prompts = []
+
+    async def recording_llm(client, prompt_content, system_message, model, **kwargs):
+        prompts.append(prompt_content)
+        return await simulated(client, prompt_content, system_message, model, **kwargs)
+
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", recording_llm)
+    monkeypatch.setattr(chunker, "SCENE_CACHE_PATH", "")
+    monkeypatch.setattr(chunker, "scene_cache", None)
+    monkeypatch.setattr(chunker, "DOCUMENT_STORE_PATH", str(tmp_path / "documents.sqlite3"))
+    monkeypatch.setattr(chunker, "document_store", None)
+    yield SimpleNamespace(prompts=prompts, extraction_prompts=lambda: [p for p in prompts if p.startswith(simulated.extraction_prefix)])
+    chunker._close_document_store()
@@ -0,0 +1,68 @@
+"""Fake provider clients, scripted LLM answers and scene payloads for tests of the LLM call path."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+from openai import RateLimitError
+
+
+def completion(content: str, usage=None) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")], usage=usage)
+
+
+def rate_limit_error(retry_after_ms: int) -> RateLimitError:
+    request = httpx.Request("POST", "https://llm.test/chat/completions")
+    response = httpx.Response(429, headers={"retry-after-ms": str(retry_after_ms)}, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+class FakeClient:
+    """Stands in for AsyncOpenAI: each request runs the next behaviour, an async function of the request number."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.requests = 0
+        self.cancelled = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model, messages):
+        request_number = self.requests
+        self.requests += 1
+        try:
+            return await self.behaviours[min(request_number, len(self.behaviours) - 1)](request_number)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def answer_after(seconds: float):
+    async def behaviour(request_number: int):
+        await asyncio.sleep(seconds)
+        return completion(f"answer {request_number}")
+    return behaviour
+
+
+class ScriptedLLM:
+    """Stands in for _call_llm_with_finish_reason, answering each call with the next (content, finish_reason) or raising the next exception."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def __call__(self, client, prompt_content, system_message, model, **kwargs):
+        self.prompts.append(prompt_content)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def scene_item(number: int, **overrides) -> dict:
+    """A valid scene item as the LLM returns it, labelled S<number> in elementi_narrativi."""
+    fields = {"elementi_narrativi": f"S{number}", "personaggi": "Macbeth", "ambientazione": "castello", "mood_vibe": "cupo", "azione_in_corso": "attende"}
+    return {**fields, **overrides}
+
+
+def scene_array(*items) -> str:
+    return json.dumps(list(items), ensure_ascii=False)
@@ -0,0 +1,51 @@
+"""Tests for the batched boundary mode: parsing the one-call verdicts for every chunk seam."""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import main as chunker
+from fakes import ScriptedLLM, scene_item
+
+
+def _verdicts(*pairs) -> str:
+    return json.dumps([{"coppia": pair, "unire": merge} for pair, merge in pairs])
+
+
+@pytest.mark.parametrize("llm_content, expected_pairs, expected_verdicts", [
+    (_verdicts((1, True), (2, False), (3, True)), 3, [True, False, True]),
+    # Returned in pair order, whatever order the model wrote them in
+    (_verdicts((2, False), (3, True), (1, True)), 3, [True, False, True]),
+    ("Ecco i verdetti:\n```json\n" + _verdicts((1, False)) + "\n```", 1, [False]),
+    # Values the lax schema coerces
+    ('[{"coppia": "1", "unire": "yes"}, {"coppia": 2, "unire": 0}]', 2, [True, False]),
+])
+def test_parse_batched_boundary_verdicts(llm_content, expected_pairs, expected_verdicts):
+    assert chunker._parse_batched_boundary_verdicts(llm_content, expected_pairs) == expected_verdicts
+
+
+@pytest.mark.parametrize("llm_content, expected_pairs", [
+    (_verdicts((1, True)), 2),
+    (_verdicts((1, True), (2, False), (3, True)), 2),
+    (_verdicts((1, True), (1, False)), 2),
+    (_verdicts((0, True), (1, False)), 2),
+    ('{"coppia": 1, "unire": true}', 1),
+    ('[{"coppia": 1}]', 1),
+    ('[{"coppia": 1, "unire": "forse"}]', 1),
+    ("Unisci la prima coppia.", 1),
+])
+def test_parse_batched_boundary_verdicts_rejects_incomplete_or_malformed_verdicts(llm_content, expected_pairs):
+    with pytest.raises(ValueError): # json.JSONDecodeError and pydantic.ValidationError are ValueErrors
+        chunker._parse_batched_boundary_verdicts(llm_content, expected_pairs)
+
+
+@pytest.mark.parametrize("llm_response, expected", [
+    ((_verdicts((1, True), (2, False)), "stop"), [True, False]),
+    ((_verdicts((1, True)), "stop"), None),
+    (HTTPException(status_code=500, detail="boundary call failed"), None),
+])
+def test_batched_boundary_call_returns_none_for_the_per_seam_fallback(monkeypatch, llm_response, expected):
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", ScriptedLLM(llm_response))
+    scene_pairs = [(chunker.Scene(**scene_item(1)), chunker.Scene(**scene_item(1))), (chunker.Scene(**scene_item(2)), chunker.Scene(**scene_item(3)))]
+    assert asyncio.run(chunker._llm_batch_should_merge_scenes(scene_pairs)) == expected
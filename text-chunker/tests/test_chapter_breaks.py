@@ -0,0 +1,74 @@
+"""Tests for chapter-aware chunking: which lines count as chapter headings, and where chunks break around them."""
+import pytest
+
+import main as chunker
+
+
+@pytest.mark.parametrize("line, is_heading", [
+    ("Capitolo 3", True),
+    ("CAPITOLO XII", True),
+    ("Capitolo 3: Il ritorno", True),
+    ("Chapter IV - The Return", True),
+    ("Chapter Seven", True),
+    ("Parte seconda", True),
+    ("Libro primo. La partenza", True),
+    ("Prologo", True),
+    ("Epilogue", True),
+    ("12", True),
+    ("XIV.", True),
+    ("V", True),
+    ("I.", True),
+    ("## Il ritorno", True),
+    ("***", True),
+    ("* * *", True),
+    ("~~~", True),
+    ("  Capitolo 3  ", True),
+    # Prose that starts like a heading
+    ("I", False),
+    ("I went home.", False),
+    ("Book 3 lay open on the table.", False),
+    ("Capitolo 3 fu il più difficile da scrivere.", False),
+    ("Chapter and verse, he said.", False),
+    ("2024 fu un anno difficile.", False),
+    ("Prologo e epilogo erano già scritti.", False),
+    ("C'era una volta un re.", False),
+    ("**Grassetto** nel testo", False),
+    ("-- disse lui", False),
+])
+def test_chapter_heading_lines(line, is_heading):
+    paragraph = "Fine del paragrafo.\n\n"
+    text = paragraph + line + "\nIl testo continua."
+    assert chunker._starts_at_chapter_heading(text, len(paragraph)) is is_heading
+
+
+@pytest.mark.parametrize("text", [
+    "Fine del paragrafo.\nCapitolo 3\nIl testo continua.",
+    "Capitolo 3\n\nIl testo continua.",
+])
+def test_heading_needs_a_blank_line_before_it(text):
+    assert not any(chunker._starts_at_chapter_heading(text, offset) for offset in range(len(text) + 1))
+
+
+def test_heading_may_end_the_text():
+    text = "Fine del paragrafo.\n\nCapitolo 3"
+    assert chunker._starts_at_chapter_heading(text, text.index("Capitolo"))
+
+
+def _book(*paragraphs: str) -> str:
+    return "\n\n".join(paragraphs)
+
+
+def test_last_chapter_break_is_the_last_heading_in_the_window():
+    text = _book("Uno.", "Capitolo 1", "Due.", "Capitolo 2", "Tre.", "Quattro.")
+    index = chunker._BreakPointIndex(text)
+    assert index.last_chapter_break(0, len(text)) == text.index("Capitolo 2")
+    assert index.last_chapter_break(0, text.index("Capitolo 2") - 1) == text.index("Capitolo 1")
+    assert index.last_chapter_break(text.index("Tre."), len(text)) is None
+
+
+@pytest.mark.parametrize("chapter_aware, expected_break", [(True, "Capitolo 2"), (False, "Quattro.")])
+def test_natural_break_prefers_a_chapter_heading_to_a_later_paragraph_break(monkeypatch, chapter_aware, expected_break):
+    monkeypatch.setattr(chunker, "CHAPTER_AWARE_CHUNKING", chapter_aware)
+    text = _book("Uno.", "Capitolo 2", "Tre.", "Quattro.", "Cinque.")
+    index = chunker._BreakPointIndex(text)
+    assert chunker._find_natural_break_point(index, 0, text.index("Cinque.") - 1) == text.index(expected_break)
@@ -0,0 +1,60 @@
+"""Tests for truncation-aware continuation: a cut-off scene array is completed with follow-up requests."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main as chunker
+from fakes import ScriptedLLM, scene_array, scene_item
+
+
+def _cut_off(*items) -> str:
+    """A scene array that stops partway through the object after items."""
+    return scene_array(*items, scene_item(99))[:-40]
+
+
+@pytest.mark.parametrize("continuations, expected_labels, expected_partial", [
+    ([(scene_array(scene_item(3)), "stop")], ["S1", "S2", "S3"], False),
+    # The model restated the last scene it had already returned
+    ([(scene_array(scene_item(2), scene_item(3)), "stop")], ["S1", "S2", "S3"], False),
+    ([(scene_array(), "stop")], ["S1", "S2"], False),
+    # Cut off again, then finished
+    ([(_cut_off(scene_item(3)), "length"), (scene_array(scene_item(4)), "stop")], ["S1", "S2", "S3", "S4"], False),
+    # Still cut off after MAX_CONTINUATION_REQUESTS
+    ([(_cut_off(scene_item(3)), "length"), (_cut_off(scene_item(4)), "length")], ["S1", "S2", "S3", "S4"], True),
+    ([(_cut_off(), "length")], ["S1", "S2"], True),
+    ([HTTPException(status_code=500, detail="continuation failed")], ["S1", "S2"], True),
+    ([("Non ci sono altre scene.", "stop")], ["S1", "S2"], True),
+    ([(scene_array(scene_item(3), {"elementi_narrativi": "S4"}), "stop")], ["S1", "S2", "S3"], True),
+])
+def test_cut_off_extraction_is_continued(monkeypatch, continuations, expected_labels, expected_partial):
+    monkeypatch.setattr(chunker, "MAX_CONTINUATION_REQUESTS", 2)
+    llm = ScriptedLLM((_cut_off(scene_item(1), scene_item(2)), "length"), *continuations)
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", llm)
+    response = asyncio.run(chunker._extract_scenes_with_llm("testo"))
+    assert [scene.elementi_narrativi for scene in response.scenes] == expected_labels
+    assert response.partial is expected_partial
+    assert not llm.responses
+    # Each continuation asks for the scenes after the last complete one so far
+    assert '"S2"' in llm.prompts[1]
+
+
+@pytest.mark.parametrize("output, finish_reason, expected_truncated", [
+    (scene_array(scene_item(1)), "length", True),
+    (_cut_off(scene_item(1)), "stop", True),
+    (scene_array(scene_item(1)), "stop", False),
+    ("Nessuna scena.", "stop", False),
+])
+def test_is_truncated_scene_output(output, finish_reason, expected_truncated):
+    assert chunker._is_truncated_scene_output(output, finish_reason) is expected_truncated
+
+
+def test_output_cut_off_before_its_first_scene_goes_to_the_fixer(monkeypatch):
+    llm = ScriptedLLM((_cut_off(), "length"), (scene_array(scene_item(1)), "stop"))
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", llm)
+    fixer_calls = {"items": 0, "full": 0}
+    monkeypatch.setattr(chunker, "fixer_invocation_stats", fixer_calls)
+    response = asyncio.run(chunker._extract_scenes_with_llm("testo"))
+    assert [scene.elementi_narrativi for scene in response.scenes] == ["S1"]
+    assert not response.partial
+    assert fixer_calls == {"items": 0, "full": 1}
@@ -0,0 +1,60 @@
+"""Tests for FairChunkScheduler, which hands the batch endpoint's chunk slots round-robin between documents."""
+import asyncio
+
+import main as chunker
+
+
+def test_fair_scheduler_skips_a_cancelled_waiter_and_alternates_documents():
+    async def scenario():
+        scheduler = chunker.FairChunkScheduler(1)
+        order = []
+        release_first = asyncio.Event()
+
+        async def chunk(document_key, name, hold=None):
+            async with scheduler.slot(document_key):
+                order.append(name)
+                if hold is not None:
+                    await hold.wait()
+
+        first = asyncio.create_task(chunk("long", "long-0", release_first))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(chunk(document_key, name)) for document_key, name in (
+            ("long", "long-1"), ("long", "long-2"), ("short", "short-0"), ("short", "short-1")
+        )]
+        await asyncio.sleep(0)
+        waiting[0].cancel()
+        await asyncio.sleep(0)
+        release_first.set()
+        await asyncio.wait_for(asyncio.gather(first, *waiting[1:]), timeout=1)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["long-0", "short-0", "long-2", "short-1"]
+    assert (stats["running"], stats["waiting_chunks"], stats["waiting_documents"]) == (0, 0, 0)
+
+
+def test_fair_scheduler_passes_on_a_slot_handed_to_a_waiter_being_cancelled():
+    async def scenario():
+        scheduler = chunker.FairChunkScheduler(1)
+        order = []
+        tasks = {}
+
+        async def chunk(document_key, name):
+            async with scheduler.slot(document_key):
+                order.append(name)
+                await asyncio.sleep(0)
+            if name == "a-0":
+                # In the same step as the release handed it the slot, before it could run
+                tasks["b-0"].cancel()
+
+        tasks["a-0"] = asyncio.create_task(chunk("a", "a-0"))
+        await asyncio.sleep(0)
+        tasks["b-0"] = asyncio.create_task(chunk("b", "b-0"))
+        tasks["c-0"] = asyncio.create_task(chunk("c", "c-0"))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(asyncio.gather(*tasks.values(), return_exceptions=True), timeout=1)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["a-0", "c-0"]
+    assert (stats["running"], stats["waiting_chunks"]) == (0, 0)
@@ -0,0 +1,57 @@
+"""Tests for hedged LLM requests: the losing request is cancelled and every rate limiter slot is released."""
+import asyncio
+import contextlib
+
+import main as chunker
+from fakes import FakeClient, answer_after
+
+
+def test_hedge_cancels_the_slow_request_and_releases_its_slot(monkeypatch, rate_limiter):
+    monkeypatch.setattr(chunker, "LLM_HEDGE_AFTER_SECONDS", 0.02)
+    client = FakeClient(answer_after(10), answer_after(0))
+
+    async def scenario():
+        content, _ = await chunker._call_llm_with_finish_reason(client, "prompt", "system", "model")
+        await asyncio.sleep(0) # Let the cancelled primary request leave its slot
+        return content
+
+    assert asyncio.run(scenario()) == "answer 1"
+    assert client.cancelled == 1
+    assert rate_limiter.stats()["in_flight"] == 0
+
+
+def test_hedge_waiting_for_a_slot_leaves_the_queue_when_cancelled(monkeypatch, rate_limiter):
+    monkeypatch.setattr(chunker, "LLM_HEDGE_AFTER_SECONDS", 0.02)
+    rate_limiter.concurrency_limit = rate_limiter.max_concurrency = 1
+    client = FakeClient(answer_after(0.1), answer_after(0))
+
+    async def scenario():
+        content, _ = await chunker._call_llm_with_finish_reason(client, "prompt", "system", "model")
+        await asyncio.sleep(0)
+        stats = rate_limiter.stats()
+        # The slot must still be usable: a leaked one would make this call wait forever
+        follow_up, _ = await asyncio.wait_for(chunker._call_llm_with_finish_reason(client, "prompt", "system", "model"), timeout=1)
+        return content, stats, follow_up
+
+    content, stats, follow_up = asyncio.run(scenario())
+    assert content == "answer 0" # The hedge only got a slot once the primary was done with it
+    assert (stats["in_flight"], stats["waiting_for_slot"]) == (0, 0)
+    assert follow_up.startswith("answer")
+
+
+def test_caller_cancelled_during_a_hedge_releases_both_slots(monkeypatch, rate_limiter):
+    monkeypatch.setattr(chunker, "LLM_HEDGE_AFTER_SECONDS", 0.01)
+    client = FakeClient(answer_after(10))
+
+    async def scenario():
+        call = asyncio.create_task(chunker._call_llm_with_finish_reason(client, "prompt", "system", "model"))
+        while client.requests < 2:
+            await asyncio.sleep(0.005)
+        call.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await call
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert client.cancelled == 2
+    assert rate_limiter.stats()["in_flight"] == 0
@@ -0,0 +1,42 @@
+"""Tests for incremental re-chunking: a re-submitted document only re-extracts the chunks that changed."""
+import asyncio
+
+import pytest
+
+import benchmark_boundary_strategies as benchmark
+import main as chunker
+
+
+@pytest.mark.parametrize("edit_at", ["start", "middle", "end"])
+def test_incremental_run_re_extracts_only_the_edited_chunk(simulated_llm, edit_at):
+    text = benchmark.build_scened_book(20_000)
+    if edit_at == "end":
+        edit_offset = len(text)
+    else:
+        # Just after a scene marker, so the edited paragraph keeps its scene
+        edit_offset = text.index("] ", 0 if edit_at == "start" else len(text) // 2) + 2
+    edited_text = text[:edit_offset] + "Poi qualcuno bussò alla porta. " + text[edit_offset:]
+
+    async def split(document_text):
+        return await chunker.process_large_text(
+            document_text, chunker.TARGET_CHUNK_SIZE_WORDS, chunker.WORD_COUNT_SLACK, document_id="book", boundary_merge_mode="sequential"
+        )
+
+    async def scenario():
+        await split(text)
+        previous_state = chunker._get_document_store().load("book")
+        extractions_before = len(simulated_llm.extraction_prompts())
+        edited_response = await split(edited_text)
+        state = chunker._get_document_store().load("book")
+        return previous_state, state, len(simulated_llm.extraction_prompts()) - extractions_before, edited_response
+
+    previous_state, state, re_extracted, edited_response = asyncio.run(scenario())
+    assert len(previous_state.chunks) > 3
+    assert re_extracted == 1
+    previous_hashes = [chunk.text_hash for chunk in previous_state.chunks]
+    assert sum(chunk.text_hash not in previous_hashes for chunk in state.chunks) == 1
+    # Chunks after the edit moved by its length, and still index their own text
+    for chunk in state.chunks:
+        assert chunker._chunk_text_hash(edited_text[chunk.start_char:chunk.end_char]) == chunk.text_hash
+    expected_scenes = len(set(benchmark.SCENE_MARKER_RE.findall(text)))
+    assert benchmark._scene_accuracy(edited_response.scenes, edited_text).startswith(f"{expected_scenes}/{expected_scenes} scenes exact")
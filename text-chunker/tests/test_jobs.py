@@ -0,0 +1,40 @@
+"""Tests for the background job store: finished jobs are deleted once past their retention time."""
+import asyncio
+import time
+
+import pytest
+
+import main as chunker
+
+
+@pytest.fixture
+def job_store(monkeypatch):
+    store = chunker.JobStore(":memory:")
+    monkeypatch.setattr(chunker, "job_store", store)
+    yield store
+    store.close()
+
+
+def _job(store: chunker.JobStore, status: str) -> str:
+    state = store.create(chunker.TextInput(text="C'era una volta."))
+    state.status = status
+    store.save(state)
+    return state.job_id
+
+
+def test_finished_jobs_are_deleted_after_the_cutoff_and_unfinished_ones_kept(job_store):
+    job_ids = {status: _job(job_store, status) for status in ("queued", "running", "done", "failed")}
+    assert job_store.delete_finished_before(time.time() - 60) == 0
+    assert job_store.delete_finished_before(time.time() + 1) == 2
+    assert job_store.load(job_ids["done"]) is None and job_store.load_input(job_ids["failed"]) is None
+    assert job_store.unfinished_job_ids() == [job_ids["queued"], job_ids["running"]]
+
+
+@pytest.mark.parametrize("hours_since_finished, retention_hours, kept", [(0.5, 1, True), (2, 1, False), (2, 0, True)])
+def test_expired_jobs_follow_the_retention_setting(monkeypatch, job_store, hours_since_finished, retention_hours, kept):
+    monkeypatch.setattr(chunker, "JOB_RETENTION_HOURS", retention_hours)
+    job_id = _job(job_store, "done")
+    later = time.time() + hours_since_finished * 3600
+    monkeypatch.setattr(chunker.time, "time", lambda: later)
+    asyncio.run(chunker._delete_expired_jobs())
+    assert (job_store.load(job_id) is not None) is kept
@@ -0,0 +1,89 @@
+"""Tests for locating the scene array in an LLM output and the local JSON repairs tried before the fixer call."""
+import json
+
+import pytest
+
+import main as chunker
+
+SCENE = {"elementi_narrativi": "a", "personaggi": "b", "ambientazione": "c", "mood_vibe": "d", "azione_in_corso": "e"}
+SCENE_JSON = json.dumps(SCENE)
+
+
+@pytest.mark.parametrize("content, expected_start", [
+    ("[" + SCENE_JSON + "]", 0),
+    ("Ecco le scene:\n[ \n " + SCENE_JSON + "]", 15),
+    # An empty array or a bracketed note in prose before the payload is skipped
+    ("Nessun [] qui, ecco: [" + SCENE_JSON + "]", 21),
+    ("Vedi [nota 1]. [" + SCENE_JSON + "]", 15),
+    ("Non ci sono scene: []", 19),
+    ("Vedi [nota 1].", 5),
+    ("Nessun array.", None),
+])
+def test_find_json_array_start(content, expected_start):
+    assert chunker._find_json_array_start(content) == expected_start
+
+
+@pytest.mark.parametrize("content, expected_payload", [
+    ("Scene: [" + SCENE_JSON + "] Fine [nota].", "[" + SCENE_JSON + "]"),
+    # Brackets inside string values don't end the array
+    ('[{"mood_vibe": "cupo ]"}] dopo', '[{"mood_vibe": "cupo ]"}]'),
+    ('[{"mood_vibe": "virgolette \\" e ] dentro"}]', '[{"mood_vibe": "virgolette \\" e ] dentro"}]'),
+    # An array that never closes runs to the end of the output
+    ('[{"mood_vibe": "a"}, {"mood', '[{"mood_vibe": "a"}, {"mood'),
+    ("Nessun array.", "Nessun array."),
+])
+def test_get_json_payload_from_llm_content(content, expected_payload):
+    assert chunker._get_json_payload_from_llm_content(content) == expected_payload
+
+
+@pytest.mark.parametrize("repair, content, expected", [
+    (chunker._strip_code_fences, "Ecco:\n```json\n[1, 2]\n```\nFine.", "[1, 2]\n"),
+    (chunker._strip_code_fences, "```\n[1, 2]", "[1, 2]"),
+    (chunker._strip_code_fences, "[1, 2]", "[1, 2]"),
+    (chunker._normalize_smart_quotes, '[{“mood_vibe”: “cupo”}]', '[{"mood_vibe": "cupo"}]'),
+    (chunker._normalize_smart_quotes, '[{„mood_vibe“: „cupo“}]', '[{"mood_vibe": "cupo"}]'),
+    # Typographic quotes inside a plainly quoted value are part of the text
+    (chunker._normalize_smart_quotes, '[{"citazione_iniziale": "disse “no”"}]', '[{"citazione_iniziale": "disse “no”"}]'),
+    (chunker._remove_trailing_commas, '[{"a": 1,}, {"b": 2} ,\n]', '[{"a": 1}, {"b": 2} \n]'),
+    (chunker._remove_trailing_commas, '[{"a": "1,}"}]', '[{"a": "1,}"}]'),
+    (chunker._close_truncated_array, 'Scene: [{"a": 1}, {"b": 2}, {"c"', '[{"a": 1}, {"b": 2}]'),
+    (chunker._close_truncated_array, '[{"a": 1}]', '[{"a": 1}]'),
+    (chunker._close_truncated_array, '[{"a"', '[{"a"'),
+])
+def test_json_repair(repair, content, expected):
+    assert repair(content) == expected
+
+
+def _scene_json(**overrides) -> str:
+    return json.dumps({**SCENE, **overrides}, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("content, expected_repair, expected_scenes", [
+    ("[" + _scene_json() + "]", "parsed_without_repair", 1),
+    ("```json\n[" + _scene_json() + ", " + _scene_json(mood_vibe="f") + "]\n```", "parsed_without_repair", 2),
+    ("[" + _scene_json().replace('"', "“", 1).replace('"', "”", 1) + "]", "smart_quotes", 1),
+    ("[" + _scene_json() + ",]", "trailing_commas", 1),
+    ("[" + _scene_json() + ", " + _scene_json()[:40], "truncated_array", 1),
+])
+def test_parse_scenes_with_local_repair(monkeypatch, content, expected_repair, expected_scenes):
+    stats = dict.fromkeys(chunker.json_repair_stats, 0)
+    monkeypatch.setattr(chunker, "json_repair_stats", stats)
+    scenes, payload = chunker._parse_scenes_with_local_repair(content)
+    assert len(scenes) == expected_scenes
+    assert scenes[0].elementi_narrativi == "a"
+    assert [name for name, count in stats.items() if count] == [expected_repair]
+    assert chunker._parse_and_validate_scenes(payload) == scenes
+
+
+def test_parse_scenes_with_local_repair_raises_for_invalid_items():
+    content = "[" + _scene_json() + ', {"elementi_narrativi": "solo questo"}]'
+    with pytest.raises(chunker.InvalidSceneItemsError) as raised:
+        chunker._parse_scenes_with_local_repair(content)
+    assert list(raised.value.item_errors) == [1]
+    assert raised.value.validated_scenes[0] is not None and raised.value.validated_scenes[1] is None
+
+
+@pytest.mark.parametrize("content", ["Nessuna scena trovata.", '{"scene": 1}', "[{non è json}]"])
+def test_parse_scenes_with_local_repair_raises_when_no_repair_helps(content):
+    with pytest.raises(ValueError):
+        chunker._parse_scenes_with_local_repair(content)
@@ -0,0 +1,57 @@
+"""Tests for the Prometheus /metrics endpoint, the one place the service's counters are exported."""
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as chunker
+
+
+def _samples(metrics_text: str) -> dict:
+    """Sample name with labels -> value, from the Prometheus text format."""
+    return {
+        name: float(value)
+        for name, value in re.findall(r"^([a-z_]+(?:\{[^}]*\})?) (\S+)$", metrics_text, re.MULTILINE)
+    }
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    cache = chunker.SceneCache(str(tmp_path / "scene_cache.sqlite3"), max_bytes=1024)
+    monkeypatch.setattr(chunker, "scene_cache", cache)
+    yield TestClient(chunker.app)
+    cache.close()
+
+
+def test_metrics_export_the_cache_prefilter_single_flight_and_scheduler_counters(monkeypatch, client):
+    chunker.scene_cache.put("key", [chunker.Scene(elementi_narrativi="a", personaggi="b", ambientazione="c", mood_vibe="d", azione_in_corso="e")])
+    chunker.scene_cache.get("key")
+    chunker.scene_cache.get("missing")
+    monkeypatch.setattr(chunker, "boundary_prefilter_stats", {"decided_no_locally": 3, "decided_yes_locally": 1, "sent_to_llm": 2})
+    monkeypatch.setitem(chunker.split_scenes_single_flight.counters, "coalesced", 5)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    samples = _samples(response.text)
+    assert samples['text_chunker_scene_cache_lookups_total{result="hit"}'] == 1
+    assert samples['text_chunker_scene_cache_lookups_total{result="miss"}'] == 1
+    assert samples["text_chunker_scene_cache_entries"] == 1
+    assert samples["text_chunker_scene_cache_max_bytes"] == 1024
+    assert "text_chunker_scene_cache_evictions_total" in samples
+    assert samples['text_chunker_boundary_checks_total{outcome="decided_no_locally"}'] == 3
+    assert samples['text_chunker_boundary_checks_total{outcome="sent_to_llm"}'] == 2
+    assert samples['text_chunker_split_requests_total{outcome="coalesced"}'] == 5
+    assert samples["text_chunker_batch_chunks_running"] == 0
+    assert samples["text_chunker_batch_chunks_waiting"] == 0
+    assert samples["text_chunker_llm_requests_waiting"] == 0
+
+
+def test_metrics_leave_out_an_unavailable_scene_cache(monkeypatch, tmp_path):
+    (tmp_path / "not_a_directory").write_text("")
+    monkeypatch.setattr(chunker, "scene_cache", None)
+    monkeypatch.setattr(chunker, "SCENE_CACHE_PATH", str(tmp_path / "not_a_directory" / "scene_cache.sqlite3"))
+    response = TestClient(chunker.app).get("/metrics")
+    assert response.status_code == 200
+    assert "text_chunker_scene_cache" not in response.text
+    assert "text_chunker_chunks_total" in response.text
+
@@ -0,0 +1,28 @@
+"""Tests for the overlap boundary mode: overlapping chunks reconciled locally, in one pass or streamed."""
+import asyncio
+
+import pytest
+
+import benchmark_boundary_strategies as benchmark
+import main as chunker
+
+
+@pytest.mark.parametrize("words", [30_000, 45_000])
+def test_streamed_overlap_scenes_match_the_reconciled_result(simulated_llm, words):
+    text = benchmark.build_scened_book(words)
+
+    async def scenario():
+        reconciled = await chunker.process_large_text(
+            text, chunker.TARGET_CHUNK_SIZE_WORDS, chunker.WORD_COUNT_SLACK, boundary_merge_mode="overlap"
+        )
+        streamed = [scene async for scene in chunker.stream_large_text_scenes(
+            text, chunker.TARGET_CHUNK_SIZE_WORDS, chunker.WORD_COUNT_SLACK, boundary_merge_mode="overlap"
+        )]
+        return reconciled.scenes, streamed
+
+    reconciled, streamed = asyncio.run(scenario())
+    assert streamed == reconciled
+    expected_scenes = len(set(benchmark.SCENE_MARKER_RE.findall(text)))
+    assert benchmark._scene_accuracy(streamed, text).startswith(f"{expected_scenes}/{expected_scenes} scenes exact")
+    # Overlaps are reconciled locally: every LLM call is an extraction
+    assert len(simulated_llm.extraction_prompts()) == len(simulated_llm.prompts)
@@ -0,0 +1,55 @@
+"""Tests for AdaptiveRateLimiter: AIMD concurrency, Retry-After handling and token accounting."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+from openai import RateLimitError
+
+import main as chunker
+from fakes import FakeClient, completion, rate_limit_error
+
+
+def test_throttled_window_halves_concurrency_once_and_waits_for_retry_after(rate_limiter):
+    async def throttled_first(request_number: int):
+        await asyncio.sleep(0.01) # Every call is in flight before the first 429 comes back
+        if request_number < 4:
+            raise rate_limit_error(retry_after_ms=100)
+        return completion("ok")
+
+    client = FakeClient(throttled_first)
+    retry_policy = chunker.RetryPolicy(max_attempts=3, base_delay_seconds=0.001, max_delay_seconds=0.01, max_throttle_wait_seconds=5)
+
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(*(
+            chunker._call_llm_with_finish_reason(client, f"prompt {i}", "system", "model", retry_policy=retry_policy) for i in range(4)
+        ))
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(scenario())
+    assert rate_limiter.counters["throttled"] == 4
+    assert rate_limiter.counters["retry_after_honoured"] == 4
+    # The four 429s answered calls sent at the old rate, so the limit is cut once, then grows on the successes
+    assert rate_limiter.counters["concurrency_decreases"] == 1
+    assert 4 < rate_limiter.concurrency_limit < 5
+    assert elapsed >= 0.1
+
+
+def test_retry_after_is_read_from_seconds_and_milliseconds():
+    request = httpx.Request("POST", "https://llm.test/chat/completions")
+    in_seconds = RateLimitError("rate limited", response=httpx.Response(429, headers={"retry-after": "7"}, request=request), body=None)
+    assert chunker._retry_after_seconds(in_seconds) == 7
+    assert chunker._retry_after_seconds(rate_limit_error(retry_after_ms=250)) == 0.25
+
+
+def test_response_without_completion_tokens_is_charged_no_output_tokens(monkeypatch):
+    limiter = chunker.AdaptiveRateLimiter(0, 100_000, initial_concurrency=8, min_concurrency=1, max_concurrency=8)
+    monkeypatch.setattr(chunker, "llm_rate_limiter", limiter)
+
+    async def usage_without_output(request_number: int):
+        return completion("ok", usage=SimpleNamespace(prompt_tokens=12, completion_tokens=None))
+
+    content, _ = asyncio.run(chunker._call_llm_with_finish_reason(FakeClient(usage_without_output), "prompt", "system", "model"))
+    assert content == "ok"
+    assert limiter.counters["succeeded"] == 1
@@ -0,0 +1,56 @@
+"""Tests for the scene-extraction cache: hits skip the LLM, and a broken cache never costs a chunk its scenes."""
+import asyncio
+import sqlite3
+
+import pytest
+
+import benchmark_boundary_strategies as benchmark
+import main as chunker
+
+
+@pytest.fixture
+def scene_cache(monkeypatch, tmp_path, simulated_llm):
+    cache = chunker.SceneCache(str(tmp_path / "scene_cache.sqlite3"), max_bytes=1024 * 1024)
+    monkeypatch.setattr(chunker, "scene_cache", cache)
+    yield cache
+    cache.close()
+
+
+def _raise_locked(*args):
+    raise sqlite3.OperationalError("database is locked")
+
+
+def test_second_extraction_of_a_chunk_is_served_from_the_cache(scene_cache, simulated_llm):
+    text = benchmark.build_scened_book(800)
+    first = asyncio.run(chunker.split_text_into_scenes_logic(text))
+    second = asyncio.run(chunker.split_text_into_scenes_logic(text))
+    assert second.scenes == first.scenes
+    assert len(simulated_llm.prompts) == 1
+    assert (scene_cache.hits, scene_cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("failing_method", ["get", "put"])
+def test_cache_errors_fall_back_to_an_uncached_extraction(monkeypatch, scene_cache, simulated_llm, failing_method):
+    monkeypatch.setattr(scene_cache, failing_method, _raise_locked)
+    text = benchmark.build_scened_book(800)
+    response = asyncio.run(chunker.split_text_into_scenes_logic(text))
+    assert response.scenes
+    assert not response.partial
+    assert len(simulated_llm.prompts) == 1
+
+
+def test_unopenable_cache_falls_back_to_an_uncached_extraction(monkeypatch, tmp_path, simulated_llm):
+    # A regular file where the cache directory should be, as with a read-only or misconfigured path
+    (tmp_path / "not_a_directory").write_text("")
+    monkeypatch.setattr(chunker, "SCENE_CACHE_PATH", str(tmp_path / "not_a_directory" / "scene_cache.sqlite3"))
+    response = asyncio.run(chunker.split_text_into_scenes_logic(benchmark.build_scened_book(800)))
+    assert response.scenes
+    assert chunker.scene_cache is None
+
+
+def test_chunk_keeps_its_scenes_when_the_cache_cannot_store_them(monkeypatch, scene_cache, simulated_llm):
+    monkeypatch.setattr(scene_cache, "put", _raise_locked)
+    text = benchmark.build_scened_book(800)
+    response = asyncio.run(chunker._process_single_chunk_for_scenes(text, 0))
+    assert response.scenes
+    assert not response.partial
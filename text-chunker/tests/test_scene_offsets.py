@@ -0,0 +1,57 @@
+"""Tests for placing extracted scenes in their chunk's text from their anchor quotes."""
+import pytest
+
+import main as chunker
+from fakes import scene_item
+
+FIRST = "La notte era scura e il vento soffiava tra gli alberi del castello."
+SECOND = "Macbeth guardò lontano senza dire nulla, mentre la torre bruciava."
+THIRD = "All'alba Banquo raggiunse la brughiera con i suoi uomini stanchi."
+CHUNK = "\n\n".join([FIRST, SECOND, THIRD])
+SECOND_AT, THIRD_AT, END = CHUNK.index(SECOND), CHUNK.index(THIRD), len(CHUNK)
+
+
+@pytest.mark.parametrize("quote, from_offset, expected_offset", [
+    ("Macbeth guardò lontano", 0, SECOND_AT),
+    ("“Macbeth guardò lontano…”", 0, SECOND_AT),
+    ("macbeth  GUARDÒ\nlontano senza", 0, SECOND_AT),
+    # The tail paraphrased: the first words still place it
+    ("Macbeth guardò lontano senza parlare affatto", 0, SECOND_AT),
+    ("Macbeth guardò lontano", SECOND_AT + 1, None),
+    ("Duncan dormiva nella sua stanza", 0, None),
+    ("…", 0, None),
+])
+def test_find_scene_anchor(quote, from_offset, expected_offset):
+    assert chunker._find_scene_anchor(CHUNK, quote, from_offset) == expected_offset
+
+
+@pytest.mark.parametrize("quotes, expected_starts", [
+    ([FIRST[:30], SECOND[:30], THIRD[:30]], [0, SECOND_AT, THIRD_AT]),
+    # The first scene starts the chunk even without a quote
+    ([None, SECOND[:30], THIRD[:30]], [0, SECOND_AT, THIRD_AT]),
+    # Unplaced scenes are spread between their placed neighbours, or up to the end of the chunk
+    ([FIRST[:30], "Nessuna corrispondenza qui", THIRD[:30]], [0, THIRD_AT // 2, THIRD_AT]),
+    ([FIRST[:30], None, None], [0, END // 3, 2 * END // 3]),
+    # Scenes stay in order: a quote found only before the previous scene isn't used
+    ([FIRST[:30], THIRD[:30], SECOND[:30]], [0, THIRD_AT, THIRD_AT + (END - THIRD_AT) // 2]),
+    ([], []),
+])
+def test_locate_scenes_in_chunk(quotes, expected_starts):
+    scenes = [chunker.Scene(**scene_item(number, citazione_iniziale=quote)) for number, quote in enumerate(quotes, start=1)]
+    spans = chunker._locate_scenes_in_chunk(CHUNK, scenes)
+    assert [start for start, _ in spans] == expected_starts
+    # Each scene ends where the next starts, and the last at the end of the chunk
+    assert [end for _, end in spans] == expected_starts[1:] + [END] * bool(expected_starts)
+
+
+def test_repeated_quote_places_each_scene_after_the_previous_one():
+    chunk = "Si voltò. La stanza era vuota.\n\nSi voltò. Ora c'era qualcuno."
+    scenes = [chunker.Scene(**scene_item(number, citazione_iniziale="Si voltò.")) for number in (1, 2)]
+    assert [start for start, _ in chunker._locate_scenes_in_chunk(chunk, scenes)] == [0, chunk.rindex("Si voltò.")]
+
+
+def test_source_offsets_are_relative_to_the_full_text():
+    scenes = [chunker.Scene(**scene_item(1, citazione_iniziale=FIRST[:30])), chunker.Scene(**scene_item(2, citazione_iniziale=SECOND[:30]))]
+    located = chunker._with_source_offsets(scenes, CHUNK, chunk_start_char=1000, chunk_index=3)
+    assert [(scene.start_char, scene.end_char, scene.chunk_index) for scene in located] == [(1000, 1000 + SECOND_AT, 3), (1000 + SECOND_AT, 1000 + END, 3)]
+    assert scenes[0].start_char is None
@@ -0,0 +1,51 @@
+"""Tests for per-item salvage: only the scene items that fail validation go to the fixer, and the rest are kept."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main as chunker
+from fakes import ScriptedLLM, scene_array, scene_item
+
+MISSING_FIELDS = {"elementi_narrativi": "S2"}
+INITIAL_OUTPUT = (scene_array(scene_item(1), MISSING_FIELDS, scene_item(3)), "stop")
+
+
+@pytest.mark.parametrize("fixer_response, expected_labels, expected_partial", [
+    # The fixer corrects the item, which is spliced back in its place
+    ((scene_array(scene_item(2)), "stop"), ["S1", "S2", "S3"], False),
+    ((scene_array(MISSING_FIELDS), "stop"), ["S1", "S3"], True),
+    # Not one item per failing item
+    ((scene_array(scene_item(2), scene_item(4)), "stop"), ["S1", "S3"], True),
+    (("Non posso correggerlo.", "stop"), ["S1", "S3"], True),
+    (HTTPException(status_code=500, detail="fixer failed"), ["S1", "S3"], True),
+])
+def test_salvage_keeps_valid_items_and_fixes_only_the_failing_ones(monkeypatch, fixer_response, expected_labels, expected_partial):
+    llm = ScriptedLLM(INITIAL_OUTPUT, fixer_response)
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", llm)
+    response = asyncio.run(chunker._extract_scenes_with_llm("testo"))
+    assert [scene.elementi_narrativi for scene in response.scenes] == expected_labels
+    assert response.partial is expected_partial
+    # Only the failing item was sent to the fixer
+    assert '"S2"' in llm.prompts[1] and '"S1"' not in llm.prompts[1]
+    assert not llm.responses
+
+
+def test_salvage_recovering_nothing_escalates_to_the_full_fixer(monkeypatch):
+    llm = ScriptedLLM(
+        (scene_array(MISSING_FIELDS), "stop"),
+        ("Non posso correggerlo.", "stop"),
+        (scene_array(scene_item(1), scene_item(2)), "stop"),
+    )
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", llm)
+    response = asyncio.run(chunker._extract_scenes_with_llm("testo"))
+    assert [scene.elementi_narrativi for scene in response.scenes] == ["S1", "S2"]
+    assert not response.partial
+    assert not llm.responses
+
+
+def test_salvage_lets_provider_throttling_through(monkeypatch):
+    llm = ScriptedLLM(INITIAL_OUTPUT, chunker.LLMThrottledError("throttled"))
+    monkeypatch.setattr(chunker, "_call_llm_with_finish_reason", llm)
+    with pytest.raises(chunker.LLMThrottledError):
+        asyncio.run(chunker._extract_scenes_with_llm("testo"))
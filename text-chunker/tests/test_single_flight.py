@@ -0,0 +1,91 @@
+"""Tests for SingleFlight, which coalesces identical concurrent /split-scenes requests into one computation."""
+import asyncio
+import contextlib
+
+import main as chunker
+
+
+def test_single_flight_shares_one_run_between_identical_requests():
+    async def scenario():
+        flight = chunker.SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "scenes"
+
+        results = await asyncio.gather(*(flight.run("key", work) for _ in range(3)))
+        return results, runs, flight.stats()
+
+    results, runs, stats = asyncio.run(scenario())
+    assert results == ["scenes"] * 3
+    assert len(runs) == 1
+    assert stats == {"started": 1, "coalesced": 2, "in_flight": 0}
+
+
+def test_single_flight_cancels_the_work_only_when_the_last_waiter_leaves():
+    async def scenario():
+        flight = chunker.SingleFlight()
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.run("key", work)) for _ in range(2)]
+        await started.wait()
+        waiters[0].cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await waiters[0]
+        await asyncio.sleep(0)
+        cancelled_with_one_waiter_left = cancelled.is_set()
+        waiters[1].cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await waiters[1]
+        await asyncio.sleep(0)
+        return cancelled_with_one_waiter_left, cancelled.is_set(), flight.stats()
+
+    cancelled_with_one_waiter_left, cancelled_at_end, stats = asyncio.run(scenario())
+    assert not cancelled_with_one_waiter_left
+    assert cancelled_at_end
+    assert stats["in_flight"] == 0
+
+
+def test_single_flight_starts_afresh_while_cancelled_work_unwinds():
+    async def scenario():
+        flight = chunker.SingleFlight()
+        started, unwinding, finish_unwinding = asyncio.Event(), asyncio.Event(), asyncio.Event()
+
+        async def slow_to_cancel():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                unwinding.set()
+                # Cleanup that outlives the cancel, e.g. closing a connection
+                await finish_unwinding.wait()
+                raise
+
+        async def work():
+            return "scenes"
+
+        first = asyncio.create_task(flight.run("key", slow_to_cancel))
+        await started.wait()
+        first.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await first
+        await unwinding.wait()
+        # Joining the dying task instead would wait for its cleanup, then raise CancelledError
+        second = await asyncio.wait_for(flight.run("key", work), timeout=1)
+        finish_unwinding.set()
+        await asyncio.sleep(0)
+        return second, flight.stats()
+
+    second, stats = asyncio.run(scenario())
+    assert second == "scenes"
+    assert stats == {"started": 2, "coalesced": 0, "in_flight": 0}
@@ -0,0 +1,27 @@
+"""Tests for the token-budget chunking mode: the per-model budget and the chunks it produces."""
+import pytest
+
+import benchmark_boundary_strategies as benchmark
+import main as chunker
+
+
+@pytest.mark.parametrize("model, max_chunk_tokens, expected_budget", [
+    # A 1M-token context would allow a whole novel per chunk, so the cap decides
+    ("google/gemini-2.5-flash-preview-05-20", 16_000, 16_000),
+    # Without the cap, the 65k-token output limit does: 65536 / (300 / 1500) * 0.8
+    ("google/gemini-2.5-flash-preview-05-20", 0, 262_144),
+    # A model whose output limit is below the cap: 8192 / (300 / 1500) * 0.8
+    ("unknown/model", 100_000, 32_768),
+])
+def test_chunk_token_budget(monkeypatch, model, max_chunk_tokens, expected_budget):
+    monkeypatch.setattr(chunker, "MAX_CHUNK_TOKENS", max_chunk_tokens)
+    assert chunker._chunk_token_budget(model) == expected_budget
+
+
+def test_default_budget_splits_a_novel_into_parallel_chunks():
+    text = benchmark.build_scened_book(100_000)
+    spans = chunker._create_chunk_spans(text, chunker.TARGET_CHUNK_SIZE_WORDS, chunker.WORD_COUNT_SLACK, "tokens")
+    assert len(spans) > chunker.MAX_CONCURRENT_CHUNKS
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+    assert max(chunker._count_tokens(text[start:end]) for start, end in spans) <= chunker._chunk_token_budget(chunker.DEFAULT_MODEL)